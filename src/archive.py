@@ -0,0 +1,73 @@
+import logging
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import chess
+
+from game.archive import DEFAULT_SEARCH_LIMIT, GameArchive
+from game.position import transposition_hash
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+parser = ArgumentParser(
+    description="Imports games to, exports games from and searches the archive of "
+                "finished games.")
+parser.add_argument("--archive", metavar="PATH", type=Path,
+                    default=Path("games.sqlite3"),
+                    help="The path of the archive, like main.py --archive. Defaults to "
+                         "games.sqlite3.")
+subparsers = parser.add_subparsers(dest="command", required=True)
+import_parser = subparsers.add_parser(
+    "import", help="Import all games of PGN files, like club databases.")
+import_parser.add_argument("pgns", nargs="+", type=Path,
+                           help="Paths of the PGN files to import.")
+export_parser = subparsers.add_parser(
+    "export", help="Export games to a PGN file.")
+export_parser.add_argument("pgn", type=Path,
+                           help="The path of the PGN file to export to.")
+export_parser.add_argument("--fen", default=None,
+                           help="Only export the games that reached this position.")
+search_parser = subparsers.add_parser(
+    "search", help="List the games that reached a position, newest first.")
+search_parser.add_argument("fen", nargs="?", default=chess.STARTING_FEN,
+                           help="The FEN of the position, defaults to the starting "
+                                "position.")
+search_parser.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT,
+                           help=f"How many games to list at most, defaults to "
+                                f"{DEFAULT_SEARCH_LIMIT}.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if not args.debug:
+    set_all_stdout_logger_levels(logging.WARNING)
+
+archive = GameArchive(args.archive)
+try:
+    if args.command == "import":
+        for path in args.pgns:
+            stats = archive.import_pgn(path)
+            print(f"{path}: {stats.imported} games imported ({stats.skipped} skipped), "
+                  f"{stats.positions} positions indexed in {stats.elapsed:.1f} s, "
+                  f"{stats.games_per_second:.0f} games/s")
+        print(f"{len(archive)} games in {args.archive}")
+    elif args.command == "export":
+        game_ids = None
+        if args.fen is not None:
+            position_hash = transposition_hash(chess.Board(args.fen))
+            game_ids = [game.id for game in reversed(archive.games_reaching(
+                position_hash, archive.count_games_reaching(position_hash)))]
+        print(f"{archive.export_pgn(args.pgn, game_ids)} games exported to {args.pgn}")
+    elif args.command == "search":
+        position_hash = transposition_hash(chess.Board(args.fen))
+        start = time.perf_counter()
+        games = archive.games_reaching(position_hash, args.limit)
+        count = archive.count_games_reaching(position_hash)
+        elapsed = time.perf_counter() - start
+        for game in games:
+            print(f"{game.id}: {game.white} vs. {game.black}, {game.result}, "
+                  f"{game.event}, {game.date}, reached at ply {game.ply}")
+        print(f"{count} games reached the position, found in {elapsed * 1000:.1f} ms")
+finally:
+    archive.close()
@@ -0,0 +1,285 @@
+import logging
+import random
+import threading
+import time
+from argparse import ArgumentParser
+from statistics import mean
+
+import chess
+
+from chessboard.interface import ChessboardInterface, interface_protocol
+from chessboard.interface.interface_replay import ReplayChessboardInterface
+from chessboard.manager import manager_dataclasses, manager_enums
+from chessboard.manager.manager_registry import ChessboardManagerRegistry
+from engine.engine_dataclasses import SearchInfo, SearchLimits
+from engine.engine_search import Searcher
+from simulator import VirtualChessboard, physical_steps
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+# The longest game benchmarks play, in plies
+BENCHMARK_GAME_PLIES = 200
+# The positions the built-in engine is benchmarked on, from the opening to the endgame
+BENCHMARK_ENGINE_POSITIONS = (
+    chess.STARTING_FEN,
+    # Kiwipete, with many captures, checks, castling and promotions
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QK2R w KQ - 0 9",
+    "2r2rk1/1bqnbppp/p2ppn2/1p6/3NPP2/1BN1B3/PPP1Q1PP/2KR3R w - - 0 13",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "8/8/4kpp1/3p1b2/p6P/2B5/6P1/6K1 b - - 0 47",
+)
+
+
+def benchmark_game(seed: int) -> list[chess.Move]:
+    """
+    Plays a random game to benchmark with, which is the same for the same seed.
+
+    :param seed: The seed for the random moves.
+    :return: The moves of the game.
+    """
+    rng = random.Random(seed)
+    board = chess.Board()
+    while not board.is_game_over() and len(board.move_stack) < BENCHMARK_GAME_PLIES:
+        board.push(rng.choice(list(board.legal_moves)))
+    return board.move_stack
+
+
+def baseline_poll(rows: list[bytes], board: chess.Board,
+                  history: list[chess.SquareSet]) -> tuple[int, int]:
+    """
+    The occupancy tracking move detection did on every poll before it worked on
+    bitboards, which the poll benchmark compares against: parsing the ASCII print
+    response into a SquareSet square by square, rebuilding the SquareSet of the current
+    board from its pieces, diffing them and keeping the history of occupancies without
+    adjacent duplicates.
+
+    :param rows: The lines of the print response after its header.
+    :param board: The current board.
+    :param history: The occupancies since the last move.
+    :return: The number of squares removed and added, which picked how to search for a
+     move.
+    """
+    physical = chess.SquareSet()
+    for row, line in enumerate(rows):
+        for col, col_char in enumerate(line.strip().split(b" ")):
+            if col_char == b"0":
+                physical.add(chess.square(col, 7 - row))
+    current = chess.SquareSet()
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            current |= chess.SquareSet(board.pieces(piece_type, color))
+    additions = physical - current
+    removals = current - physical
+    history.append(physical)
+    i = 0
+    while i + 1 < len(history):
+        if history[i] == history[i + 1]:
+            history.pop(i + 1)
+        else:
+            i += 1
+    if len(removals) == 0 and len(additions) == 0:
+        history.clear()
+    return len(removals), len(additions)
+
+
+def benchmark_poll(moves: list[chess.Move], idle_polls: int,
+                   baseline: bool) -> tuple[float, float, int]:
+    """
+    Measures the cost of a single poll of move detection, by playing a game one
+    physical step at a time and repeating each occupancy like while a player is
+    thinking. Every poll decodes the response to an ASCII print query.
+
+    :param moves: The moves of the game to play.
+    :param idle_polls: How many times each occupancy is polled again unchanged.
+    :param baseline: Whether to measure `baseline_poll` instead of the replay
+     interface. It only does what working on bitboards replaced, so its polls with a
+     changed occupancy don't include searching for the move.
+    :return: The average microseconds per poll with a changed occupancy, per poll with
+     an unchanged occupancy, and the number of polls.
+    """
+    interface = ReplayChessboardInterface()
+    interface.reset_board()
+    board = chess.Board()
+    history = []
+    changed_time = 0
+    idle_time = 0
+    changed_polls = 0
+    for move in moves:
+        for step in physical_steps(board, move):
+            rows = interface_protocol.encode_ascii_rows(step)
+            for polls in (1, idle_polls):
+                start = time.perf_counter()
+                for _ in range(polls):
+                    if baseline:
+                        baseline_poll(rows, board, history)
+                    else:
+                        interface.check_sample(
+                            interface_protocol.decode_ascii_rows(rows))
+                elapsed = time.perf_counter() - start
+                if polls == 1:
+                    changed_time += elapsed
+                else:
+                    idle_time += elapsed
+            changed_polls += 1
+        interface.add_move(move)
+        board.push(move)
+        history.clear()
+    idle_polls *= changed_polls
+    return (changed_time / changed_polls * 1_000_000,
+            idle_time / idle_polls * 1_000_000 if idle_polls else 0,
+            changed_polls + idle_polls)
+
+
+def benchmark_boards(moves: list[chess.Move], count: int,
+                     poll: bool) -> tuple[float, float, float]:
+    """
+    Measures how quickly moves are detected on many chessboards hosted by one
+    registry, by playing the same game on virtual chessboards all at once.
+
+    :param moves: The moves of the game to play.
+    :param count: The number of chessboards.
+    :param poll: Whether to poll the chessboards instead of streaming.
+    :return: The mean and maximum seconds from a move being made until it is detected,
+     and the mean seconds the registry spent on an update.
+    """
+    boards = [VirtualChessboard() for _ in range(count)]
+    registry = ChessboardManagerRegistry()
+    interfaces = []
+    player = manager_dataclasses.PlayerConfiguration(manager_enums.PlayerType.HUMAN)
+    for i, board in enumerate(boards):
+        board.start()
+        board.set_board(chess.Board())
+        interface = ChessboardInterface()
+        interface.connect(board.port, stream=not poll)
+        interfaces.append(interface)
+        registry.add_board(str(i), interface).new_game(player, player)
+    stop_event = threading.Event()
+    registry_thread = threading.Thread(target=registry.run, args=(stop_event,),
+                                       daemon=True)
+    registry_thread.start()
+    latencies = []
+    try:
+        for move in moves:
+            made = {}
+            for i, board in enumerate(boards):
+                board.play_move(move)
+                made[i] = time.perf_counter()
+            while made:
+                for i in list(made):
+                    possible_move = registry[str(i)].possible_move
+                    if possible_move is not None and \
+                            possible_move.from_square == move.from_square and \
+                            possible_move.to_square == move.to_square:
+                        latencies.append(time.perf_counter() - made.pop(i))
+                time.sleep(0.0001)
+            for i in range(count):
+                promote_to = None
+                if move.promotion is not None:
+                    promote_to = next(p for p in manager_enums.PromotionPiece
+                                      if p.value[0] == move.promotion)
+                registry[str(i)].confirm_possible_move(promoteTo=promote_to)
+    finally:
+        stop_event.set()
+        registry_thread.join()
+        update_latency = mean(registry.stats(name).mean_latency
+                              for name in registry.names)
+        registry.close()
+        for interface in interfaces:
+            interface.disconnect()
+        for board in boards:
+            board.stop()
+    return mean(latencies), max(latencies), update_latency
+
+
+def benchmark_engine(fen: str, depth: int) -> list[SearchInfo]:
+    """
+    Measures how quickly the built-in engine searches a position, with an empty
+    transposition table like at the start of a game.
+
+    :param fen: The position to search.
+    :param depth: How deep to search.
+    :return: The progress of the search after every depth.
+    """
+    infos = []
+    Searcher().search(chess.Board(fen), SearchLimits(depth=depth), infos.append)
+    return infos
+
+
+parser = ArgumentParser(
+    description="Measures the hot paths of the chessboard, without needing one.")
+subparsers = parser.add_subparsers(dest="benchmark", required=True)
+poll_parser = subparsers.add_parser(
+    "poll", help="Measure the cost of a single poll of move detection, decoding an "
+                 "ASCII print response, against the SquareSet occupancy tracking it "
+                 "replaced.")
+poll_parser.add_argument("--idle-polls", type=int, default=100,
+                         help="How many times each occupancy is polled again "
+                              "unchanged, defaults to 100.")
+poll_parser.add_argument("--seed", type=int, default=0,
+                         help="The seed of the random game to play, defaults to 0.")
+poll_parser.add_argument("--rounds", type=int, default=5,
+                         help="How many times to play the benchmark game, the best "
+                              "round is reported. Defaults to 5.")
+boards_parser = subparsers.add_parser(
+    "boards", help="Measure move detection latency as the number of chessboards hosted "
+                   "by one process grows, with virtual chessboards.")
+boards_parser.add_argument("--counts", type=int, nargs="+",
+                           default=[1, 2, 4, 8, 16, 32],
+                           help="The numbers of chessboards to measure, defaults to 1 2 "
+                                "4 8 16 32.")
+boards_parser.add_argument("--plies", type=int, default=40,
+                           help="How many plies of the random game to play, defaults "
+                                "to 40.")
+boards_parser.add_argument("--seed", type=int, default=0,
+                           help="The seed of the random game to play, defaults to 0.")
+boards_parser.add_argument("--poll", action="store_true",
+                           help="Poll the chessboards instead of subscribing to "
+                                "occupancy changes.")
+engine_parser = subparsers.add_parser(
+    "engine", help="Measure the nodes per second of the built-in engine and how long "
+                   "it takes to reach each depth, on a fixed set of positions.")
+engine_parser.add_argument("--depth", type=int, default=5,
+                           help="How deep to search each position, defaults to 5.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if not args.debug:
+    # Detection logs every move, which would dominate the measurement
+    set_all_stdout_logger_levels(logging.WARNING)
+
+if args.benchmark == "poll":
+    game = benchmark_game(args.seed)
+    print(f"{len(game)} plies, best of {args.rounds} rounds")
+    for name, baseline in (("Baseline (SquareSets)", True), ("Bitboards", False)):
+        results = [benchmark_poll(game, args.idle_polls, baseline)
+                   for _ in range(args.rounds)]
+        changed_us = min(r[0] for r in results)
+        idle_us = min(r[1] for r in results)
+        print(f"{name}: {changed_us:.1f} us/poll with a changed occupancy, "
+              f"{idle_us:.1f} us/poll unchanged, {results[0][2]} polls per round")
+elif args.benchmark == "boards":
+    game = benchmark_game(args.seed)[:args.plies]
+    print(f"{len(game)} plies per chessboard")
+    for count in args.counts:
+        mean_latency, max_latency, update_latency = benchmark_boards(game, count, args.poll)
+        print(f"{count} chessboards: detected in {mean_latency * 1000:.2f} ms on "
+              f"average, {max_latency * 1000:.2f} ms at most, "
+              f"{update_latency * 1000:.3f} ms per update")
+elif args.benchmark == "engine":
+    total_nodes = 0
+    total_time = 0
+    for fen in BENCHMARK_ENGINE_POSITIONS:
+        infos = benchmark_engine(fen, args.depth)
+        print(fen)
+        for info in infos:
+            print(f"  Depth {info.depth}: {info.time:.2f} s, {info.nodes} nodes, "
+                  f"{info.nodes_per_second} nodes/s, "
+                  f"{' '.join(move.uci() for move in info.pv)}")
+        total_nodes += infos[-1].nodes
+        total_time += infos[-1].time
+    print(f"{len(BENCHMARK_ENGINE_POSITIONS)} positions to depth {args.depth}: "
+          f"{total_time:.2f} s, {total_nodes} nodes, "
+          f"{int(total_nodes / total_time)} nodes/s")
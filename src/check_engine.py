@@ -0,0 +1,176 @@
+import logging
+import shlex
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+import chess
+
+from chessboard.interface import ChessboardInterface
+from chessboard.manager import ChessboardManager, manager_dataclasses, manager_enums, \
+    manager_events
+from engine.engine_dataclasses import EngineConfiguration, RANDOM_ENGINE_COMMAND
+from simulator import VirtualChessboard, physical_steps
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+# The longest an engine may take to choose a move, or the chessboard to detect it
+CHECK_TIMEOUT = 30
+# An engine that exits right away, to check that a failing engine is handled
+FAILING_ENGINE_COMMAND = (sys.executable, "-c", "raise SystemExit(1)")
+
+
+def wait_for(manager: ChessboardManager, condition: Callable[[], bool]) -> bool:
+    """
+    Updates the manager until a condition holds.
+
+    :param manager: The manager to update.
+    :param condition: The condition.
+    :return: Whether the condition held before CHECK_TIMEOUT passed.
+    """
+    deadline = time.monotonic() + CHECK_TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        manager.update()
+        time.sleep(0.001)
+    return True
+
+
+def start_game(white: manager_dataclasses.PlayerConfiguration,
+               black: manager_dataclasses.PlayerConfiguration) \
+        -> tuple[VirtualChessboard, ChessboardInterface, ChessboardManager]:
+    """
+    Starts a game on a virtual chessboard with the pieces set up.
+
+    :param white: Configuration for the white player.
+    :param black: Configuration for the black player.
+    :return: The virtual chessboard, the interface connected to it and the manager.
+    """
+    chessboard = VirtualChessboard()
+    chessboard.start()
+    chessboard.set_board(chess.Board())
+    interface = ChessboardInterface()
+    interface.connect(chessboard.port, stream=False)
+    manager = ChessboardManager(interface)
+    manager.new_game(white, black)
+    return chessboard, interface, manager
+
+
+def stop_game(chessboard: VirtualChessboard, interface: ChessboardInterface,
+              manager: ChessboardManager):
+    """
+    Exits the game, if still in progress, and stops everything `start_game` started.
+
+    :param chessboard: The virtual chessboard.
+    :param interface: The interface connected to it.
+    :param manager: The manager.
+    """
+    if manager.snapshot.state == manager_enums.State.GAME_IN_PROGRESS:
+        manager.exit()
+    manager.close()
+    interface.disconnect()
+    chessboard.stop()
+
+
+def check_game(command: tuple[str, ...], plies: int, time_limit: float) -> list[str]:
+    """
+    Plays a game between two engine players, making the moves they choose on a virtual
+    chessboard one step at a time like a player would.
+
+    :param command: The command to start the UCI engine with.
+    :param plies: The most plies to play.
+    :param time_limit: Seconds to think per move.
+    :return: The problems found, empty if none.
+    """
+    player = manager_dataclasses.PlayerConfiguration(
+        manager_enums.PlayerType.ENGINE,
+        EngineConfiguration(command=command, time=time_limit))
+    chessboard, interface, manager = start_game(player, player)
+    subscription = manager.events.subscribe()
+    problems = []
+    try:
+        for ply in range(plies):
+            if not wait_for(manager, lambda: manager.snapshot.engine_move is not None or
+                            manager.snapshot.state != manager_enums.State.GAME_IN_PROGRESS):
+                problems.append(f"No move chosen at ply {ply + 1}")
+                break
+            move = manager.snapshot.engine_move
+            if move is None:
+                break
+            # One step at a time, so captures can be told apart like on a real board
+            for step in physical_steps(chessboard.board, move):
+                chessboard.set_occupancy(step)
+                manager.update()
+            chessboard.board.push(move)
+            if not wait_for(manager, lambda: manager.snapshot.board.ply() > ply):
+                problems.append(f"{move.uci()} wasn't detected at ply {ply + 1}")
+                break
+        played = manager.snapshot.board.ply()
+    finally:
+        stop_game(chessboard, interface, manager)
+    events = subscription.drain()
+    chosen = sum(isinstance(event, manager_events.EngineMoveChosen)
+                 for event in events)
+    thinking = [event.thinking for event in events
+                if isinstance(event, manager_events.EngineThinkingChanged)]
+    if chosen < played:
+        problems.append(f"{chosen} moves chosen were published for {played} plies")
+    if thinking.count(True) < played or (thinking and thinking[-1]):
+        problems.append("The engine thinking wasn't published for every ply")
+    print(f"Played {played} plies, {manager.snapshot.state.value}")
+    return problems
+
+
+def check_failure() -> list[str]:
+    """
+    Starts a game against an engine that exits right away, which should be published
+    like the engine finishing thinking, so the player isn't left waiting for a move.
+
+    :return: The problems found, empty if none.
+    """
+    chessboard, interface, manager = start_game(
+        manager_dataclasses.PlayerConfiguration(
+            manager_enums.PlayerType.ENGINE,
+            EngineConfiguration(command=FAILING_ENGINE_COMMAND)),
+        manager_dataclasses.PlayerConfiguration(manager_enums.PlayerType.HUMAN))
+    subscription = manager.events.subscribe()
+    thinking = []
+    try:
+        wait_for(manager, lambda: False in thinking or thinking.extend(
+            event.thinking for event in subscription.drain()
+            if isinstance(event, manager_events.EngineThinkingChanged)))
+    finally:
+        stop_game(chessboard, interface, manager)
+    if False not in thinking:
+        return ["A failing engine wasn't published as no longer thinking"]
+    print("A failing engine was published as no longer thinking")
+    return []
+
+
+parser = ArgumentParser(
+    description="Checks that a UCI engine works as an engine player, by playing it "
+                "against itself on a virtual chessboard. Checks the stand-in random "
+                "engine by default.")
+parser.add_argument("--command", default=None,
+                    help="The command to start the engine with, like \"stockfish\". "
+                         "Defaults to engine/random_uci.py.")
+parser.add_argument("--plies", type=int, default=40,
+                    help="The most plies to play, defaults to 40.")
+parser.add_argument("--time", type=float, default=0.1,
+                    help="Seconds to think per move, defaults to 0.1.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if not args.debug:
+    set_all_stdout_logger_levels(logging.WARNING)
+
+engine_command = tuple(shlex.split(args.command)) if args.command is not None \
+    else RANDOM_ENGINE_COMMAND
+found = check_game(engine_command, args.plies, args.time) + check_failure()
+for problem in found:
+    print(f"Problem: {problem}")
+print("No problems found" if not found else f"{len(found)} problems found")
+sys.exit(1 if found else 0)
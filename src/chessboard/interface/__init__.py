@@ -1,14 +1,22 @@
 import logging
-from copy import copy
-from typing import Optional
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Optional
 
 import chess
 import serial.serialutil
 from serial import Serial
 
-from chessboard.helpers import square_set_from_board
-from chessboard.interface import interface_exceptions
-from utils.list_ops import remove_adjacent_duplicates
+from chessboard.interface import interface_dataclasses, interface_enums, \
+    interface_exceptions, interface_protocol
+from chessboard.interface.interface_filters import OccupancyFilter
+from chessboard.interface.interface_history import OCCUPANCY_HISTORY_CAPACITY, \
+    OccupancyHistory
+from chessboard.interface.interface_move_index import MoveIndex, build_move_index, \
+    default_move
+from chessboard.interface.interface_recording import SessionRecorder
+from game.position import Position
 from utils.logger import create_logger
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
@@ -19,32 +27,241 @@ class ChessboardInterface:
     Handles interfacing with the serial connection to the chessboard.
     """
     _conn: Optional[Serial]
-    _curr_board: chess.Board
-    # Tracks all square sets since the last move, which is used to see what happens
-    # before a move is confirmed
-    _square_set_history: list[chess.SquareSet]
+    _protocol_mode: interface_enums.ProtocolMode
+    # When streaming, the chessboard sends a frame by itself whenever the occupancy
+    # changes, so move detection only needs to re-run when a frame lands or the current
+    # board changes
+    _streaming: bool
+    _frame_decoder: interface_protocol.BitboardFrameDecoder
+    _streamed_bitboard: Optional[int]
+    # Every occupancy received since move detection last ran, as several frames can
+    # land at once and intermediate occupancies matter, like both pieces of a capture
+    # being lifted
+    _unprocessed_bitboards: deque[int]
+    _stream_dirty: bool
+    _possible_move: Optional[chess.Move]
+    _recorder: Optional[SessionRecorder]
+    _occupancy_filter: OccupancyFilter
+    # The current position, shared with the game played on the chessboard. Move
+    # detection keys its caches off its version, so they are rebuilt whenever it
+    # changes, no matter who changed it
+    _position: Position
+    # The position version the occupancy history was last cleared at
+    _history_position_version: int
+    # The occupancy and position version move detection last ran on, when neither
+    # changed its result is reused
+    _detected_occupancy: Optional[int]
+    _detected_position_version: int
+    _detection_stats: interface_dataclasses.EvaluationStats
+    # Maps occupancy changes to the legal moves of the current position, rebuilt only
+    # when the position version changes instead of generating legal moves every poll
+    _move_index: MoveIndex
+    _move_index_version: int
+    # Tracks the distinct occupancies since the last move, which is used to see what
+    # happens before a move is confirmed
+    _occupancy_history: OccupancyHistory
 
-    def __init__(self):
+    def __init__(self, occupancy_filter: Optional[OccupancyFilter] = None,
+                 position: Optional[Position] = None):
+        """
+        :param occupancy_filter: The filter to run occupancies read from the chessboard
+         through before move detection. Defaults to no filtering.
+        :param position: The current position, to share it with a game. Defaults to a
+         new, empty position.
+        """
         self._conn = None
-        self._curr_board = chess.Board()
-        self._curr_board.clear()
-        self._square_set_history = []
+        self._protocol_mode = interface_enums.ProtocolMode.ASCII
+        self._streaming = False
+        self._frame_decoder = interface_protocol.BitboardFrameDecoder()
+        self._streamed_bitboard = None
+        self._unprocessed_bitboards = deque(maxlen=OCCUPANCY_HISTORY_CAPACITY)
+        self._stream_dirty = False
+        self._possible_move = None
+        self._recorder = None
+        self._occupancy_filter = occupancy_filter or OccupancyFilter()
+        self._position = position if position is not None else Position(None)
+        self._history_position_version = self._position.version
+        self._detected_occupancy = None
+        self._detected_position_version = -1
+        self._detection_stats = interface_dataclasses.EvaluationStats()
+        self._move_index = {}
+        self._move_index_version = -1
+        self._occupancy_history = OccupancyHistory()
 
-    def connect(self, port: str):
+    def connect(self, port: str, binary: bool = True, stream: bool = True):
         """
         Connect to the chessboard via the specified serial port.
 
         :param port: The serial port to connect to.
+        :param binary: Whether to try to negotiate binary bitboard frames with the
+         chessboard. If the chessboard does not acknowledge, the ASCII protocol is used.
+        :param stream: Whether to try to subscribe to occupancy changes from the
+         chessboard instead of polling it. Requires binary mode. If the chessboard does
+         not acknowledge, the chessboard is polled.
         """
         try:
             self._conn = Serial(port, baudrate=115200, timeout=1)
             logger.debug(f"Connected to chessboard on port {port}")
             # Clear command buffer
-            self._conn.write(b"\r\n\r\n")
+            self._conn.write(interface_protocol.CLEAR_COMMAND)
+            self._protocol_mode = interface_enums.ProtocolMode.ASCII
+            self._streaming = False
+            if binary:
+                self._negotiate_binary_mode()
+                if stream and self._protocol_mode == interface_enums.ProtocolMode.BINARY:
+                    self._subscribe()
         except serial.serialutil.SerialException:
             raise interface_exceptions.ChessboardInterfaceConnectionError(
                 f"Failed to connect to chessboard on port {port}")
 
+    def _negotiate_binary_mode(self):
+        """
+        Asks the chessboard to answer "print" queries with binary bitboard frames
+        instead of ASCII rows. Falls back to the ASCII protocol if the chessboard does
+        not acknowledge. Expects an open serial connection.
+        """
+        self._conn.reset_input_buffer()
+        self._conn.write(interface_protocol.BINARY_MODE_COMMAND)
+        # Skip over anything the firmware still echoes from clearing the command buffer
+        for _ in range(4):
+            line = self._conn.readline()
+            if line == interface_protocol.BINARY_MODE_ACK:
+                self._protocol_mode = interface_enums.ProtocolMode.BINARY
+                logger.debug("Chessboard acknowledged binary mode")
+                return
+            elif line == b"":
+                break
+        self._conn.reset_input_buffer()
+        logger.debug("Chessboard did not acknowledge binary mode, using ASCII mode")
+
+    def _subscribe(self):
+        """
+        Asks the chessboard to send a binary bitboard frame by itself whenever the
+        occupancy changes (and once right away). Stays polling if the chessboard does
+        not acknowledge. Expects an open serial connection in binary mode.
+        """
+        self._conn.write(interface_protocol.STREAM_COMMAND)
+        if self._conn.readline() == interface_protocol.STREAM_ACK:
+            self._streaming = True
+            self._frame_decoder = interface_protocol.BitboardFrameDecoder()
+            self._streamed_bitboard = None
+            self._unprocessed_bitboards.clear()
+            self._stream_dirty = True
+            logger.debug("Subscribed to occupancy changes from chessboard")
+        else:
+            self._conn.reset_input_buffer()
+            logger.debug("Chessboard did not acknowledge streaming, polling instead")
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Returns whether the chessboard pushes occupancy changes instead of being polled.
+
+        :return: True if streaming, False if polling.
+        """
+        return self._streaming
+
+    def wait_for_change(self, timeout: float) -> bool:
+        """
+        Waits until the chessboard reports an occupancy change. Only blocks when
+        streaming, otherwise returns True right away as every poll is a new reading.
+
+        :param timeout: The maximum time to wait in seconds.
+        :return: True if a new occupancy was received, False on timeout.
+        """
+        if not self._streaming:
+            return True
+        if not self._conn:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                "No connection to update from")
+        if self._conn.timeout != timeout:
+            self._conn.timeout = timeout
+        data = self._conn.read(max(1, self._conn.in_waiting))
+        # Drain anything else that arrived so nothing stale is left for the next wait
+        if self._conn.in_waiting:
+            data += self._conn.read(self._conn.in_waiting)
+        return self._feed_stream(data)
+
+    def receive(self) -> bool:
+        """
+        Feeds whatever the chessboard pushed so far into the frame decoder, without
+        blocking. Like `wait_for_change`, but for waiting on many chessboards at once by
+        selecting on their `fileno`.
+
+        :return: True if a new occupancy was received, False otherwise.
+        """
+        if not self._conn:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                "No connection to receive from")
+        waiting = self._conn.in_waiting
+        if not waiting:
+            return False
+        return self._feed_stream(self._conn.read(waiting))
+
+    def fileno(self) -> int:
+        """
+        Returns the file descriptor of the serial connection, to wait for data from the
+        chessboard with a selector. Only available on POSIX systems.
+
+        :return: The file descriptor.
+        """
+        if not self._conn:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                "No connection to get the file descriptor of")
+        return self._conn.fileno()
+
+    def _feed_stream(self, data: bytes) -> bool:
+        """
+        Feeds bytes received while streaming into the frame decoder, keeping the
+        occupancies for move detection.
+
+        :param data: The bytes received from the chessboard.
+        :return: True if a new occupancy was received, False otherwise.
+        """
+        bitboards = self._frame_decoder.feed(data)
+        if not bitboards:
+            return False
+        self._streamed_bitboard = bitboards[-1]
+        self._unprocessed_bitboards.extend(bitboards)
+        self._stream_dirty = True
+        return True
+
+    def start_recording(self, path: Path | str):
+        """
+        Starts recording every occupancy read from the chessboard, along with confirmed
+        moves and resets, so the session can be replayed later.
+
+        :param path: The path of the recording to create.
+        """
+        self.stop_recording()
+        self._recorder = SessionRecorder(path)
+
+    def stop_recording(self):
+        """
+        Stops recording, if recording.
+        """
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    @property
+    def connected(self) -> bool:
+        """
+        Returns whether there is a connection to the chessboard.
+
+        :return: True if connected, False otherwise.
+        """
+        return self._conn is not None
+
+    @property
+    def protocol_mode(self) -> interface_enums.ProtocolMode:
+        """
+        Returns the protocol mode negotiated with the chessboard.
+
+        :return: The protocol mode in use.
+        """
+        return self._protocol_mode
+
     def disconnect(self):
         """
         Disconnect from the chessboard.
@@ -57,59 +274,89 @@ class ChessboardInterface:
             raise interface_exceptions.ChessboardInterfaceConnectionError(
                 "No connection to disconnect")
 
-    def _get_curr_board_square_set(self) -> chess.SquareSet:
-        """
-        Gets the square set for the pieces of the current board in memory, NOT the
-        physical board.
-
-        :return: The current square set representing the chess pieces on the board.
+    def _get_physical_bitboard(self) -> int:
         """
-        return square_set_from_board(self._curr_board)
-
-    def _get_physical_square_set(self) -> chess.SquareSet:
-        """
-        Gets the square set for the pieces on the physical board, NOT the board in
+        Gets the bitboard of occupied squares on the physical board, NOT the board in
         memory. Expects an open serial connection.
 
-        :return: The current square set representing the chess pieces on the board.
+        :return: The bitboard of occupied squares.
         """
-        self._conn.write(b"print\r\n")
+        self._conn.write(interface_protocol.PRINT_COMMAND)
+        if self._protocol_mode == interface_enums.ProtocolMode.BINARY:
+            frame = self._conn.read(interface_protocol.FRAME_LENGTH)
+            try:
+                return interface_protocol.decode_bitboard_frame(frame)
+            except interface_exceptions.ChessboardInterfaceBadResponseError:
+                # Drop whatever is left so the next frame starts aligned again
+                self._conn.reset_input_buffer()
+                raise
         first_line = self._conn.readline()
-        if first_line != b"Printing pieces\r\n":
+        if first_line != interface_protocol.PRINT_ASCII_HEADER:
             raise interface_exceptions.ChessboardInterfaceBadResponseError(
                 f"Unexpected first line response from chessboard when querying for "
                 f"current bitboard: {first_line}")
-        ss = chess.SquareSet()
-        for row in range(8):
-            line = self._conn.readline().strip().split(b" ")
-            for col, col_char in enumerate(line):
-                # Oddly enough "0" is a piece, "." is empty
-                if col_char == b"0":
-                    ss.add(chess.square(col, 7 - row))
-                elif col_char == b".":
-                    continue
-                else:
-                    raise interface_exceptions.ChessboardInterfaceBadResponseError(
-                        f"Unexpected piece character in row {row} col {col}: {col_char}")
-        return ss
+        return interface_protocol.decode_ascii_rows(
+            [self._conn.readline() for _ in range(8)])
+
+    @property
+    def position(self) -> Position:
+        """
+        Returns the current position, which a ChessGame can be played on so both share
+        it. It is only safe to read on the thread updating the interface, other threads
+        should read the manager's snapshot instead.
+
+        :return: The current position.
+        """
+        return self._position
 
     @property
     def board(self) -> chess.Board:
         """
-        Returns the current board.
+        Returns the board of the current position. It must not be modified, and is
+        only safe to read on the thread updating the interface. Other threads should
+        read the manager's snapshot instead.
 
         :return: The current board.
         """
-        return self._curr_board.copy()
+        return self._position.board
 
     def reset_board(self):
         """
-        Resets the current board to the initial position.
+        Resets the current position to the initial position.
         """
-        self._curr_board.reset()
-        self._square_set_history = []
+        self._position.reset()
+        if self._recorder is not None:
+            self._recorder.record_reset()
         logger.debug("Reset current board to initial position")
 
+    def add_moves(self, moves: Iterable[chess.Move]) -> int:
+        """
+        Adds many moves to the current position at once, like to resume a game, up to
+        the first illegal one.
+
+        :param moves: The moves to add.
+        :return: The number of moves added.
+        """
+        added = 0
+        for move in moves:
+            if not self._position.board.is_legal(move):
+                logger.warning(f"Not adding illegal move {move.uci()}")
+                break
+            self._position.push(move)
+            if self._recorder is not None:
+                self._recorder.record_move(move)
+            added += 1
+        return added
+
+    @property
+    def detected_occupancy(self) -> Optional[int]:
+        """
+        Returns the occupancy move detection last ran on, after the occupancy filter.
+
+        :return: The bitboard of occupied squares, or None if nothing was read yet.
+        """
+        return self._detected_occupancy
+
     def check_for_possible_move(self) -> Optional[chess.Move]:
         """
         Check for a possible move on the chessboard. This is done by comparing the
@@ -117,146 +364,180 @@ class ChessboardInterface:
         update the current board, but will return a move if the current differences
         represent a legal move. Use `add_move` to update the current board.
 
+        When streaming, every occupancy received by `wait_for_change` since the last
+        check is run through move detection in order, the physical board being the last
+        one, and the previous result is returned as long as neither it nor the current
+        board has changed.
+
         :return: A move if a legal move is found, None otherwise.
         """
-        if not self._conn:
+        if not self.connected:
             raise interface_exceptions.ChessboardInterfaceConnectionError(
                 "No connection to update from")
 
-        curr_square_set = self._get_curr_board_square_set()
-        physical_square_set = self._get_physical_square_set()
-        additions = physical_square_set - curr_square_set
-        removals = curr_square_set - physical_square_set
+        if self._streaming:
+            # The filter may still settle on the last frame as time passes
+            if not self._stream_dirty and not self._occupancy_filter.pending and \
+                    self._detected_position_version == self._position.version:
+                self._detection_stats.skipped += 1
+                return self._possible_move
+            self._stream_dirty = False
+            if self._streamed_bitboard is None:
+                self._possible_move = None
+                return None
+            while len(self._unprocessed_bitboards) > 1:
+                self._process_sample(self._unprocessed_bitboards.popleft())
+            self._unprocessed_bitboards.clear()
+            bitboard = self._streamed_bitboard
+        else:
+            bitboard = self._get_physical_bitboard()
+        return self._process_sample(bitboard)
+
+    @property
+    def occupancy_filter(self) -> OccupancyFilter:
+        """
+        Returns the filter occupancies go through before move detection, which also
+        counts how many samples it suppressed.
 
-        self._square_set_history.append(physical_square_set)
-        remove_adjacent_duplicates(self._square_set_history)
+        :return: The occupancy filter.
+        """
+        return self._occupancy_filter
+
+    @property
+    def detection_stats(self) -> interface_dataclasses.EvaluationStats:
+        """
+        Returns how often move detection was skipped because neither the occupancy nor
+        the current position changed, versus how often it actually ran.
+
+        :return: The move detection counters.
+        """
+        return self._detection_stats
+
+    def _sample_time(self) -> float:
+        """
+        Returns the time of the occupancy being processed, for the occupancy filter.
+
+        :return: The time in seconds.
+        """
+        return time.monotonic()
+
+    def _process_sample(self, bitboard: int) -> Optional[chess.Move]:
+        """
+        Runs an occupancy read from the chessboard through recording, the occupancy
+        filter and move detection.
+
+        :param bitboard: The bitboard of occupied squares read from the chessboard.
+        :return: A move if a legal move is found, None otherwise.
+        """
+        if self._recorder is not None:
+            self._recorder.record_sample(bitboard)
+        timestamp = self._sample_time()
+        filtered = self._occupancy_filter.filter(bitboard, timestamp)
+        if filtered is None:
+            # Suppressed, so the filtered occupancy did not change
+            filtered = self._occupancy_filter.output
+        if filtered == self._detected_occupancy and \
+                self._detected_position_version == self._position.version:
+            # The occupancy history skips repeats, so the last result still stands
+            self._detection_stats.skipped += 1
+            return self._possible_move
+        self._detection_stats.evaluated += 1
+        self._detected_occupancy = filtered
+        self._detected_position_version = self._position.version
+        self._possible_move = self._find_possible_move(filtered, timestamp)
+        return self._possible_move
+
+    def _get_move_index(self) -> MoveIndex:
+        """
+        Gets the index from occupancy changes to legal moves for the current position,
+        building it if the current position changed since it was last built.
+
+        :return: The move index.
+        """
+        if self._move_index_version != self._position.version:
+            self._move_index = build_move_index(self._position.board)
+            self._move_index_version = self._position.version
+        return self._move_index
+
+    def _find_possible_move(self, physical_bitboard: int,
+                            timestamp: float) -> Optional[chess.Move]:
+        """
+        Finds the legal move, if any, that the physical board represents compared to
+        the current board.
+
+        :param physical_bitboard: The bitboard of occupied squares of the physical
+         board.
+        :param timestamp: When the occupancy was read, in seconds.
+        :return: A move if a legal move is found, None otherwise.
+        """
+        occupied = self._position.occupied
+        additions = physical_bitboard & ~occupied
+        removals = occupied & ~physical_bitboard
+        addition_count = additions.bit_count()
+        removal_count = removals.bit_count()
+
+        if self._history_position_version != self._position.version:
+            # What happened before the position changed belongs to the last move
+            self._history_position_version = self._position.version
+            self._occupancy_history.clear()
+        self._occupancy_history.append(physical_bitboard, timestamp)
 
         move = None
-        if len(removals) == 0 and len(additions) == 0:
+        if removal_count == 0 and addition_count == 0:
             # Board state matches logical board, clear history
-            self._square_set_history = []
-        # print(f"removals: {len(removals)}, additions: {len(additions)}")
-        # print(f"square set history: {len(self._square_set_history)} "
-        #       f"{self._square_set_history}")
-        # print(self._curr_board)
-
-        # Single piece moved or promotion
-        if len(removals) == 1 and len(additions) == 1:
-            removed_square = removals.pop()
-            added_square = additions.pop()
-            try:
-                move = self._curr_board.find_move(removed_square, added_square)
-                # Wait for rook to move as well or
-                # wait for pawn to be captured to be lifted from the board or
-                if self._curr_board.is_castling(move) or \
-                        self._curr_board.is_en_passant(move):
-                    move = None
-            except chess.IllegalMoveError:
-                pass
-        # Capture or capturing promotion
-        elif len(removals) == 1 and len(additions) == 0:
-            try:
-                from_capture_square = removals.pop()
-                possible_moves = []
-                for m in self._curr_board.legal_moves:
-                    if m.from_square == from_capture_square and self._curr_board.is_capture(
-                            m):
-                        possible_moves.append(m)
-                # print(f"possible capture moves: {len(possible_moves)} {possible_moves}")
-                if len(possible_moves) == 1:
-                    move = possible_moves[0]
-                elif len(possible_moves) > 1:
-                    # Ambiguous case, check history as we must have captured a state
-                    # where the board had both pieces lifted
-                    # hist[-1] = current state (from square empty, to square has the capturer)
-                    # hist[-2] = other piece lifted (now both from and to squares are empty)
-                    # hist[-3] = either captured or capturer lifted
-                    if len(self._square_set_history) > 2:
-                        current = self._square_set_history[-1]
-                        both_lifted = copy(self._square_set_history[-2])
-                        to_capture_square = (current - both_lifted).pop()
-                        move = self._curr_board.find_move(from_capture_square,
-                                                          to_capture_square)
-                # Wait for pawn to be captured to be lifted from the board
-                if move is not None and self._curr_board.is_en_passant(move):
-                    move = None
-            except (chess.IllegalMoveError, IndexError, KeyError):
-                pass
-        # Castling
-        elif len(removals) == 2 and len(additions) == 2:
-            white_kingside_castling_removals = chess.SquareSet(0x0000_0000_0000_0090)
-            white_kingside_castling_additions = chess.SquareSet(0x0000_0000_0000_0060)
-            white_queenside_castling_removals = chess.SquareSet(0x0000_0000_0000_0011)
-            white_queenside_castling_additions = chess.SquareSet(0x0000_0000_0000_000C)
-            black_kingside_castling_removals = chess.SquareSet(0x9000_0000_0000_0000)
-            black_kingside_castling_additions = chess.SquareSet(0x6000_0000_0000_0000)
-            black_queenside_castling_removals = chess.SquareSet(0x1100_0000_0000_0000)
-            black_queenside_castling_additions = chess.SquareSet(0x0C00_0000_0000_0000)
-            try:
-                if self._curr_board.turn == chess.WHITE:
-                    # White kingside castling
-                    if removals == white_kingside_castling_removals and \
-                            additions == white_kingside_castling_additions:
-                        move = self._curr_board.find_move(chess.E1, chess.G1)
-                    # White queenside castling
-                    elif removals == white_queenside_castling_removals and \
-                            additions == white_queenside_castling_additions:
-                        move = self._curr_board.find_move(chess.E1, chess.C1)
-                else:
-                    # Black kingside castling
-                    if removals == black_kingside_castling_removals and \
-                            additions == black_kingside_castling_additions:
-                        move = self._curr_board.find_move(chess.E8, chess.G8)
-                    # Black queenside castling
-                    elif removals == black_queenside_castling_removals and \
-                            additions == black_queenside_castling_additions:
-                        move = self._curr_board.find_move(chess.E8, chess.C8)
-            except chess.IllegalMoveError:
-                pass
-        # En passant
-        elif len(removals) == 2 and len(additions) == 1:
-            try:
-                to_square = additions.pop()
-                from_squares = [removals.pop(), removals.pop()]
-                from_square = None
-                # The to_square must be on a different file than the from_square, as the
-                # captured pawn is on the same file
-                if chess.square_file(from_squares[0]) != chess.square_file(to_square):
-                    from_square = from_squares[0]
-                else:
-                    from_square = from_squares[1]
-                move = self._curr_board.find_move(from_square, to_square)
-            except chess.IllegalMoveError:
-                pass
+            self._occupancy_history.clear()
+
+        # Look up the legal moves that make exactly these removals and additions.
+        # Partially made moves, like a castling king without its rook or an en passant
+        # capture with the captured pawn still on the board, are not in the index.
+        possible_moves = self._get_move_index().get((removals, additions), [])
+        # Capture or capturing promotion, the capturer can take more than one piece
+        if removal_count == 1 and addition_count == 0 and \
+                len({m.to_square for m in possible_moves}) > 1:
+            # Ambiguous case, check history as we must have captured a state
+            # where the board had both pieces lifted
+            # hist[-1] = current state (from square empty, to square has the capturer)
+            # hist[-2] = other piece lifted (now both from and to squares are empty)
+            # hist[-3] = either captured or capturer lifted
+            if len(self._occupancy_history) > 2:
+                both_lifted, current = self._occupancy_history.last(2)
+                to_capture_square = chess.lsb(current & ~both_lifted) \
+                    if current & ~both_lifted else None
+                move = default_move([m for m in possible_moves
+                                     if m.to_square == to_capture_square])
+        else:
+            move = default_move(possible_moves)
         # First time startup and all pieces present
-        elif len(removals) == 0 and len(additions) == 32:
-            self._curr_board.reset()
-            self._square_set_history = []
+        if removal_count == 0 and addition_count == 32:
+            self._position.reset()
+            self._history_position_version = self._position.version
+            self._occupancy_history.clear()
         # # Testing promotion with FEN
         # # 4k3/P7/8/8/8/8/8/4K3
         # elif len(additions) == 3:
         #     self._curr_board = chess.Board("4k3/P7/8/8/8/8/8/4K3")
-        #     self._square_set_history = []
+        #     self._occupancy_history.clear()
         # # Testing capturing promotion with FEN
         # # 1n2k3/P7/8/8/8/8/8/4K3
         # elif len(additions) == 4:
         #     self._curr_board = chess.Board("1n2k3/P7/8/8/8/8/8/4K3")
-        #     self._square_set_history = []
+        #     self._occupancy_history.clear()
 
         return move
 
     def add_move(self, move: chess.Move):
         """
-        Adds a move to the current board. This will update the current board to reflect
-        the move.
+        Adds a move to the current position, which is the only place it is pushed, as
+        the game played on the chessboard shares the position.
 
         :param move: The move to add.
         """
-        if not self._conn:
+        if not self.connected:
             raise interface_exceptions.ChessboardInterfaceConnectionError(
                 "No connection to update from")
-        self._curr_board.push(move)
-        self._square_set_history = []
+        self._position.push(move)
+        if self._recorder is not None:
+            self._recorder.record_move(move)
         logger.debug(f"Added move {move} to current board")
 
     # def _differences_to_current(self) -> interface_dataclasses.SquareDifferencesToMatch:
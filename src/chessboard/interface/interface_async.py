@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from typing import Optional
+
+import chess
+import serial.serialutil
+from serial import Serial
+
+from chessboard.interface import ChessboardInterface, interface_enums, \
+    interface_exceptions, interface_protocol
+from chessboard.interface.interface_filters import OccupancyFilter
+from game.position import Position
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How long to wait for a response from the chessboard, same as the blocking interface
+RESPONSE_TIMEOUT = 1
+
+
+class AsyncChessboardInterface(ChessboardInterface):
+    """
+    Variant of ChessboardInterface for use in an asyncio event loop. The serial port is
+    opened non-blocking and its file descriptor is watched by the event loop, so
+    waiting for the chessboard never blocks other tasks. Use the `_async` methods
+    instead of their blocking counterparts. Only works on POSIX systems, where pyserial
+    exposes a file descriptor.
+    """
+    _loop: Optional[asyncio.AbstractEventLoop]
+    # Bytes received outside of streaming, waiting to be consumed by a response
+    _rx_buffer: bytearray
+    _rx_event: Optional[asyncio.Event]
+    _stream_event: Optional[asyncio.Event]
+
+    def __init__(self, occupancy_filter: Optional[OccupancyFilter] = None,
+                 position: Optional[Position] = None):
+        """
+        :param occupancy_filter: The filter to run occupancies read from the chessboard
+         through before move detection. Defaults to no filtering.
+        :param position: The current position, to share it with a game. Defaults to a
+         new, empty position.
+        """
+        super().__init__(occupancy_filter, position)
+        self._loop = None
+        self._rx_buffer = bytearray()
+        self._rx_event = None
+        self._stream_event = None
+
+    async def connect_async(self, port: str, binary: bool = True, stream: bool = True):
+        """
+        Connect to the chessboard via the specified serial port.
+
+        :param port: The serial port to connect to.
+        :param binary: Whether to try to negotiate binary bitboard frames with the
+         chessboard. If the chessboard does not acknowledge, the ASCII protocol is used.
+        :param stream: Whether to try to subscribe to occupancy changes from the
+         chessboard instead of polling it. Requires binary mode.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._rx_event = asyncio.Event()
+        self._stream_event = asyncio.Event()
+        try:
+            # A timeout of 0 makes reads return whatever is already received
+            self._conn = Serial(port, baudrate=115200, timeout=0)
+            self._loop.add_reader(self._conn.fileno(), self._on_readable)
+            logger.debug(f"Connected to chessboard on port {port}")
+            # Clear command buffer
+            self._conn.write(interface_protocol.CLEAR_COMMAND)
+            self._protocol_mode = interface_enums.ProtocolMode.ASCII
+            self._streaming = False
+            if binary:
+                await self._negotiate_binary_mode_async()
+                if stream and self._protocol_mode == interface_enums.ProtocolMode.BINARY:
+                    await self._subscribe_async()
+        except serial.serialutil.SerialException:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                f"Failed to connect to chessboard on port {port}")
+
+    def disconnect(self):
+        """
+        Disconnect from the chessboard.
+        """
+        if self._conn and self._loop:
+            self._loop.remove_reader(self._conn.fileno())
+        super().disconnect()
+
+    def _on_readable(self):
+        """
+        Called by the event loop when the serial port has data to read.
+        """
+        data = self._conn.read(self._conn.in_waiting or 1)
+        if not data:
+            return
+        if self._streaming:
+            if self._feed_stream(data):
+                self._stream_event.set()
+        else:
+            self._rx_buffer += data
+            self._rx_event.set()
+
+    def _clear_rx_buffer(self):
+        """
+        Drops all bytes received so far, like `reset_input_buffer` does for the blocking
+        interface.
+        """
+        self._conn.reset_input_buffer()
+        self._rx_buffer.clear()
+
+    async def _read_until(self, size: Optional[int] = None,
+                          timeout: float = RESPONSE_TIMEOUT) -> bytes:
+        """
+        Waits for a line, or a fixed amount of bytes, from the chessboard.
+
+        :param size: The amount of bytes to read. If None, reads up to and including
+         the next newline.
+        :param timeout: The maximum time to wait in seconds.
+        :return: The bytes read. Like pyserial, this is shorter than expected (possibly
+         empty) on timeout.
+        """
+        deadline = self._loop.time() + timeout
+        while True:
+            if size is None:
+                end = self._rx_buffer.find(b"\n") + 1
+            else:
+                end = size if len(self._rx_buffer) >= size else 0
+            remaining = deadline - self._loop.time()
+            if end == 0 and remaining > 0:
+                self._rx_event.clear()
+                try:
+                    await asyncio.wait_for(self._rx_event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if end == 0:
+                # Timed out, return whatever arrived
+                end = len(self._rx_buffer)
+            data = bytes(self._rx_buffer[:end])
+            del self._rx_buffer[:end]
+            return data
+
+    async def _negotiate_binary_mode_async(self):
+        """
+        Asks the chessboard to answer "print" queries with binary bitboard frames
+        instead of ASCII rows. Falls back to the ASCII protocol if the chessboard does
+        not acknowledge.
+        """
+        self._clear_rx_buffer()
+        self._conn.write(interface_protocol.BINARY_MODE_COMMAND)
+        # Skip over anything the firmware still echoes from clearing the command buffer
+        for _ in range(4):
+            line = await self._read_until()
+            if line == interface_protocol.BINARY_MODE_ACK:
+                self._protocol_mode = interface_enums.ProtocolMode.BINARY
+                logger.debug("Chessboard acknowledged binary mode")
+                return
+            elif line == b"":
+                break
+        self._clear_rx_buffer()
+        logger.debug("Chessboard did not acknowledge binary mode, using ASCII mode")
+
+    async def _subscribe_async(self):
+        """
+        Asks the chessboard to send a binary bitboard frame by itself whenever the
+        occupancy changes. Stays polling if the chessboard does not acknowledge.
+        """
+        self._conn.write(interface_protocol.STREAM_COMMAND)
+        if await self._read_until() == interface_protocol.STREAM_ACK:
+            self._streaming = True
+            self._frame_decoder = interface_protocol.BitboardFrameDecoder()
+            self._streamed_bitboard = None
+            self._unprocessed_bitboards.clear()
+            self._stream_dirty = True
+            # The first frame may have arrived together with the acknowledgement
+            if self._rx_buffer and self._feed_stream(bytes(self._rx_buffer)):
+                self._stream_event.set()
+            self._rx_buffer.clear()
+            logger.debug("Subscribed to occupancy changes from chessboard")
+        else:
+            self._clear_rx_buffer()
+            logger.debug("Chessboard did not acknowledge streaming, polling instead")
+
+    async def _get_physical_bitboard_async(self) -> int:
+        """
+        Gets the bitboard of occupied squares on the physical board, NOT the board in
+        memory. Expects an open serial connection.
+
+        :return: The bitboard of occupied squares.
+        """
+        self._conn.write(interface_protocol.PRINT_COMMAND)
+        if self._protocol_mode == interface_enums.ProtocolMode.BINARY:
+            frame = await self._read_until(interface_protocol.FRAME_LENGTH)
+            try:
+                return interface_protocol.decode_bitboard_frame(frame)
+            except interface_exceptions.ChessboardInterfaceBadResponseError:
+                # Drop whatever is left so the next frame starts aligned again
+                self._clear_rx_buffer()
+                raise
+        first_line = await self._read_until()
+        if first_line != interface_protocol.PRINT_ASCII_HEADER:
+            raise interface_exceptions.ChessboardInterfaceBadResponseError(
+                f"Unexpected first line response from chessboard when querying for "
+                f"current bitboard: {first_line}")
+        return interface_protocol.decode_ascii_rows(
+            [await self._read_until() for _ in range(8)])
+
+    async def wait_for_change_async(self, timeout: float) -> bool:
+        """
+        Waits until the chessboard reports an occupancy change. Only waits when
+        streaming, otherwise returns True right away as every poll is a new reading.
+
+        :param timeout: The maximum time to wait in seconds.
+        :return: True if a new occupancy was received, False on timeout.
+        """
+        if not self._streaming:
+            return True
+        if not self._conn:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                "No connection to update from")
+        try:
+            await asyncio.wait_for(self._stream_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._stream_event.clear()
+        return True
+
+    async def read_occupancy_async(self) -> Optional[int]:
+        """
+        Reads the occupancy of the chessboard to check for a possible move, separately
+        from move detection, so the current position is only read once the caller holds
+        whatever guards it. See `check_occupancy`.
+
+        :return: The bitboard of occupied squares, or None when streaming, as frames
+         are already received as they arrive.
+        """
+        if not self._conn:
+            raise interface_exceptions.ChessboardInterfaceConnectionError(
+                "No connection to update from")
+        if self._streaming:
+            return None
+        return await self._get_physical_bitboard_async()
+
+    def check_occupancy(self, bitboard: Optional[int]) -> Optional[chess.Move]:
+        """
+        Check for a possible move on the chessboard, on an occupancy read with
+        `read_occupancy_async`. See `check_for_possible_move`.
+
+        :param bitboard: The occupancy read.
+        :return: A move if a legal move is found, None otherwise.
+        """
+        if bitboard is None:
+            return self.check_for_possible_move()
+        return self._process_sample(bitboard)
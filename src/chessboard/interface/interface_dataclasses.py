@@ -1,10 +1,9 @@
-# from dataclasses import dataclass
-# from typing import Optional
-#
-# import chess
+from dataclasses import dataclass
+from typing import Optional
 
+import chess
 
-# from chessboard import interface_enums
+from chessboard.interface import interface_enums
 
 
 # @dataclass
@@ -91,3 +90,62 @@
 #     """
 #     move: Optional[chess.Move]
 #     square_diffs: SquareDifferencesToMatch
+
+
+@dataclass
+class RecordedEvent:
+    """
+    Represents an event in a recorded session.
+    """
+    # Seconds since the start of the recording
+    timestamp: float
+    type: interface_enums.RecordedEventType
+    # The occupancy read from the sensors, for SAMPLE events
+    bitboard: Optional[int] = None
+    # The confirmed move, for MOVE events
+    move: Optional[chess.Move] = None
+
+
+@dataclass
+class ReplayStats:
+    """
+    Represents the results of replaying a recorded session.
+    """
+    samples: int = 0
+    moves: int = 0
+    # Confirmed moves that were detected as the possible move when confirmed
+    detected_moves: int = 0
+    # Seconds spent replaying
+    elapsed: float = 0
+
+    @property
+    def missed_moves(self) -> int:
+        """
+        Returns the number of confirmed moves that were not detected.
+        """
+        return self.moves - self.detected_moves
+
+    @property
+    def samples_per_second(self) -> float:
+        """
+        Returns how many samples were run through move detection per second.
+        """
+        return self.samples / self.elapsed if self.elapsed > 0 else 0
+
+
+@dataclass
+class EvaluationStats:
+    """
+    Counts how often an evaluation was skipped because nothing it depends on changed,
+    versus actually done.
+    """
+    skipped: int = 0
+    evaluated: int = 0
+
+    @property
+    def skipped_ratio(self) -> float:
+        """
+        Returns the fraction of evaluations that were skipped.
+        """
+        total = self.skipped + self.evaluated
+        return self.skipped / total if total > 0 else 0
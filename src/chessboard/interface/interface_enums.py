@@ -1,6 +1,17 @@
-# from enum import Enum
-#
-#
+from enum import Enum
+
+
 # class SquareDifferenceType(Enum):
 #     ADD = "ADD"
 #     REMOVE = "REMOVE"
+
+
+class ProtocolMode(Enum):
+    ASCII = "ASCII"
+    BINARY = "BINARY"
+
+
+class RecordedEventType(Enum):
+    SAMPLE = "SAMPLE"
+    MOVE = "MOVE"
+    RESET = "RESET"
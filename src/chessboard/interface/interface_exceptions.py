@@ -15,3 +15,9 @@ class ChessboardInterfaceBadResponseError(ChessboardInterfaceError):
     """
     Raised when the chessboard returns an unexpected response.
     """
+
+
+class ChessboardInterfaceRecordingError(ChessboardInterfaceError):
+    """
+    Raised when a recorded session can't be read.
+    """
@@ -0,0 +1,163 @@
+from collections import deque
+from typing import Optional
+
+import chess
+
+
+class OccupancyFilter:
+    """
+    Sits between reading the chessboard and move detection, to keep noisy sensor
+    readings from reaching move detection. This base class passes every sample
+    through, subclasses implement actual filtering in `_filter`.
+    """
+    # The number of samples filtered
+    samples: int
+    # The number of samples that did not match the filtered occupancy
+    suppressed: int
+    # The filtered occupancy, None before the first sample
+    output: Optional[int]
+
+    def __init__(self):
+        self.samples = 0
+        self.suppressed = 0
+        self.output = None
+
+    def filter(self, bitboard: int, timestamp: float) -> Optional[int]:
+        """
+        Filters an occupancy read from the chessboard.
+
+        :param bitboard: The bitboard of occupied squares read from the chessboard.
+        :param timestamp: When the occupancy was read, in seconds.
+        :return: The filtered occupancy, or None if the sample was suppressed and the
+         filtered occupancy did not change, so move detection can be skipped.
+        """
+        self.samples += 1
+        previous = self.output
+        self.output = self._filter(bitboard, timestamp)
+        if self.output != bitboard:
+            self.suppressed += 1
+            if self.output == previous:
+                return None
+        return self.output
+
+    def _filter(self, bitboard: int, timestamp: float) -> int:
+        """
+        Calculates the filtered occupancy after a new sample.
+
+        :param bitboard: The bitboard of occupied squares read from the chessboard.
+        :param timestamp: When the occupancy was read, in seconds.
+        :return: The filtered occupancy.
+        """
+        return bitboard
+
+    @property
+    def pending(self) -> bool:
+        """
+        Returns whether the filtered occupancy can change by just repeating the last
+        sample. When streaming, the chessboard only sends changes, so the last sample
+        has to be repeated until this is False.
+
+        :return: True if the filter is waiting to settle, False otherwise.
+        """
+        return False
+
+
+class VotingFilter(OccupancyFilter):
+    """
+    Considers a square occupied if it was occupied in at least N of the last M
+    samples.
+    """
+    _votes_needed: int
+    _window: deque[int]
+
+    def __init__(self, votes_needed: int, window: int):
+        """
+        :param votes_needed: N, the number of samples a square must be occupied in.
+        :param window: M, the number of samples to vote over.
+        """
+        super().__init__()
+        if not 0 < votes_needed <= window:
+            raise ValueError(f"Can't need {votes_needed} votes out of {window}")
+        self._votes_needed = votes_needed
+        self._window = deque(maxlen=window)
+
+    def _filter(self, bitboard: int, timestamp: float) -> int:
+        self._window.append(bitboard)
+        # Until the window is full, vote over the samples there are
+        votes_needed = min(self._votes_needed, len(self._window))
+        occupied_in_all = chess.BB_ALL
+        occupied_in_any = chess.BB_EMPTY
+        for sample in self._window:
+            occupied_in_all &= sample
+            occupied_in_any |= sample
+        # Only count votes for the few squares the samples disagree on
+        result = occupied_in_all
+        for square in chess.scan_forward(occupied_in_any & ~occupied_in_all):
+            square_bb = chess.BB_SQUARES[square]
+            votes = sum(1 for sample in self._window if sample & square_bb)
+            if votes >= votes_needed:
+                result |= square_bb
+        return result
+
+    @property
+    def pending(self) -> bool:
+        return any(sample != self._window[-1] for sample in self._window) \
+            if self._window else False
+
+
+class DwellFilter(OccupancyFilter):
+    """
+    Only accepts an occupancy after it has been read without changes for a minimum
+    amount of time.
+    """
+    _min_dwell: float
+    _candidate: Optional[int]
+    _candidate_since: float
+
+    def __init__(self, min_dwell: float):
+        """
+        :param min_dwell: How long an occupancy must be stable for, in seconds.
+        """
+        super().__init__()
+        self._min_dwell = min_dwell
+        self._candidate = None
+        self._candidate_since = 0
+
+    def _filter(self, bitboard: int, timestamp: float) -> int:
+        if self.output is None:
+            # Nothing to compare the first sample to
+            self._candidate = bitboard
+            return bitboard
+        if bitboard != self._candidate:
+            self._candidate = bitboard
+            self._candidate_since = timestamp
+        if timestamp - self._candidate_since >= self._min_dwell:
+            return self._candidate
+        return self.output
+
+    @property
+    def pending(self) -> bool:
+        return self._candidate != self.output
+
+
+def parse_occupancy_filter(spec: Optional[str]) -> OccupancyFilter:
+    """
+    Creates an occupancy filter from a command line specification, "vote:N/M" for a
+    VotingFilter or "dwell:MS" for a DwellFilter with a minimum dwell in milliseconds.
+
+    :param spec: The specification, None or "none" for no filtering.
+    :return: The occupancy filter.
+    """
+    if spec is None or spec.lower() == "none":
+        return OccupancyFilter()
+    kind, _, params = spec.lower().partition(":")
+    try:
+        if kind == "vote":
+            votes_needed, window = params.split("/")
+            return VotingFilter(int(votes_needed), int(window))
+        elif kind == "dwell":
+            return DwellFilter(float(params) / 1000)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid occupancy filter \"{spec}\", expected \"vote:N/M\", "
+                     f"\"dwell:MS\" or \"none\"")
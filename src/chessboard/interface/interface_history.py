@@ -0,0 +1,75 @@
+from collections import deque
+
+# Enough to cover every physical step of a move, even with a few pieces knocked over
+OCCUPANCY_HISTORY_CAPACITY = 32
+
+
+class OccupancyHistory:
+    """
+    Tracks the distinct occupancies read since the last move, with when each was first
+    read. An occupancy that is the same as the newest one is ignored, and once full the
+    oldest occupancy is dropped, so appending is O(1) and memory stays bounded no
+    matter how long a piece stays lifted.
+    """
+    _bitboards: deque[int]
+    _timestamps: deque[float]
+
+    def __init__(self, capacity: int = OCCUPANCY_HISTORY_CAPACITY):
+        """
+        :param capacity: The maximum number of occupancies to keep.
+        """
+        self._bitboards = deque(maxlen=capacity)
+        self._timestamps = deque(maxlen=capacity)
+
+    def append(self, bitboard: int, timestamp: float) -> bool:
+        """
+        Adds an occupancy, unless it is the same as the newest one.
+
+        :param bitboard: The bitboard of occupied squares.
+        :param timestamp: When the occupancy was read, in seconds.
+        :return: True if the occupancy was added, False if it was a duplicate.
+        """
+        if self._bitboards and self._bitboards[-1] == bitboard:
+            return False
+        self._bitboards.append(bitboard)
+        self._timestamps.append(timestamp)
+        return True
+
+    def clear(self):
+        """
+        Removes all occupancies.
+        """
+        self._bitboards.clear()
+        self._timestamps.clear()
+
+    def __len__(self) -> int:
+        return len(self._bitboards)
+
+    def __getitem__(self, index: int) -> int:
+        """
+        Gets an occupancy, like a list with the newest occupancy last, so -1 is the
+        newest and -2 the one before it.
+
+        :param index: The index of the occupancy.
+        :return: The bitboard of occupied squares.
+        """
+        return self._bitboards[index]
+
+    def timestamp(self, index: int) -> float:
+        """
+        Gets when an occupancy was first read, indexed like `__getitem__`.
+
+        :param index: The index of the occupancy.
+        :return: The time in seconds.
+        """
+        return self._timestamps[index]
+
+    def last(self, n: int) -> list[int]:
+        """
+        Gets the newest distinct occupancies.
+
+        :param n: The maximum number of occupancies to get.
+        :return: The bitboards of occupied squares, oldest first.
+        """
+        n = min(n, len(self._bitboards))
+        return [self._bitboards[i] for i in range(-n, 0)]
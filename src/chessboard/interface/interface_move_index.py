@@ -0,0 +1,66 @@
+from typing import Optional
+
+import chess
+
+# Maps the squares a move empties and the squares it fills to the legal moves that
+# change the occupancy like that
+MoveIndex = dict[tuple[int, int], list[chess.Move]]
+
+
+def occupancy_change(board: chess.Board, move: chess.Move) -> tuple[int, int]:
+    """
+    Calculates how a move changes the occupancy of the board, without making it.
+
+    :param board: The board before the move.
+    :param move: The move, must be legal.
+    :return: The bitboard of squares the move empties, and the bitboard of squares it
+     fills.
+    """
+    from_bb = chess.BB_SQUARES[move.from_square]
+    to_bb = chess.BB_SQUARES[move.to_square]
+    if board.is_castling(move):
+        rank_shift = chess.square_rank(move.from_square) * 8
+        if board.is_kingside_castling(move):
+            removed = chess.BB_E1 | chess.BB_H1
+            added = chess.BB_G1 | chess.BB_F1
+        else:
+            removed = chess.BB_E1 | chess.BB_A1
+            added = chess.BB_C1 | chess.BB_D1
+        return removed << rank_shift, added << rank_shift
+    elif board.is_en_passant(move):
+        captured_bb = chess.BB_SQUARES[chess.square(chess.square_file(move.to_square),
+                                                    chess.square_rank(move.from_square))]
+        return from_bb | captured_bb, to_bb
+    elif board.occupied & to_bb:
+        # Capture, the capturing piece takes the place of the captured piece
+        return from_bb, chess.BB_EMPTY
+    return from_bb, to_bb
+
+
+def build_move_index(board: chess.Board) -> MoveIndex:
+    """
+    Builds the index from occupancy changes to the legal moves of a board, covering
+    quiet moves, captures, en passant, castling and promotions.
+
+    :param board: The board to index.
+    :return: The move index.
+    """
+    index: MoveIndex = {}
+    for move in board.legal_moves:
+        index.setdefault(occupancy_change(board, move), []).append(move)
+    return index
+
+
+def default_move(moves: list[chess.Move]) -> Optional[chess.Move]:
+    """
+    Picks the move to suggest out of moves that only differ in the promotion piece,
+    which is a queen like `chess.Board.find_move` would pick. The user picks the actual
+    promotion piece when confirming.
+
+    :param moves: The moves to pick from.
+    :return: The move to suggest, None if there are no moves.
+    """
+    for move in moves:
+        if move.promotion in (None, chess.QUEEN):
+            return move
+    return None
@@ -0,0 +1,142 @@
+import chess
+
+from chessboard.interface import interface_exceptions
+
+# Commands understood by the chessboard firmware
+CLEAR_COMMAND = b"\r\n\r\n"
+PRINT_COMMAND = b"print\r\n"
+BINARY_MODE_COMMAND = b"binary\r\n"
+STREAM_COMMAND = b"stream\r\n"
+
+# Responses from the chessboard firmware
+PRINT_ASCII_HEADER = b"Printing pieces\r\n"
+BINARY_MODE_ACK = b"Binary mode\r\n"
+STREAM_ACK = b"Streaming\r\n"
+
+# A binary bitboard frame is the header, then the 8 byte bitboard (little endian, bit
+# 0 is A1 and bit 63 is H8, same as python-chess) and then a single XOR checksum byte
+# of the bitboard bytes
+FRAME_HEADER = b"\xCB\xB0"
+FRAME_BITBOARD_LENGTH = 8
+FRAME_LENGTH = len(FRAME_HEADER) + FRAME_BITBOARD_LENGTH + 1
+
+
+def decode_ascii_rows(rows: list[bytes]) -> int:
+    """
+    Decodes the 8 rows the chessboard prints after PRINT_ASCII_HEADER in ASCII mode.
+
+    :param rows: The lines of the response, from rank 8 down to rank 1.
+    :return: The bitboard of occupied squares.
+    """
+    bitboard = chess.BB_EMPTY
+    for row, line in enumerate(rows):
+        for col, col_char in enumerate(line.strip().split(b" ")):
+            # Oddly enough "0" is a piece, "." is empty
+            if col_char == b"0":
+                bitboard |= chess.BB_SQUARES[chess.square(col, 7 - row)]
+            elif col_char == b".":
+                continue
+            else:
+                raise interface_exceptions.ChessboardInterfaceBadResponseError(
+                    f"Unexpected piece character in row {row} col {col}: {col_char}")
+    return bitboard
+
+
+def encode_ascii_rows(bitboard: int) -> list[bytes]:
+    """
+    Encodes a bitboard as the 8 rows the chessboard prints after PRINT_ASCII_HEADER in
+    ASCII mode.
+
+    :param bitboard: The bitboard of occupied squares.
+    :return: The lines of the response, from rank 8 down to rank 1.
+    """
+    return [b" ".join(b"0" if bitboard & chess.BB_SQUARES[chess.square(file, rank)]
+                      else b"." for file in range(8)) + b"\r\n"
+            for rank in range(7, -1, -1)]
+
+
+def frame_checksum(payload: bytes) -> int:
+    """
+    Calculates the checksum of a bitboard frame payload.
+
+    :param payload: The bitboard bytes of the frame.
+    :return: The XOR of all the bytes in the payload.
+    """
+    checksum = 0
+    for b in payload:
+        checksum ^= b
+    return checksum
+
+
+def encode_bitboard_frame(bitboard: int) -> bytes:
+    """
+    Encodes a bitboard into a binary frame, like the chessboard would send it.
+
+    :param bitboard: The bitboard of occupied squares.
+    :return: The encoded frame.
+    """
+    payload = bitboard.to_bytes(FRAME_BITBOARD_LENGTH, "little")
+    return FRAME_HEADER + payload + bytes((frame_checksum(payload),))
+
+
+def decode_bitboard_frame(frame: bytes) -> int:
+    """
+    Decodes a binary frame from the chessboard into a bitboard.
+
+    :param frame: The frame to decode, must be exactly FRAME_LENGTH bytes long.
+    :return: The bitboard of occupied squares.
+    """
+    if len(frame) != FRAME_LENGTH:
+        raise interface_exceptions.ChessboardInterfaceBadResponseError(
+            f"Expected a {FRAME_LENGTH} byte frame from chessboard, got "
+            f"{len(frame)} bytes: {frame}")
+    if frame[:len(FRAME_HEADER)] != FRAME_HEADER:
+        raise interface_exceptions.ChessboardInterfaceBadResponseError(
+            f"Unexpected frame header from chessboard: {frame}")
+    payload = frame[len(FRAME_HEADER):-1]
+    if frame_checksum(payload) != frame[-1]:
+        raise interface_exceptions.ChessboardInterfaceBadResponseError(
+            f"Bad frame checksum from chessboard: {frame}")
+    return int.from_bytes(payload, "little")
+
+
+class BitboardFrameDecoder:
+    """
+    Incrementally decodes a stream of binary bitboard frames, like the ones the
+    chessboard sends unsolicited when streaming. Resynchronizes on the frame header if
+    bytes are lost or corrupted.
+    """
+    _buffer: bytearray
+    bad_frames: int
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.bad_frames = 0
+
+    def feed(self, data: bytes) -> list[int]:
+        """
+        Feeds received bytes into the decoder.
+
+        :param data: The bytes received from the chessboard.
+        :return: The bitboards of all frames completed by these bytes, oldest first.
+        """
+        self._buffer += data
+        bitboards = []
+        while True:
+            start = self._buffer.find(FRAME_HEADER)
+            if start == -1:
+                # Keep the tail in case it is the start of a header
+                del self._buffer[:len(self._buffer) - (len(FRAME_HEADER) - 1)]
+                break
+            del self._buffer[:start]
+            if len(self._buffer) < FRAME_LENGTH:
+                break
+            try:
+                bitboards.append(decode_bitboard_frame(bytes(self._buffer[:FRAME_LENGTH])))
+                del self._buffer[:FRAME_LENGTH]
+            except interface_exceptions.ChessboardInterfaceBadResponseError:
+                # Header bytes can show up inside a payload, so only skip past this
+                # header and search again
+                self.bad_frames += 1
+                del self._buffer[:1]
+        return bitboards
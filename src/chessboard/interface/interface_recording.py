@@ -0,0 +1,247 @@
+import logging
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import chess
+
+from chessboard.interface import interface_dataclasses, interface_enums, \
+    interface_exceptions
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# A recording is the header, then records that each start with a tag byte and the
+# microseconds since the previous record as a varint
+RECORDING_MAGIC = b"CBREC"
+RECORDING_VERSION = 2
+# Version 1 recordings don't have the times of identical samples, which are spread out
+# evenly when reading them
+INTERPOLATED_REPEATS_VERSION = 1
+# Followed by the number of changed squares and then the changed squares, one byte each
+TAG_SAMPLE = 0
+# Followed by the number of identical samples as a varint, and then the microseconds
+# since the previous sample of all but the first as varints, the timestamp is of the
+# first of them. In version 1, only followed by the number of identical samples since
+# the previous record, the timestamp being of the last of them.
+TAG_REPEAT = 1
+# Followed by the from square, to square and promotion piece type (0 for none)
+TAG_MOVE = 2
+TAG_RESET = 3
+# The most bytes of times of identical samples kept before writing them
+MAX_PENDING_REPEAT_BYTES = 4096
+
+
+def _encode_varint(value: int) -> bytes:
+    """
+    Encodes an unsigned integer as a LEB128 varint.
+
+    :param value: The integer to encode.
+    :return: The encoded bytes.
+    """
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_exactly(f: BinaryIO, size: int) -> bytes:
+    """
+    Reads an exact amount of bytes of a record.
+
+    :param f: The file to read from.
+    :param size: The amount of bytes to read.
+    :return: The bytes read.
+    """
+    data = f.read(size)
+    if len(data) != size:
+        raise interface_exceptions.ChessboardInterfaceRecordingError(
+            "Recording ends in the middle of a record")
+    return data
+
+
+def _read_varint(f: BinaryIO) -> int:
+    """
+    Reads a LEB128 varint.
+
+    :param f: The file to read from.
+    :return: The decoded integer.
+    """
+    value = 0
+    shift = 0
+    while True:
+        b = _read_exactly(f, 1)
+        value |= (b[0] & 0x7F) << shift
+        if not b[0] & 0x80:
+            return value
+        shift += 7
+
+
+class SessionRecorder:
+    """
+    Records every occupancy read from the chessboard, along with confirmed moves and
+    resets, so a session can be replayed exactly. Samples are delta encoded against
+    the previous sample and runs of identical samples are collapsed to their times, so
+    an hour of readings takes a few hundred kilobytes.
+    """
+    _file: BinaryIO
+    _last_bitboard: int
+    _last_timestamp: int
+    _repeats: int
+    _first_repeat_timestamp: int
+    _last_repeat_timestamp: int
+    # The times of the identical samples collapsed so far but the first, as varints
+    _repeat_deltas: bytearray
+
+    def __init__(self, path: Path | str):
+        """
+        :param path: The path of the recording to create.
+        """
+        self._file = open(path, "wb")
+        self._file.write(RECORDING_MAGIC + bytes((RECORDING_VERSION,)))
+        self._last_bitboard = chess.BB_EMPTY
+        self._last_timestamp = time.monotonic_ns() // 1000
+        self._repeats = 0
+        self._first_repeat_timestamp = self._last_timestamp
+        self._last_repeat_timestamp = self._last_timestamp
+        self._repeat_deltas = bytearray()
+        logger.debug(f"Recording session to {path}")
+
+    def _write_record(self, tag: int, timestamp: int, payload: bytes = b""):
+        """
+        Writes a record.
+
+        :param tag: The tag of the record.
+        :param timestamp: The monotonic timestamp of the record in microseconds.
+        :param payload: The bytes after the timestamp.
+        """
+        self._file.write(bytes((tag,)) +
+                         _encode_varint(timestamp - self._last_timestamp) + payload)
+        self._last_timestamp = timestamp
+
+    def _flush_repeats(self):
+        """
+        Writes a record for the identical samples collapsed so far, if any.
+        """
+        if self._repeats > 0:
+            self._write_record(TAG_REPEAT, self._first_repeat_timestamp,
+                               _encode_varint(self._repeats) + self._repeat_deltas)
+            self._last_timestamp = self._last_repeat_timestamp
+            self._repeats = 0
+            self._repeat_deltas.clear()
+
+    def record_sample(self, bitboard: int):
+        """
+        Records an occupancy read from the chessboard.
+
+        :param bitboard: The bitboard of occupied squares.
+        """
+        timestamp = time.monotonic_ns() // 1000
+        changed = bitboard ^ self._last_bitboard
+        if not changed:
+            if len(self._repeat_deltas) >= MAX_PENDING_REPEAT_BYTES:
+                self._flush_repeats()
+            if self._repeats == 0:
+                self._first_repeat_timestamp = timestamp
+            else:
+                self._repeat_deltas += _encode_varint(
+                    timestamp - self._last_repeat_timestamp)
+            self._repeats += 1
+            self._last_repeat_timestamp = timestamp
+            return
+        self._flush_repeats()
+        squares = bytes(chess.scan_forward(changed))
+        self._write_record(TAG_SAMPLE, timestamp, bytes((len(squares),)) + squares)
+        self._last_bitboard = bitboard
+
+    def record_move(self, move: chess.Move):
+        """
+        Records a move confirmed by the user.
+
+        :param move: The confirmed move.
+        """
+        self._flush_repeats()
+        self._write_record(TAG_MOVE, time.monotonic_ns() // 1000,
+                           bytes((move.from_square, move.to_square,
+                                  move.promotion or 0)))
+        # Moves are rare, so make sure everything up to them survives a crash
+        self._file.flush()
+
+    def record_reset(self):
+        """
+        Records the current board being reset to the initial position.
+        """
+        self._flush_repeats()
+        self._write_record(TAG_RESET, time.monotonic_ns() // 1000)
+
+    def close(self):
+        """
+        Finishes and closes the recording.
+        """
+        self._flush_repeats()
+        self._file.close()
+        logger.debug("Stopped recording session")
+
+
+def read_session(path: Path | str) -> Iterator[interface_dataclasses.RecordedEvent]:
+    """
+    Reads the events of a recording. Collapsed identical samples are expanded again at
+    the times they were read, or spread out evenly since the previous record in version
+    1 recordings, which don't have their times.
+
+    :param path: The path of the recording.
+    :return: An iterator over the events of the recording, in order.
+    """
+    with open(path, "rb") as f:
+        header = f.read(len(RECORDING_MAGIC) + 1)
+        if header[:-1] != RECORDING_MAGIC:
+            raise interface_exceptions.ChessboardInterfaceRecordingError(
+                f"{path} is not a recording")
+        version = header[-1]
+        if version not in (INTERPOLATED_REPEATS_VERSION, RECORDING_VERSION):
+            raise interface_exceptions.ChessboardInterfaceRecordingError(
+                f"Unsupported recording version {version} in {path}")
+        bitboard = chess.BB_EMPTY
+        timestamp = 0
+        while tag_byte := f.read(1):
+            tag = tag_byte[0]
+            previous_timestamp = timestamp
+            timestamp += _read_varint(f)
+            if tag == TAG_SAMPLE:
+                for square in _read_exactly(f, _read_exactly(f, 1)[0]):
+                    bitboard ^= chess.BB_SQUARES[square]
+                yield interface_dataclasses.RecordedEvent(
+                    timestamp / 1_000_000, interface_enums.RecordedEventType.SAMPLE,
+                    bitboard=bitboard)
+            elif tag == TAG_REPEAT and version == INTERPOLATED_REPEATS_VERSION:
+                repeats = _read_varint(f)
+                for i in range(1, repeats + 1):
+                    t = previous_timestamp + \
+                        (timestamp - previous_timestamp) * i / repeats
+                    yield interface_dataclasses.RecordedEvent(
+                        t / 1_000_000, interface_enums.RecordedEventType.SAMPLE,
+                        bitboard=bitboard)
+            elif tag == TAG_REPEAT:
+                repeats = _read_varint(f)
+                for i in range(repeats):
+                    if i > 0:
+                        timestamp += _read_varint(f)
+                    yield interface_dataclasses.RecordedEvent(
+                        timestamp / 1_000_000,
+                        interface_enums.RecordedEventType.SAMPLE, bitboard=bitboard)
+            elif tag == TAG_MOVE:
+                from_square, to_square, promotion = _read_exactly(f, 3)
+                yield interface_dataclasses.RecordedEvent(
+                    timestamp / 1_000_000, interface_enums.RecordedEventType.MOVE,
+                    move=chess.Move(from_square, to_square, promotion or None))
+            elif tag == TAG_RESET:
+                yield interface_dataclasses.RecordedEvent(
+                    timestamp / 1_000_000, interface_enums.RecordedEventType.RESET)
+            else:
+                raise interface_exceptions.ChessboardInterfaceRecordingError(
+                    f"Unknown record tag {tag} in {path}")
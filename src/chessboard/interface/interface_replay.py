@@ -0,0 +1,100 @@
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+import chess
+
+from chessboard.interface import ChessboardInterface, interface_dataclasses, \
+    interface_enums
+from chessboard.interface.interface_filters import OccupancyFilter
+from chessboard.interface.interface_recording import read_session
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+class ReplayChessboardInterface(ChessboardInterface):
+    """
+    A chessboard interface that reads its occupancies from a recording instead of a
+    serial connection. Use `replay` to feed a recording through move detection.
+    """
+    _replay_bitboard: Optional[int]
+    _replay_timestamp: float
+
+    def __init__(self, occupancy_filter: Optional[OccupancyFilter] = None):
+        """
+        :param occupancy_filter: The filter to run the recorded occupancies through
+         before move detection. Defaults to no filtering.
+        """
+        super().__init__(occupancy_filter)
+        self._replay_bitboard = None
+        self._replay_timestamp = 0
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def _get_physical_bitboard(self) -> int:
+        return self._replay_bitboard
+
+    def _sample_time(self) -> float:
+        # Filter on the recorded timing, even when replaying as fast as possible
+        return self._replay_timestamp
+
+    def check_sample(self, bitboard: int,
+                     timestamp: Optional[float] = None) -> Optional[chess.Move]:
+        """
+        Runs one occupancy through the occupancy filter and move detection, like a
+        sample of a recording.
+
+        :param bitboard: The bitboard of occupied squares.
+        :param timestamp: When the occupancy was read, in seconds. Defaults to the time
+         of the previous sample.
+        :return: A move if a legal move is found, None otherwise.
+        """
+        self._replay_bitboard = bitboard
+        if timestamp is not None:
+            self._replay_timestamp = timestamp
+        return self.check_for_possible_move()
+
+    def replay(self, path: Path | str,
+               realtime: bool = False) -> interface_dataclasses.ReplayStats:
+        """
+        Replays a recording through move detection. Every sample is checked for a
+        possible move, and confirmed moves and resets are applied like the manager
+        would.
+
+        :param path: The path of the recording.
+        :param realtime: Whether to wait between events like in the recorded session,
+         otherwise replays as fast as possible.
+        :return: The statistics of the replay.
+        """
+        stats = interface_dataclasses.ReplayStats()
+        possible_move = None
+        start = time.perf_counter()
+        for event in read_session(path):
+            if realtime:
+                delay = event.timestamp - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            if event.type == interface_enums.RecordedEventType.SAMPLE:
+                possible_move = self.check_sample(event.bitboard, event.timestamp)
+                stats.samples += 1
+            elif event.type == interface_enums.RecordedEventType.MOVE:
+                stats.moves += 1
+                # The promotion piece is picked by the user, not detected
+                if possible_move is not None and \
+                        possible_move.from_square == event.move.from_square and \
+                        possible_move.to_square == event.move.to_square:
+                    stats.detected_moves += 1
+                else:
+                    logger.warning(f"Move {event.move} was confirmed but "
+                                   f"{possible_move} was detected")
+                self.add_move(event.move)
+                possible_move = None
+            elif event.type == interface_enums.RecordedEventType.RESET:
+                self.reset_board()
+                possible_move = None
+        stats.elapsed = time.perf_counter() - start
+        return stats
@@ -1,42 +1,117 @@
+import functools
 import logging
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Hashable, Iterator, Optional
 
 import chess
+import chess.engine
 
-from chessboard.interface import ChessboardInterface
-from chessboard.manager import manager_dataclasses, manager_enums, manager_exceptions
+from chessboard.interface import ChessboardInterface, interface_dataclasses
+from chessboard.manager import manager_dataclasses, manager_enums, manager_events, \
+    manager_exceptions
+from engine import EnginePlayer
+from engine.engine_dataclasses import EngineConfiguration
 from game import ChessGame
+from game.archive import GameArchive
+from game.chess_game_dataclasses import JournalEntry
+from game.chess_game_enums import JournalEntryType
+from game.chess_game_exceptions import ChessGameJournalError
+from game.journal import GameJournal, read_journal
 from utils.logger import create_logger
 from utils.singleton import Singleton
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
+# How long an update waits for an occupancy change when the chessboard is streaming
+STREAM_WAIT_TIMEOUT = 0.05
 
-class ChessboardManagerSingleton(metaclass=Singleton):
+
+class ChessboardManager:
     """
-    Handles main logic for the digital chessboard. Is a singleton.
+    Handles main logic for one digital chessboard. The UI uses the
+    ChessboardManagerSingleton, use a ChessboardManagerRegistry to host many
+    chessboards.
     """
 
     _state: manager_enums.State
     _possible_move: Optional[chess.Move]
     _game: Optional[ChessGame]
+    # The version of the game the outcome was last checked at, so it is only
+    # evaluated again after the game changes
+    _outcome_game_version: int
+    _outcome_stats: interface_dataclasses.EvaluationStats
 
     _interface: ChessboardInterface
+    _events: manager_events.EventBus
+    # Published once the change that caused them is finished, after the snapshot
+    _queued_events: list[manager_events.ManagerEvent]
+    # Readers on other threads only use the snapshot, which is replaced as a whole
+    _snapshot: manager_dataclasses.GameSnapshot
+    _snapshot_key: Optional[Hashable]
+    # Serializes changes from the update thread and the UI
+    _lock: threading.RLock
+    _change_depth: int
 
     _white_player_config: manager_dataclasses.PlayerConfiguration
     _black_player_config: manager_dataclasses.PlayerConfiguration
+    # The engine players of the game, by color
+    _engines: dict[chess.Color, EnginePlayer]
+    # Engines of a game that is no longer in progress, closed once the change is
+    # finished and the lock is released, as they may be waiting for it to hand in a move
+    _closing_engines: list[EnginePlayer]
+    # The position version the engine to move was last asked to think about
+    _engine_position_version: int
+    _engine_thinking: bool
+    # The move the engine to move chose, for the player to make on the chessboard
+    _engine_move: Optional[chess.Move]
+
+    # Where the journal of the game in progress is written, so it can be resumed
+    _journal_path: Optional[Path]
+    _journal: Optional[GameJournal]
+    # Whether there is a journal of a game that was exited or cut off, to resume
+    _can_resume: bool
+    # After resuming, moves are only detected again once the occupancy of the
+    # chessboard matches the game, until then the squares that don't match
+    _resuming: bool
+    _misplaced: int
+    # Where games are stored once they are over
+    _archive: Optional[GameArchive]
 
-    def __init__(self, interface: Optional[ChessboardInterface] = None):
+    def __init__(self, interface: ChessboardInterface,
+                 journal_path: Optional[Path] = None,
+                 archive: Optional[GameArchive] = None):
         """
-        :param interface: As the class is a singleton, the interface must be passed in
-         when the class is instantiated for the first time. Subsequent calls to the
-         class never end up calling this constructor again, so it's optional to appease
-         the linter.
+        :param interface: The interface of the chessboard to manage.
+        :param journal_path: Where to write the journal of the game in progress, so it
+         can be resumed after exiting or the power being cut. Defaults to no journal.
+        :param archive: Where to store games once they are over. Defaults to not
+         storing them.
         """
         self._state = manager_enums.State.IDLE
         self._possible_move = None
         self._game = None
+        self._outcome_game_version = -1
+        self._outcome_stats = interface_dataclasses.EvaluationStats()
         self._interface = interface
+        self._events = manager_events.EventBus()
+        self._queued_events = []
+        self._snapshot_key = None
+        self._lock = threading.RLock()
+        self._change_depth = 0
+        self._engines = {}
+        self._closing_engines = []
+        self._engine_position_version = -1
+        self._engine_thinking = False
+        self._engine_move = None
+        self._journal_path = journal_path
+        self._journal = None
+        self._can_resume = journal_path is not None and journal_path.exists()
+        self._resuming = False
+        self._misplaced = chess.BB_EMPTY
+        self._archive = archive
+        self._snapshot = self._take_snapshot()
 
     @property
     def state(self) -> manager_enums.State:
@@ -66,32 +141,401 @@ class ChessboardManagerSingleton(metaclass=Singleton):
         """
         return self._possible_move
 
+    @property
+    def events(self) -> manager_events.EventBus:
+        """
+        Returns the bus the manager publishes its changes to. Events can be published
+        from any thread that updates or controls the manager.
+
+        :return: The event bus.
+        """
+        return self._events
+
+    @property
+    def snapshot(self) -> manager_dataclasses.GameSnapshot:
+        """
+        Returns the newest snapshot of the manager and its game. Unlike the other
+        properties, it is consistent even if the manager changes on another thread
+        while it is being read.
+
+        :return: The snapshot.
+        """
+        return self._snapshot
+
+    @contextmanager
+    def _change(self) -> Iterator[None]:
+        """
+        Changes the manager. Once the outermost change finishes, the engine to move is
+        asked to think if the position changed, then a new snapshot is published and
+        then the events of the change, so anyone woken up by an event sees at least the
+        snapshot after it.
+        """
+        closing = []
+        try:
+            with self._lock:
+                self._change_depth += 1
+                try:
+                    yield
+                finally:
+                    self._change_depth -= 1
+                    if self._change_depth == 0:
+                        self._update_engines()
+                        self._commit()
+                        closing, self._closing_engines = self._closing_engines, []
+        finally:
+            # Closing waits for the engine threads, which may be waiting for the lock
+            for engine in closing:
+                engine.close()
+
+    def _commit(self):
+        """
+        Publishes a new snapshot if anything changed, and then the queued events.
+        """
+        key = (self._state, self._possible_move, id(self._game),
+               self._game.version if self._game is not None else -1,
+               self._engine_thinking, self._engine_move, self._can_resume,
+               self._resuming, self._misplaced)
+        if key != self._snapshot_key:
+            self._snapshot_key = key
+            self._snapshot = self._take_snapshot()
+        events, self._queued_events = self._queued_events, []
+        for event in events:
+            self._events.publish(event)
+
+    def _take_snapshot(self) -> manager_dataclasses.GameSnapshot:
+        """
+        Creates a snapshot of the manager and its game.
+
+        :return: The snapshot.
+        """
+        if self._game is None:
+            return manager_dataclasses.GameSnapshot(self._state,
+                                                    can_resume=self._can_resume)
+        board = self._game.board
+        return manager_dataclasses.GameSnapshot(
+            state=self._state,
+            # Only the last move is needed, for highlighting it
+            board=board.copy(stack=1),
+            fen=board.fen(),
+            occupied=board.occupied,
+            possible_move=self._possible_move,
+            possible_move_san=board.san(self._possible_move)
+            if self._possible_move is not None else None,
+            outcome=self._game.outcome,
+            offered_draw=self._game.offered_draw,
+            can_claim_draw=self._game.can_claim_draw,
+            game_version=self._game.version,
+            engine_to_move=board.turn in self._engines,
+            engine_thinking=self._engine_thinking,
+            engine_move=self._engine_move,
+            engine_move_san=board.san(self._engine_move)
+            if self._engine_move is not None else None,
+            can_resume=self._can_resume,
+            resuming=self._resuming,
+            misplaced=self._misplaced)
+
+    def _set_state(self, state: manager_enums.State):
+        """
+        Changes the state, publishing the change.
+
+        :param state: The new state.
+        """
+        if state != self._state:
+            self._state = state
+            self._queued_events.append(manager_events.StateChanged(state))
+            if state == manager_enums.State.GAME_OVER:
+                self._queued_events.append(manager_events.GameOver(self._game.outcome))
+                self._archive_game()
+                # A game that is over can't be resumed
+                if self._journal is not None:
+                    self._journal.delete()
+                    self._journal = None
+                self._set_resume_progress(False)
+
+    def _archive_game(self):
+        """
+        Stores the game that is over in the archive in the background, if any.
+        """
+        if self._archive is not None:
+            self._archive.store_game(self._game.to_pgn(
+                self._white_player_config.player_type.value.capitalize(),
+                self._black_player_config.player_type.value.capitalize()))
+
+    def _set_possible_move(self, possible_move: Optional[chess.Move]):
+        """
+        Changes the possible move, publishing the change.
+
+        :param possible_move: The new possible move, or None.
+        """
+        if possible_move != self._possible_move:
+            self._possible_move = possible_move
+            self._queued_events.append(
+                manager_events.PossibleMoveChanged(possible_move))
+
+    def _write_journal(self, entry_type: JournalEntryType,
+                       move: Optional[chess.Move] = None):
+        """
+        Writes something that happened in the game to its journal, if any.
+
+        :param entry_type: What happened.
+        :param move: The move, for MOVE entries.
+        """
+        if self._journal is not None:
+            self._journal.append(JournalEntry(entry_type, move))
+
+    def _set_engine_move(self, engine_move: Optional[chess.Move]):
+        """
+        Changes the move the engine to move chose, publishing it.
+
+        :param engine_move: The new move, or None.
+        """
+        if engine_move != self._engine_move:
+            self._engine_move = engine_move
+            if engine_move is not None:
+                self._queued_events.append(manager_events.EngineMoveChosen(
+                    engine_move, self._game.board.san(engine_move)))
+
+    def _set_engine_thinking(self, thinking: bool):
+        """
+        Changes whether the engine to move is thinking, publishing the change.
+
+        :param thinking: Whether the engine to move is thinking.
+        """
+        if thinking != self._engine_thinking:
+            self._engine_thinking = thinking
+            self._queued_events.append(manager_events.EngineThinkingChanged(thinking))
+
+    def _set_resume_progress(self, resuming: bool, misplaced: int = chess.BB_EMPTY):
+        """
+        Changes whether a resumed game waits for the pieces to be set up and which
+        squares don't match it yet, publishing the change.
+
+        :param resuming: Whether the resumed game waits for the pieces to be set up.
+        :param misplaced: The squares whose occupancy doesn't match the game yet.
+        """
+        if resuming != self._resuming or misplaced != self._misplaced:
+            self._resuming = resuming
+            self._misplaced = misplaced
+            self._queued_events.append(
+                manager_events.ResumeProgress(resuming, misplaced))
+
+    def _update_engines(self):
+        """
+        Asks the engine to move, if any, to think about the position once per position,
+        or to decide on a draw offered to it. Once the game is no longer in progress,
+        its engines are closed.
+        """
+        if self._state != manager_enums.State.GAME_IN_PROGRESS:
+            self._closing_engines.extend(self._engines.values())
+            self._engines = {}
+            self._engine_position_version = -1
+            self._set_engine_thinking(False)
+            self._set_engine_move(None)
+            return
+        version = self._game.position.version
+        if version == self._engine_position_version:
+            return
+        self._engine_position_version = version
+        self._set_engine_thinking(False)
+        self._set_engine_move(None)
+        engine = self._engines.get(self._game.board.turn)
+        if engine is not None and \
+                self._game.offered_draw == (not self._game.board.turn) and \
+                engine.accepts_draw(self._game.board):
+            logger.debug("Engine accepted the offered draw")
+            self._game.accept_offered_draw()
+            self._write_journal(JournalEntryType.ACCEPT_DRAW)
+            self._check_for_game_over()
+            # Closes the engines of the game that just ended
+            self._update_engines()
+            return
+        if engine is not None:
+            self._set_engine_thinking(True)
+            engine.think(self._game.board.copy(),
+                         functools.partial(self._on_engine_result, version))
+
+    def _on_engine_result(self, version: int,
+                          result: Optional[chess.engine.PlayResult]):
+        """
+        Called on an engine thread once the engine to move finished thinking.
+
+        :param version: The position version the engine thought about.
+        :param result: The result of the search, or None if the engine failed.
+        """
+        with self._change():
+            if self._state != manager_enums.State.GAME_IN_PROGRESS or \
+                    self._game.position.version != version:
+                # The position changed while the engine was thinking
+                return
+            self._set_engine_thinking(False)
+            if result is None or result.move is None:
+                logger.warning("Engine did not choose a move, the player can make any "
+                               "move for it")
+                return
+            logger.debug(f"Engine chose {result.move}")
+            if result.draw_offered and self._game.offered_draw is None:
+                logger.debug("Engine offered a draw")
+                self._game.offer_draw()
+                self._write_journal(JournalEntryType.OFFER_DRAW)
+                self._queued_events.append(
+                    manager_events.DrawOffered(self._game.offered_draw))
+            self._set_engine_move(result.move)
+
+    def _confirm_move(self, move: chess.Move):
+        """
+        Adds a move to the game.
+
+        :param move: The move, which must be legal.
+        """
+        # If a draw was offered and it's currently the other players turn, then the
+        # move is a decline of the draw offer
+        if self.game.offered_draw is not None and self.game.offered_draw != self.game.board.turn:
+            self.decline_offered_draw()
+        san = self.game.board.san(move)
+        logger.debug(f"Confirming possible move: {move} ({san})")
+        # The game shares the interface's position, so this pushes it once
+        self._interface.add_move(move)
+        self._write_journal(JournalEntryType.MOVE, move)
+        self._queued_events.append(manager_events.MoveConfirmed(move, san))
+        self._set_possible_move(None)
+        self._check_for_game_over()
+
+    def _set_detected_move(self, possible_move: Optional[chess.Move]):
+        """
+        Changes the possible move to the one detected by the interface. If it is the
+        move the engine to move chose, it is confirmed right away.
+
+        :param possible_move: The detected move, or None.
+        """
+        if self._resuming:
+            occupancy = self._interface.detected_occupancy
+            misplaced = self._game.board.occupied ^ \
+                (occupancy if occupancy is not None else chess.BB_EMPTY)
+            if misplaced:
+                # Setting up the pieces isn't a move
+                self._set_resume_progress(True, misplaced)
+                return
+            logger.debug("Chessboard matches the resumed game")
+            self._set_resume_progress(False)
+        self._set_possible_move(possible_move)
+        engine_move = self._engine_move
+        if engine_move is not None and possible_move is not None and \
+                possible_move.from_square == engine_move.from_square and \
+                possible_move.to_square == engine_move.to_square:
+            # The engine picked the promotion piece
+            self._confirm_move(engine_move)
+
+    @property
+    def outcome_stats(self) -> interface_dataclasses.EvaluationStats:
+        """
+        Returns how often checking the outcome of the game was skipped because the game
+        did not change, versus how often it was actually evaluated. See the
+        interface's `detection_stats` for move detection.
+
+        :return: The outcome check counters.
+        """
+        return self._outcome_stats
+
+    @property
+    def archive(self) -> Optional[GameArchive]:
+        """
+        Returns where games are stored once they are over.
+
+        :return: The archive, None if games aren't stored.
+        """
+        return self._archive
+
     def confirm_possible_move(self, *,
-                              promoteTo: Optional[manager_enums.PromotionPiece] = None):
+                              promoteTo: Optional[manager_enums.PromotionPiece] = None,
+                              expected: Optional[chess.Move] = None):
         """
         Confirms the possible move detected by the interface, adding it to the current
         board. This should be called when the user confirms the move on the UI.
 
         :param promoteTo: The piece to promote to, if the move is a promotion.
+        :param expected: The possible move the user saw, like from a snapshot. If the
+         possible move changed since, nothing is confirmed.
+        """
+        with self._change():
+            if self._state != manager_enums.State.GAME_IN_PROGRESS:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    f"Cannot confirm possible move in state \"{self._state}\".")
+            if self._possible_move is None:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    "No possible move to confirm.")
+            if expected is not None and expected != self._possible_move:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    f"Possible move changed from {expected} to {self._possible_move} "
+                    f"before it was confirmed.")
+            move = self._possible_move
+            if promoteTo is not None and move.promotion is not None:
+                logger.debug(f"Promoting to {promoteTo.name} ({promoteTo.value[0]})")
+                # A new move, as snapshots share the possible move
+                move = chess.Move(move.from_square, move.to_square,
+                                  promotion=promoteTo.value[0])
+            self._confirm_move(move)
+
+    def _check_game_action(self, action: str):
+        """
+        Makes sure a game is in progress before a player acts on it.
+
+        :param action: What the player is doing, for the error message.
         """
         if self._state != manager_enums.State.GAME_IN_PROGRESS:
             raise manager_exceptions.ChessboardManagerStateError(
-                f"Cannot confirm possible move in state \"{self._state}\".")
-        if self._possible_move is None:
-            raise manager_exceptions.ChessboardManagerStateError(
-                "No possible move to confirm.")
-        # If a draw was offered and it's currently the other players turn, then the move
-        # is a decline of the draw offer
-        if self.game.offered_draw is not None and self.game.offered_draw != self.game.board.turn:
+                f"Cannot {action} in state \"{self._state}\".")
+
+    def offer_draw(self):
+        """
+        The player to move offers a draw.
+        """
+        with self._change():
+            self._check_game_action("offer a draw")
+            self.game.offer_draw()
+            self._write_journal(JournalEntryType.OFFER_DRAW)
+            self._queued_events.append(
+                manager_events.DrawOffered(self.game.offered_draw))
+
+    def accept_offered_draw(self):
+        """
+        The player not to move accepts the draw offered to them, ending the game.
+        """
+        with self._change():
+            self._check_game_action("accept a draw")
+            self.game.accept_offered_draw()
+            self._write_journal(JournalEntryType.ACCEPT_DRAW)
+            self._check_for_game_over()
+
+    def decline_offered_draw(self):
+        """
+        The player not to move declines the draw offered to them.
+        """
+        with self._change():
+            self._check_game_action("decline a draw")
+            declined_by = not self.game.offered_draw
             self.game.decline_offered_draw()
-        if promoteTo is not None and self._possible_move.promotion is not None:
-            logger.debug(f"Promoting to {promoteTo.name} ({promoteTo.value[0]})")
-            self._possible_move.promotion = promoteTo.value[0]
-        logger.debug(f"Confirming possible move: {self._possible_move} "
-                     f"({self.game.board.san(self._possible_move)})")
-        self._interface.add_move(self._possible_move)
-        self.game.board.push(self._possible_move)
-        self._possible_move = None
+            self._write_journal(JournalEntryType.DECLINE_DRAW)
+            self._queued_events.append(manager_events.DrawDeclined(declined_by))
+
+    def claim_draw(self):
+        """
+        The player to move claims a draw, ending the game.
+        """
+        with self._change():
+            self._check_game_action("claim a draw")
+            self.game.claim_draw()
+            self._write_journal(JournalEntryType.CLAIM_DRAW)
+            self._check_for_game_over()
+
+    def resign(self):
+        """
+        The player to move resigns, ending the game.
+        """
+        with self._change():
+            self._check_game_action("resign")
+            self.game.resign()
+            self._write_journal(JournalEntryType.RESIGN)
+            self._check_for_game_over()
 
     def new_game(self, white_player: manager_dataclasses.PlayerConfiguration,
                  black_player: manager_dataclasses.PlayerConfiguration):
@@ -101,39 +545,222 @@ class ChessboardManagerSingleton(metaclass=Singleton):
         :param white_player: Configuration for the white player.
         :param black_player: Configuration for the black player.
         """
-        if self._state != manager_enums.State.IDLE:
-            raise manager_exceptions.ChessboardManagerStateError(
-                f"Cannot start a new game in state \"{self._state}\".")
-        logger.debug(f"Starting new game with players: {white_player}, {black_player}")
-        self._state = manager_enums.State.GAME_IN_PROGRESS
+        with self._change():
+            if self._state != manager_enums.State.IDLE:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    f"Cannot start a new game in state \"{self._state}\".")
+            logger.debug(f"Starting new game with players: {white_player}, "
+                         f"{black_player}")
+            self._interface.reset_board()
+            self._game = ChessGame(self._interface.position)
+            if self._journal_path is not None:
+                # Replaces the journal of a game that could have been resumed
+                self._journal = GameJournal(self._journal_path, {
+                    "white": white_player.to_json(),
+                    "black": black_player.to_json()
+                })
+                self._can_resume = False
+            self._start_game(white_player, black_player)
+
+    def resume_game(self):
+        """
+        Resumes the game in the journal, like after exiting or the power being cut.
+        State must be IDLE. Moves are only detected again once the pieces on the
+        chessboard are set up like the game.
+        """
+        with self._change():
+            if self._state != manager_enums.State.IDLE:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    f"Cannot resume a game in state \"{self._state}\".")
+            if not self._can_resume:
+                raise manager_exceptions.ChessboardManagerStateError(
+                    "No game to resume.")
+            try:
+                contents = read_journal(self._journal_path)
+                white_player = manager_dataclasses.PlayerConfiguration.from_json(
+                    contents.header["white"])
+                black_player = manager_dataclasses.PlayerConfiguration.from_json(
+                    contents.header["black"])
+            except (OSError, ChessGameJournalError, KeyError, ValueError) as e:
+                self._can_resume = False
+                raise manager_exceptions.ChessboardManagerResumeError(
+                    f"Cannot resume the game in {self._journal_path}: {e!r}") from e
+            logger.debug(f"Resuming game with {len(contents.entries)} journal entries "
+                         f"and players: {white_player}, {black_player}")
+            self._interface.reset_board()
+            game = ChessGame(self._interface.position)
+            replayed = self._replay_journal(game, contents.entries)
+            if replayed < len(contents.entries):
+                logger.warning(f"Dropping the last "
+                               f"{len(contents.entries) - replayed} journal entries, "
+                               f"as they can't be replayed")
+            self._game = game
+            self._journal = GameJournal(self._journal_path, keep=replayed)
+            self._can_resume = False
+            self._set_resume_progress(True, game.board.occupied)
+            self._start_game(white_player, black_player)
+            self._check_for_game_over()
+
+    def _replay_journal(self, game: ChessGame, entries: list[JournalEntry]) -> int:
+        """
+        Replays the entries of a journal on a new game, up to the first one that isn't
+        possible, like a move that is illegal.
+
+        :param game: The game, on the position of the interface.
+        :param entries: The entries of the journal.
+        :return: The number of entries replayed.
+        """
+        replayed = 0
+        moves = []
+        for entry in entries + [None]:
+            if entry is not None and entry.type == JournalEntryType.MOVE:
+                moves.append(entry.move)
+                continue
+            # Moves are made all at once until something else happened
+            added = self._interface.add_moves(moves)
+            replayed += added
+            if added < len(moves) or entry is None:
+                break
+            moves = []
+            if entry.type == JournalEntryType.OFFER_DRAW:
+                if game.offered_draw is not None:
+                    break
+                game.offer_draw()
+            elif entry.type in (JournalEntryType.ACCEPT_DRAW,
+                                JournalEntryType.DECLINE_DRAW):
+                if game.offered_draw is None:
+                    break
+                if entry.type == JournalEntryType.ACCEPT_DRAW:
+                    game.accept_offered_draw()
+                else:
+                    game.decline_offered_draw()
+            elif entry.type == JournalEntryType.CLAIM_DRAW:
+                if not game.can_claim_draw:
+                    break
+                game.claim_draw()
+            elif entry.type == JournalEntryType.RESIGN:
+                game.resign()
+            replayed += 1
+        return replayed
+
+    def _start_game(self, white_player: manager_dataclasses.PlayerConfiguration,
+                    black_player: manager_dataclasses.PlayerConfiguration):
+        """
+        Starts the players of a new or resumed game and puts the game in progress.
+
+        :param white_player: Configuration for the white player.
+        :param black_player: Configuration for the black player.
+        """
         self._white_player_config = white_player
         self._black_player_config = black_player
-        self._interface.reset_board()
-        self._game = ChessGame()
+        self._outcome_game_version = -1
+        for color, player in ((chess.WHITE, white_player),
+                              (chess.BLACK, black_player)):
+            if player.player_type == manager_enums.PlayerType.ENGINE:
+                engine = EnginePlayer(player.engine or EngineConfiguration())
+                engine.start()
+                self._engines[color] = engine
+        self._set_state(manager_enums.State.GAME_IN_PROGRESS)
 
     def exit(self):
         """
-        Pauses the game and exits. State must be GAME_IN_PROGRESS.
+        Pauses the game and exits. State must be GAME_IN_PROGRESS or GAME_OVER. A game
+        in progress can be resumed later if there is a journal.
         """
-        if self._state not in (manager_enums.State.GAME_IN_PROGRESS,
-                               manager_enums.State.GAME_OVER):
-            raise manager_exceptions.ChessboardManagerStateError(
-                f"Cannot pause and exit in state \"{self._state}\".")
-        logger.debug("Exiting.")
-        self._state = manager_enums.State.IDLE
-        self._possible_move = None
-        self._interface.reset_board()
-        self._game = None
+        with self._change():
+            if self._state not in (manager_enums.State.GAME_IN_PROGRESS,
+                                   manager_enums.State.GAME_OVER):
+                raise manager_exceptions.ChessboardManagerStateError(
+                    f"Cannot pause and exit in state \"{self._state}\".")
+            logger.debug("Exiting.")
+            self._set_possible_move(None)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+                self._can_resume = True
+            self._set_resume_progress(False)
+            self._interface.reset_board()
+            self._game = None
+            self._set_state(manager_enums.State.IDLE)
 
-    def update(self):
+    def update(self, wait: bool = True):
         """
         Update the manager. This should be called as often as possible to keep the game
-        state in sync with the physical board.
+        state in sync with the physical board. If the chessboard is streaming, this
+        blocks until the chessboard reports a change or STREAM_WAIT_TIMEOUT passes, so
+        there is no need to sleep between calls.
+
+        :param wait: Whether to wait for the chessboard to report a change. Pass False
+         if the caller already received from the interface, like the
+         ChessboardManagerRegistry does.
+        """
+        if wait:
+            # Always drain the stream so stale frames don't pile up while idle
+            self._interface.wait_for_change(STREAM_WAIT_TIMEOUT)
+        with self._change():
+            if self._state == manager_enums.State.GAME_IN_PROGRESS:
+                self._set_detected_move(self._interface.check_for_possible_move())
+                self._check_for_game_over()
+
+    async def update_async(self):
+        """
+        Async variant of `update`, for use with an AsyncChessboardInterface. Waits for
+        the chessboard without blocking the event loop.
         """
+        await self._interface.wait_for_change_async(STREAM_WAIT_TIMEOUT)
         if self._state == manager_enums.State.GAME_IN_PROGRESS:
-            self._possible_move = self._interface.check_for_possible_move()
-            if self.game is not None:
-                o = self.game.outcome
-                if o is not None:
-                    self._state = manager_enums.State.GAME_OVER
-                    self._possible_move = None
+            bitboard = await self._interface.read_occupancy_async()
+            # Move detection reads the position, which engine threads change
+            with self._change():
+                # The game could have ended or been exited while waiting
+                if self._state == manager_enums.State.GAME_IN_PROGRESS:
+                    self._set_detected_move(self._interface.check_occupancy(bitboard))
+                    self._check_for_game_over()
+
+    def close(self):
+        """
+        Quits the engines of the current game, if any, and closes its journal, so it can
+        be resumed. Call before exiting.
+        """
+        with self._change():
+            self._closing_engines.extend(self._engines.values())
+            self._engines = {}
+            self._set_engine_thinking(False)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _check_for_game_over(self):
+        """
+        Ends the game if the game has an outcome.
+        """
+        if self.game is not None:
+            if self._outcome_game_version == self.game.version:
+                self._outcome_stats.skipped += 1
+                return
+            self._outcome_stats.evaluated += 1
+            self._outcome_game_version = self.game.version
+            o = self.game.outcome
+            if o is not None:
+                self._set_possible_move(None)
+                self._set_state(manager_enums.State.GAME_OVER)
+
+
+class ChessboardManagerSingleton(ChessboardManager, metaclass=Singleton):
+    """
+    Handles main logic for the digital chessboard the UI shows. Is a singleton.
+    """
+
+    def __init__(self, interface: Optional[ChessboardInterface] = None,
+                 journal_path: Optional[Path] = None,
+                 archive: Optional[GameArchive] = None):
+        """
+        :param interface: As the class is a singleton, the interface must be passed in
+         when the class is instantiated for the first time. Subsequent calls to the
+         class never end up calling this constructor again, so it's optional to appease
+         the linter.
+        :param journal_path: Where to write the journal of the game in progress, so it
+         can be resumed.
+        :param archive: Where to store games once they are over.
+        """
+        super().__init__(interface, journal_path, archive)
@@ -1,6 +1,11 @@
 from dataclasses import dataclass
+from typing import Optional
+
+import chess
 
 from chessboard.manager import manager_enums
+from engine.engine_dataclasses import EngineConfiguration
+from game.chess_game_enums import ChessGameOutcomeType
 
 
 @dataclass
@@ -9,5 +14,101 @@ class PlayerConfiguration:
     Configuration for a player in the chessboard manager.
     """
     player_type: manager_enums.PlayerType
-    # TODO: Add engine configuration settings
+    # Only used by engine players, defaults to the default EngineConfiguration
+    engine: Optional[EngineConfiguration] = None
     # TODO: Add time control settings
+
+    def to_json(self) -> dict:
+        """
+        Converts the configuration to something that can be saved as JSON, like in a
+        game journal.
+
+        :return: The configuration as a dictionary.
+        """
+        return {"player_type": self.player_type.value,
+                "engine": self.engine.to_json() if self.engine is not None else None}
+
+    @staticmethod
+    def from_json(data: dict) -> "PlayerConfiguration":
+        """
+        Creates a configuration from what `to_json` returned.
+
+        :param data: The configuration as a dictionary.
+        :return: The configuration.
+        """
+        return PlayerConfiguration(
+            manager_enums.PlayerType(data["player_type"]),
+            EngineConfiguration.from_json(data["engine"])
+            if data["engine"] is not None else None)
+
+
+@dataclass
+class BoardStats:
+    """
+    Statistics of a chessboard hosted by a ChessboardManagerRegistry.
+    """
+    # Manager updates that had a new occupancy to process
+    updates: int = 0
+    # Updates that failed because of a bad response from the chessboard
+    errors: int = 0
+    # Seconds from the occupancy being received, or the poll being sent, until move
+    # detection finished
+    latency_total: float = 0
+    latency_max: float = 0
+
+    def add_latency(self, latency: float):
+        """
+        Counts an update that took the given latency.
+
+        :param latency: The latency of the update in seconds.
+        """
+        self.updates += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    @property
+    def mean_latency(self) -> float:
+        """
+        Returns the mean latency of an update in seconds.
+        """
+        return self.latency_total / self.updates if self.updates > 0 else 0
+
+
+@dataclass(frozen=True)
+class GameSnapshot:
+    """
+    The state of a chessboard manager and its game at one point in time. Snapshots are
+    never changed once published, so they can be read from any thread.
+    """
+    state: manager_enums.State
+    # The rest is only set while there is a game. The board is a copy with only the
+    # last move in its move stack, and must not be modified.
+    board: Optional[chess.Board] = None
+    fen: Optional[str] = None
+    occupied: int = 0
+    possible_move: Optional[chess.Move] = None
+    possible_move_san: Optional[str] = None
+    outcome: Optional[ChessGameOutcomeType] = None
+    offered_draw: Optional[chess.Color] = None
+    can_claim_draw: bool = False
+    game_version: int = -1
+    # Whether the player to move is an engine, which is thinking until it chose a move
+    # for the player to make on the chessboard. If the engine failed, it is no longer
+    # thinking and has no move, so the player can make any move for it.
+    engine_to_move: bool = False
+    engine_thinking: bool = False
+    engine_move: Optional[chess.Move] = None
+    engine_move_san: Optional[str] = None
+    # Whether there is a game to resume, also set without a game
+    can_resume: bool = False
+    # Whether a resumed game waits for the pieces to be set up like the game, and the
+    # squares whose occupancy doesn't match it yet
+    resuming: bool = False
+    misplaced: int = 0
+
+    @property
+    def turn(self) -> Optional[chess.Color]:
+        """
+        Returns the player to move, or None if there is no game.
+        """
+        return self.board.turn if self.board is not None else None
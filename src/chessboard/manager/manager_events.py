@@ -0,0 +1,155 @@
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import chess
+
+from chessboard.manager import manager_enums
+from game.chess_game_enums import ChessGameOutcomeType
+
+
+@dataclass(frozen=True)
+class ManagerEvent:
+    """
+    Something that changed in a chessboard manager.
+    """
+
+
+@dataclass(frozen=True)
+class StateChanged(ManagerEvent):
+    state: manager_enums.State
+
+
+@dataclass(frozen=True)
+class PossibleMoveChanged(ManagerEvent):
+    # None if there is no longer a possible move
+    possible_move: Optional[chess.Move]
+
+
+@dataclass(frozen=True)
+class MoveConfirmed(ManagerEvent):
+    move: chess.Move
+    san: str
+
+
+@dataclass(frozen=True)
+class EngineMoveChosen(ManagerEvent):
+    # The move the engine to move wants made on the chessboard
+    move: chess.Move
+    san: str
+
+
+@dataclass(frozen=True)
+class EngineThinkingChanged(ManagerEvent):
+    # False once the engine to move chose a move, failed to or stopped thinking
+    thinking: bool
+
+
+@dataclass(frozen=True)
+class ResumeProgress(ManagerEvent):
+    # Whether a resumed game still waits for the pieces to be set up like the game
+    resuming: bool
+    # The squares whose occupancy doesn't match the game yet
+    misplaced: int
+
+
+@dataclass(frozen=True)
+class DrawOffered(ManagerEvent):
+    # The player who offered the draw
+    color: chess.Color
+
+
+@dataclass(frozen=True)
+class DrawDeclined(ManagerEvent):
+    # The player who declined the draw
+    color: chess.Color
+
+
+@dataclass(frozen=True)
+class GameOver(ManagerEvent):
+    outcome: ChessGameOutcomeType
+
+
+class EventSubscription:
+    """
+    Receives the events published to an EventBus, in the order they were published.
+    """
+    _queue: queue.SimpleQueue[ManagerEvent]
+    # Called from the publishing thread after each event is queued
+    wake: Optional[Callable[[], None]]
+
+    def __init__(self, wake: Optional[Callable[[], None]] = None):
+        """
+        :param wake: Called from the publishing thread whenever an event is queued,
+         like a Kivy Clock trigger to drain the events on the Kivy thread.
+        """
+        self._queue = queue.SimpleQueue()
+        self.wake = wake
+
+    def put(self, event: ManagerEvent):
+        """
+        Queues an event and wakes the subscriber.
+
+        :param event: The event.
+        """
+        self._queue.put(event)
+        if self.wake is not None:
+            self.wake()
+
+    def drain(self) -> list[ManagerEvent]:
+        """
+        Takes all queued events without waiting.
+
+        :return: The events, oldest first.
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class EventBus:
+    """
+    Publishes events from any thread to every subscription.
+    """
+    _subscriptions: list[EventSubscription]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, wake: Optional[Callable[[], None]] = None) -> EventSubscription:
+        """
+        Subscribes to the events published from now on.
+
+        :param wake: Called from the publishing thread whenever an event is queued.
+        :return: The subscription.
+        """
+        subscription = EventSubscription(wake)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        """
+        Stops publishing events to a subscription.
+
+        :param subscription: The subscription.
+        """
+        with self._lock:
+            self._subscriptions.remove(subscription)
+
+    def publish(self, event: ManagerEvent):
+        """
+        Publishes an event to every subscription.
+
+        :param event: The event.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.put(event)
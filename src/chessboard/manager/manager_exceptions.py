@@ -1,6 +1,6 @@
 class ChessboardManagerError(Exception):
     """
-    Base class for all exceptions raised by the ChessboardManagerSingleton.
+    Base class for all exceptions raised by the chessboard managers.
     """
     pass
 
@@ -9,3 +9,15 @@ class ChessboardManagerStateError(ChessboardManagerError):
     """
     Raised when an operation is attempted in an invalid state.
     """
+
+
+class ChessboardManagerRegistryError(ChessboardManagerError):
+    """
+    Raised when a chessboard is added to or looked up in a registry incorrectly.
+    """
+
+
+class ChessboardManagerResumeError(ChessboardManagerError):
+    """
+    Raised when a game can't be resumed from its journal.
+    """
@@ -0,0 +1,224 @@
+import logging
+import selectors
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from chessboard.interface import ChessboardInterface, interface_exceptions
+from chessboard.manager import ChessboardManager, manager_dataclasses, \
+    manager_exceptions
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# The longest a registry waits for streaming chessboards before updating polled ones
+POLL_INTERVAL = 0.01
+# The default number of threads polling chessboards that don't stream
+DEFAULT_POLL_WORKERS = 4
+
+
+@dataclass
+class _BoardSession:
+    """
+    A chessboard hosted by a registry.
+    """
+    name: str
+    interface: ChessboardInterface
+    manager: ChessboardManager
+    stats: manager_dataclasses.BoardStats = field(
+        default_factory=manager_dataclasses.BoardStats)
+    # The update of a polled chessboard currently running on the worker pool
+    pending: Optional[Future] = None
+
+
+class ChessboardManagerRegistry:
+    """
+    Hosts many independent chessboards, each with its own interface, manager and game,
+    in one process.
+
+    Streaming chessboards are multiplexed through one selector, and their move
+    detection runs right on the I/O thread as it only takes microseconds per occupancy
+    change. Polling a chessboard blocks on the serial round trip instead, so polled
+    chessboards are updated on a pool of worker threads.
+    """
+    _sessions: dict[str, _BoardSession]
+    _selector: selectors.BaseSelector
+    _pool: ThreadPoolExecutor
+    # Protects the sessions and their statistics, as boards can be added and removed
+    # and statistics read from other threads
+    _lock: threading.Lock
+
+    def __init__(self, poll_workers: int = DEFAULT_POLL_WORKERS):
+        """
+        :param poll_workers: The number of threads polling chessboards that don't
+         stream.
+        """
+        self._sessions = {}
+        self._selector = selectors.DefaultSelector()
+        self._pool = ThreadPoolExecutor(max_workers=poll_workers,
+                                        thread_name_prefix="chessboard-poll")
+        self._lock = threading.Lock()
+
+    def add_board(self, name: str, interface: ChessboardInterface) -> ChessboardManager:
+        """
+        Hosts a chessboard.
+
+        :param name: A unique name for the chessboard, like its table number.
+        :param interface: The interface of the chessboard, already connected.
+        :return: The manager of the chessboard.
+        """
+        with self._lock:
+            if name in self._sessions:
+                raise manager_exceptions.ChessboardManagerRegistryError(
+                    f"Chessboard \"{name}\" is already hosted")
+            session = _BoardSession(name, interface, ChessboardManager(interface))
+            if interface.streaming:
+                self._selector.register(interface.fileno(), selectors.EVENT_READ,
+                                        session)
+            self._sessions[name] = session
+        logger.debug(f"Hosting chessboard \"{name}\" "
+                     f"({'streaming' if interface.streaming else 'polling'})")
+        return session.manager
+
+    def remove_board(self, name: str) -> ChessboardManager:
+        """
+        Stops hosting a chessboard. Its interface stays connected.
+
+        :param name: The name of the chessboard.
+        :return: The manager of the chessboard.
+        """
+        with self._lock:
+            session = self._get_session(name)
+            if session.interface.streaming:
+                self._selector.unregister(session.interface.fileno())
+            del self._sessions[name]
+        if session.pending is not None:
+            session.pending.result()
+        logger.debug(f"Stopped hosting chessboard \"{name}\"")
+        return session.manager
+
+    def _get_session(self, name: str) -> _BoardSession:
+        """
+        Gets the session of a chessboard.
+
+        :param name: The name of the chessboard.
+        :return: The session.
+        """
+        try:
+            return self._sessions[name]
+        except KeyError:
+            raise manager_exceptions.ChessboardManagerRegistryError(
+                f"No chessboard named \"{name}\"")
+
+    @property
+    def names(self) -> list[str]:
+        """
+        Returns the names of the hosted chessboards.
+
+        :return: The names, in the order the chessboards were added.
+        """
+        with self._lock:
+            return list(self._sessions)
+
+    def __getitem__(self, name: str) -> ChessboardManager:
+        """
+        Gets the manager of a chessboard.
+
+        :param name: The name of the chessboard.
+        :return: The manager of the chessboard.
+        """
+        with self._lock:
+            return self._get_session(name).manager
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self, name: str) -> manager_dataclasses.BoardStats:
+        """
+        Gets the statistics of a chessboard.
+
+        :param name: The name of the chessboard.
+        :return: A copy of the statistics of the chessboard.
+        """
+        with self._lock:
+            return replace(self._get_session(name).stats)
+
+    def run_once(self, timeout: float = POLL_INTERVAL):
+        """
+        Waits for streaming chessboards to report changes and updates every chessboard
+        once. Polled chessboards are updated in the background, so a slow chessboard
+        does not hold up the others.
+
+        :param timeout: The maximum time to wait for a streaming chessboard, in seconds.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        if self._selector.get_map():
+            ready = self._selector.select(timeout)
+        else:
+            # Some selectors can't wait without anything to wait on
+            time.sleep(timeout)
+            ready = []
+        received = time.perf_counter()
+        changed = set()
+        for key, _ in ready:
+            session = key.data
+            try:
+                if session.interface.receive():
+                    changed.add(session.name)
+            except interface_exceptions.ChessboardInterfaceError as e:
+                with self._lock:
+                    session.stats.errors += 1
+                logger.warning(f"Failed to receive from chessboard "
+                               f"\"{session.name}\": {e}")
+        for session in sessions:
+            if session.interface.streaming:
+                # Updating without a change is cheap, and lets the occupancy filter
+                # settle over time
+                session.manager.update(wait=False)
+                if session.name in changed:
+                    latency = time.perf_counter() - received
+                    with self._lock:
+                        session.stats.add_latency(latency)
+            elif session.pending is None or session.pending.done():
+                session.pending = self._pool.submit(self._poll, session)
+
+    def _poll(self, session: _BoardSession):
+        """
+        Polls and updates a chessboard that doesn't stream, on a worker thread.
+
+        :param session: The session of the chessboard.
+        """
+        start = time.perf_counter()
+        try:
+            session.manager.update(wait=False)
+        except interface_exceptions.ChessboardInterfaceError as e:
+            with self._lock:
+                session.stats.errors += 1
+            logger.warning(f"Failed to poll chessboard \"{session.name}\": {e}")
+            return
+        latency = time.perf_counter() - start
+        with self._lock:
+            session.stats.add_latency(latency)
+
+    def run(self, stop_event: threading.Event):
+        """
+        Updates every chessboard until stopped.
+
+        :param stop_event: Set to stop.
+        """
+        while not stop_event.is_set():
+            self.run_once()
+
+    def close(self):
+        """
+        Stops the worker pool and the selector, and quits the engines of the games. The
+        interfaces stay connected.
+        """
+        self._pool.shutdown(wait=True)
+        self._selector.close()
+        for session in self._sessions.values():
+            session.manager.close()
@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Callable, Optional
+
+import chess
+import chess.engine
+
+from engine.engine_book import OpeningBook
+from engine.engine_dataclasses import EngineConfiguration
+from engine.engine_tablebase import TablebaseService
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How long to wait for the engine to quit before it is killed
+ENGINE_QUIT_TIMEOUT = 2
+
+
+class EnginePlayer:
+    """
+    Plays moves with a UCI engine. The engine runs in its own process and is talked to
+    with chess.engine's async API on an event loop in a dedicated thread, so searching
+    never blocks the thread updating the manager or the UI. Moves in the opening book
+    or the endgame tablebases are played without asking the engine, which is only
+    started once the first move is in neither.
+    """
+    _configuration: EngineConfiguration
+    # Only used on the event loop
+    _book: Optional[OpeningBook]
+    # Whether the tablebases showed a drawn position and a draw was offered, only once
+    _offered_draw: bool
+    # Also used to decide on draw offers, it is thread-safe
+    _tablebase: Optional[TablebaseService]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _thread: Optional[threading.Thread]
+    # Only used on the event loop
+    _engine: Optional[chess.engine.UciProtocol]
+    _search: Optional[concurrent.futures.Future]
+
+    def __init__(self, configuration: EngineConfiguration):
+        """
+        :param configuration: How to start the engine and how long to let it think.
+        """
+        self._configuration = configuration
+        self._book = None
+        self._tablebase = None
+        self._offered_draw = False
+        self._loop = None
+        self._thread = None
+        self._engine = None
+        self._search = None
+
+    @property
+    def configuration(self) -> EngineConfiguration:
+        """
+        Returns the configuration of the engine player.
+
+        :return: The configuration.
+        """
+        return self._configuration
+
+    def start(self):
+        """
+        Opens the opening book and the tablebases, if any, and starts the event loop
+        the engine is talked to on.
+        """
+        if self._configuration.book is not None:
+            self._book = OpeningBook(self._configuration.book,
+                                     self._configuration.book_selection)
+            if not self._book.open():
+                self._book = None
+        if self._configuration.tablebase is not None:
+            self._tablebase = TablebaseService(self._configuration.tablebase)
+            if not self._tablebase.open():
+                self._tablebase = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                        name="EnginePlayer")
+        self._thread.start()
+
+    def think(self, board: chess.Board,
+              on_result: Callable[[Optional[chess.engine.PlayResult]], None]):
+        """
+        Starts searching for a move, stopping the previous search.
+
+        :param board: The position to search. It must not be modified afterward, so
+         pass a copy. The move stack is sent to the engine, so it can see repetitions.
+        :param on_result: Called on the engine thread with the result of the search,
+         or None if the engine failed. Not called if the search is stopped.
+        """
+        self.stop()
+        search = asyncio.run_coroutine_threadsafe(self._play(board), self._loop)
+
+        def finished(future: concurrent.futures.Future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Engine {self._configuration.command} failed: "
+                             f"{error!r}")
+            on_result(future.result() if error is None else None)
+
+        search.add_done_callback(finished)
+        self._search = search
+
+    def accepts_draw(self, board: chess.Board) -> bool:
+        """
+        Decides whether to accept a draw offered by the opponent. Only positions in the
+        tablebases that the engine can't win are accepted.
+
+        :param board: The position, with the engine to move.
+        :return: Whether to accept the draw.
+        """
+        if self._tablebase is None:
+            return False
+        wdl = self._tablebase.probe_wdl(board)
+        # A win that is a draw by the 50-move rule can't be won either
+        return wdl is not None and wdl < 2
+
+    def stop(self):
+        """
+        Stops the current search, if any, without waiting. If pondering, the engine
+        keeps pondering until the next search or until it is closed.
+        """
+        if self._search is not None:
+            self._search.cancel()
+            self._search = None
+
+    async def _open(self) -> chess.engine.UciProtocol:
+        """
+        Starts the engine if it isn't running and configures it.
+
+        :return: The engine.
+        """
+        if self._engine is not None and \
+                not self._engine.returncode.done():
+            return self._engine
+        config = self._configuration
+        _, self._engine = await chess.engine.popen_uci(list(config.command))
+        logger.debug(f"Started engine {self._engine.id.get('name', config.command)}")
+        options = {}
+        if config.skill_level is not None:
+            if "Skill Level" in self._engine.options:
+                options["Skill Level"] = config.skill_level
+            else:
+                logger.warning("Engine has no skill level, ignoring it")
+        if config.elo is not None:
+            if "UCI_LimitStrength" in self._engine.options and \
+                    "UCI_Elo" in self._engine.options:
+                elo_option = self._engine.options["UCI_Elo"]
+                options["UCI_LimitStrength"] = True
+                options["UCI_Elo"] = min(max(config.elo, elo_option.min),
+                                         elo_option.max)
+            else:
+                logger.warning("Engine can't limit its strength, ignoring Elo")
+        if options:
+            await self._engine.configure(options)
+        return self._engine
+
+    async def _play(self, board: chess.Board) -> chess.engine.PlayResult:
+        """
+        Searches for a move, or picks one from the opening book or the tablebases.
+        Once the tablebases show that the position is a draw, a draw is offered.
+
+        :param board: The position to search.
+        :return: The result of the search.
+        """
+        if self._book is not None:
+            move = self._book.choose(board)
+            if move is not None:
+                logger.debug(f"Playing {move} from the opening book")
+                return chess.engine.PlayResult(move, None)
+        if self._tablebase is not None and self._tablebase.can_probe(board):
+            move = self._tablebase.best_move(board)
+            wdl = self._tablebase.probe_wdl(board)
+            if move is not None and wdl is not None:
+                logger.debug(f"Playing {move} from the tablebases, WDL {wdl}")
+                offer_draw = abs(wdl) < 2 and not self._offered_draw
+                self._offered_draw |= offer_draw
+                return chess.engine.PlayResult(move, None, draw_offered=offer_draw)
+        engine = await self._open()
+        return await engine.play(board, self._configuration.limit,
+                                 ponder=self._configuration.ponder)
+
+    async def _quit(self):
+        """
+        Asks the engine to quit, killing it if it doesn't.
+        """
+        if self._engine is None:
+            return
+        try:
+            await asyncio.wait_for(self._engine.quit(), ENGINE_QUIT_TIMEOUT)
+        except (asyncio.TimeoutError, chess.engine.EngineError):
+            logger.warning("Engine did not quit, killing it")
+            self._engine.transport.kill()
+        self._engine = None
+
+    def close(self):
+        """
+        Stops searching, quits the engine and stops the event loop.
+        """
+        if self._loop is None:
+            return
+        self.stop()
+        try:
+            asyncio.run_coroutine_threadsafe(self._quit(), self._loop).result(
+                ENGINE_QUIT_TIMEOUT + 1)
+        except (concurrent.futures.TimeoutError, chess.engine.EngineError) as e:
+            logger.warning(f"Failed to quit engine: {e!r}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        if self._tablebase is not None:
+            stats = self._tablebase.stats
+            logger.debug(f"Probed tablebases {stats.hits + stats.misses} times, "
+                         f"{stats.hit_ratio:.0%} from the cache, {stats.failures} "
+                         f"missing")
+            self._tablebase.close()
+            self._tablebase = None
+        logger.debug("Closed engine player")
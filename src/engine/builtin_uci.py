@@ -0,0 +1,244 @@
+import sys
+import threading
+from typing import Optional, TextIO
+
+import chess
+
+from engine.engine_dataclasses import SearchInfo, SearchLimits
+from engine.engine_search import MATE_SCORE, MATE_THRESHOLD, MAX_SKILL_LEVEL, \
+    Searcher, TRANSPOSITION_TABLE_ENTRY_BYTES, nodes_per_second_for_skill
+
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 256
+# With a clock, the share of the remaining time to spend on a move
+CLOCK_TIME_DIVISOR = 30
+
+
+class UciEngine:
+    """
+    Talks UCI over standard input and output for the built-in engine, so engine
+    players run it in its own process like any other UCI engine. Searches run on a
+    thread, so "stop" and "ponderhit" are handled while searching.
+    """
+    # Where UCI commands are sent, which isn't standard output, as logs are written there
+    _output: TextIO
+    _searcher: Searcher
+    _board: chess.Board
+    _skill_level: int
+    _output_lock: threading.Lock
+    _search_thread: Optional[threading.Thread]
+    # The limits of a search that is pondering, applied once the move pondered on is
+    # played
+    _ponder_limits: Optional[SearchLimits]
+    # Set once the best move of the search may be sent, as when pondering or searching
+    # infinitely, it may only be sent after "stop" or "ponderhit"
+    _may_answer: threading.Event
+
+    def __init__(self, output: TextIO):
+        """
+        :param output: Where to send UCI commands to the GUI.
+        """
+        self._output = output
+        self._searcher = Searcher(self._table_size(DEFAULT_HASH_MB))
+        self._board = chess.Board()
+        self._skill_level = MAX_SKILL_LEVEL
+        self._output_lock = threading.Lock()
+        self._search_thread = None
+        self._ponder_limits = None
+        self._may_answer = threading.Event()
+
+    @staticmethod
+    def _table_size(megabytes: int) -> int:
+        """
+        Gets how many transposition table entries fit in some memory.
+
+        :param megabytes: The memory in megabytes.
+        :return: The number of entries.
+        """
+        return megabytes * 1024 * 1024 // TRANSPOSITION_TABLE_ENTRY_BYTES
+
+    def send(self, line: str):
+        """
+        Sends a line to the GUI.
+
+        :param line: The line.
+        """
+        with self._output_lock:
+            self._output.write(line + "\n")
+            self._output.flush()
+
+    def run(self):
+        """
+        Handles commands until "quit" or the end of standard input.
+        """
+        for line in sys.stdin:
+            tokens = line.split()
+            if not tokens:
+                continue
+            command, arguments = tokens[0], tokens[1:]
+            if command == "uci":
+                self.send("id name Chessboard-Pi")
+                self.send("id author Chessboard-Pi")
+                self.send(f"option name Skill Level type spin default {MAX_SKILL_LEVEL} "
+                          f"min 0 max {MAX_SKILL_LEVEL}")
+                self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} "
+                          f"min 1 max {MAX_HASH_MB}")
+                self.send("option name Ponder type check default false")
+                self.send("uciok")
+            elif command == "isready":
+                self.send("readyok")
+            elif command == "setoption":
+                self._set_option(arguments)
+            elif command == "ucinewgame":
+                self._stop()
+                self._searcher.clear()
+            elif command == "position":
+                self._stop()
+                self._set_position(arguments)
+            elif command == "go":
+                self._stop()
+                self._go(arguments)
+            elif command == "stop":
+                self._stop()
+            elif command == "ponderhit":
+                if self._ponder_limits is not None:
+                    self._searcher.limit(self._ponder_limits)
+                    self._ponder_limits = None
+                self._may_answer.set()
+            elif command == "quit":
+                break
+        self._stop()
+
+    def _set_option(self, arguments: list[str]):
+        """
+        Handles "setoption name <name> value <value>".
+
+        :param arguments: The arguments of the command.
+        """
+        if "name" not in arguments or "value" not in arguments:
+            return
+        name = " ".join(arguments[arguments.index("name") + 1:
+                                  arguments.index("value")]).lower()
+        value = " ".join(arguments[arguments.index("value") + 1:])
+        if name == "skill level":
+            self._skill_level = min(max(int(value), 0), MAX_SKILL_LEVEL)
+        elif name == "hash":
+            self._stop()
+            self._searcher = Searcher(
+                self._table_size(min(max(int(value), 1), MAX_HASH_MB)))
+
+    def _set_position(self, arguments: list[str]):
+        """
+        Handles "position [startpos | fen <fen>] [moves <moves>]".
+
+        :param arguments: The arguments of the command.
+        """
+        moves = []
+        if "moves" in arguments:
+            moves = arguments[arguments.index("moves") + 1:]
+            arguments = arguments[:arguments.index("moves")]
+        if arguments[0] == "startpos":
+            self._board = chess.Board()
+        else:
+            self._board = chess.Board(" ".join(arguments[1:]))
+        for move in moves:
+            self._board.push_uci(move)
+
+    def _go(self, arguments: list[str]):
+        """
+        Handles "go" by starting to search on a thread.
+
+        :param arguments: The arguments of the command.
+        """
+        values = {}
+        for i, argument in enumerate(arguments[:-1]):
+            if argument in ("wtime", "btime", "winc", "binc", "movestogo", "movetime",
+                            "depth", "nodes"):
+                values[argument] = int(arguments[i + 1])
+        search_time = None
+        if "movetime" in values:
+            search_time = values["movetime"] / 1000
+        elif ("wtime" if self._board.turn == chess.WHITE else "btime") in values:
+            remaining = values["wtime" if self._board.turn == chess.WHITE else "btime"]
+            increment = values.get("winc" if self._board.turn == chess.WHITE
+                                   else "binc", 0)
+            moves_to_go = values.get("movestogo", CLOCK_TIME_DIVISOR)
+            search_time = min(remaining / max(moves_to_go, 1) + increment * 3 / 4,
+                              remaining / 2) / 1000
+        limits = SearchLimits(time=search_time, nodes=values.get("nodes"),
+                              depth=values.get("depth"),
+                              nodes_per_second=nodes_per_second_for_skill(
+                                  self._skill_level))
+        self._may_answer.clear()
+        if "ponder" in arguments:
+            # Search without limits until the move pondered on is played, but no faster
+            # than the skill level, so pondering doesn't take the CPU from the rest of
+            # the chessboard more than thinking does
+            self._ponder_limits = limits
+            limits = SearchLimits(depth=limits.depth,
+                                  nodes_per_second=limits.nodes_per_second)
+        elif "infinite" in arguments:
+            self._ponder_limits = None
+            limits = SearchLimits(depth=limits.depth,
+                                  nodes_per_second=limits.nodes_per_second)
+        else:
+            self._ponder_limits = None
+            self._may_answer.set()
+        self._search_thread = threading.Thread(target=self._search,
+                                               args=(self._board.copy(), limits),
+                                               daemon=True)
+        self._search_thread.start()
+
+    def _search(self, board: chess.Board, limits: SearchLimits):
+        """
+        Searches on the search thread and sends the best move.
+
+        :param board: The position to search.
+        :param limits: When to stop searching.
+        """
+        result = self._searcher.search(board, limits, self._send_info)
+        # A finished search waits until it may answer, like when it ran out of depth
+        # while pondering
+        self._may_answer.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        elif result.ponder is not None:
+            self.send(f"bestmove {result.move.uci()} ponder {result.ponder.uci()}")
+        else:
+            self.send(f"bestmove {result.move.uci()}")
+
+    def _send_info(self, info: SearchInfo):
+        """
+        Sends the progress of the search after a depth.
+
+        :param info: The progress of the search.
+        """
+        if abs(info.score) > MATE_THRESHOLD:
+            plies = MATE_SCORE - abs(info.score)
+            score = f"mate {(plies + 1) // 2 if info.score > 0 else -(plies // 2)}"
+        else:
+            score = f"cp {info.score}"
+        self.send(f"info depth {info.depth} score {score} nodes {info.nodes} "
+                  f"nps {info.nodes_per_second} time {int(info.time * 1000)} "
+                  f"hashfull {self._searcher.table.permill_full} "
+                  f"pv {' '.join(move.uci() for move in info.pv)}")
+
+    def _stop(self):
+        """
+        Stops the search, if any, and waits for it to send its best move.
+        """
+        if self._search_thread is not None:
+            self._searcher.stop()
+            self._may_answer.set()
+            self._search_thread.join()
+            self._search_thread = None
+
+
+def main(output: TextIO):
+    """
+    Runs the built-in engine until "quit", like BUILTIN_ENGINE_COMMAND does.
+
+    :param output: Where to send UCI commands to the GUI, with standard output already
+     moved away so logs don't end up there.
+    """
+    UciEngine(output).run()
@@ -0,0 +1,96 @@
+import logging
+import random
+from pathlib import Path
+from typing import Optional
+
+import chess
+import chess.polyglot
+
+from engine.engine_enums import BookSelection
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+class OpeningBook:
+    """
+    Looks up moves in a Polyglot opening book. The book is memory-mapped and binary
+    searched by the Zobrist hash of the position, so only the pages that are looked up
+    are read and even large books take little memory. Not thread-safe, use it from one
+    thread.
+    """
+    _path: Path
+    _selection: BookSelection
+    _random: random.Random
+    _reader: Optional[chess.polyglot.MemoryMappedReader]
+
+    def __init__(self, path: Path, selection: BookSelection = BookSelection.WEIGHTED):
+        """
+        :param path: The path to the Polyglot .bin file.
+        :param selection: How to pick between the moves of a position.
+        """
+        self._path = path
+        self._selection = selection
+        self._random = random.Random()
+        self._reader = None
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns the path to the book.
+
+        :return: The path.
+        """
+        return self._path
+
+    def open(self) -> bool:
+        """
+        Memory-maps the book.
+
+        :return: Whether the book could be opened. If not, no moves are found in it.
+        """
+        try:
+            self._reader = chess.polyglot.open_reader(self._path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to open opening book {self._path}: {e!r}")
+            return False
+        logger.debug(f"Opened opening book {self._path} with {len(self._reader)} "
+                     f"entries")
+        return True
+
+    def moves(self, board: chess.Board) -> list[tuple[chess.Move, int]]:
+        """
+        Gets the moves of a position in the book, like to show as hints.
+
+        :param board: The position.
+        :return: The moves with their weights, the heaviest first.
+        """
+        if self._reader is None:
+            return []
+        entries = sorted(self._reader.find_all(board), key=lambda e: e.weight,
+                         reverse=True)
+        return [(entry.move, entry.weight) for entry in entries]
+
+    def choose(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Picks a move of a position from the book.
+
+        :param board: The position.
+        :return: The move, or None if the position isn't in the book.
+        """
+        if self._reader is None:
+            return None
+        try:
+            if self._selection == BookSelection.BEST:
+                return self._reader.find(board).move
+            return self._reader.weighted_choice(board, random=self._random).move
+        except IndexError:
+            return None
+
+    def close(self):
+        """
+        Unmaps the book.
+        """
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
@@ -0,0 +1,157 @@
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import chess.engine
+
+from engine.engine_enums import BookSelection
+
+# The built-in engine, see engine_search.py. It runs in its own process like any other
+# UCI engine, with the source directory on its path so it can import the engine package.
+# Standard output is moved away before anything is imported, so logs can't end up in
+# the UCI commands sent back.
+BUILTIN_ENGINE_COMMAND = (sys.executable, "-c",
+                          "import os, sys; "
+                          "output = os.fdopen(os.dup(sys.stdout.fileno()), 'w'); "
+                          "os.dup2(sys.stderr.fileno(), sys.stdout.fileno()); "
+                          f"sys.path.insert(0, {str(Path(__file__).parent.parent)!r}); "
+                          "from engine.builtin_uci import main; main(output)")
+# Plays random legal moves, for trying out engine players without a real engine
+RANDOM_ENGINE_COMMAND = (sys.executable,
+                         str(Path(__file__).parent / "random_uci.py"))
+
+
+@dataclass(frozen=True)
+class EngineConfiguration:
+    """
+    Configuration for an engine player. Limits that are None are not used, but there
+    should be at least one, or the engine may think forever.
+    """
+    # The command to start the UCI engine with, like ("stockfish",)
+    command: tuple[str, ...] = BUILTIN_ENGINE_COMMAND
+    # Seconds to think per move
+    time: Optional[float] = 1.0
+    nodes: Optional[int] = None
+    depth: Optional[int] = None
+    # Only set if the engine has the "Skill Level" option, like Stockfish (0 to 20)
+    skill_level: Optional[int] = None
+    # Only set if the engine has the "UCI_LimitStrength" and "UCI_Elo" options
+    elo: Optional[int] = None
+    # Whether to keep thinking on the expected reply during the opponent's turn
+    ponder: bool = False
+    # A Polyglot opening book to play from before the engine is asked, if any
+    book: Optional[Path] = None
+    book_selection: BookSelection = BookSelection.WEIGHTED
+    # A directory of Syzygy endgame tablebases to play perfectly from, if any
+    tablebase: Optional[Path] = None
+
+    @property
+    def limit(self) -> chess.engine.Limit:
+        """
+        Returns the limit to search each move with.
+
+        :return: The search limit.
+        """
+        return chess.engine.Limit(time=self.time, nodes=self.nodes, depth=self.depth)
+
+    def to_json(self) -> dict:
+        """
+        Converts the configuration to something that can be saved as JSON.
+
+        :return: The configuration as a dictionary.
+        """
+        return {"command": list(self.command), "time": self.time, "nodes": self.nodes,
+                "depth": self.depth, "skill_level": self.skill_level,
+                "elo": self.elo, "ponder": self.ponder,
+                "book": str(self.book) if self.book is not None else None,
+                "book_selection": self.book_selection.value,
+                "tablebase": str(self.tablebase)
+                if self.tablebase is not None else None}
+
+    @staticmethod
+    def from_json(data: dict) -> "EngineConfiguration":
+        """
+        Creates a configuration from what `to_json` returned.
+
+        :param data: The configuration as a dictionary.
+        :return: The configuration.
+        """
+        return EngineConfiguration(
+            command=tuple(data["command"]), time=data["time"], nodes=data["nodes"],
+            depth=data["depth"], skill_level=data["skill_level"], elo=data["elo"],
+            ponder=data["ponder"],
+            book=Path(data["book"]) if data["book"] is not None else None,
+            book_selection=BookSelection(data["book_selection"]),
+            tablebase=Path(data["tablebase"])
+            if data["tablebase"] is not None else None)
+
+
+@dataclass
+class TablebaseStats:
+    """
+    Statistics of probing endgame tablebases.
+    """
+    # Probes answered from the cache of recent probes
+    hits: int = 0
+    # Probes that had to read the tables
+    misses: int = 0
+    # Probes of positions that aren't in the tables
+    failures: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Returns the fraction of probes answered from the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0
+
+
+@dataclass(frozen=True)
+class SearchLimits:
+    """
+    When the built-in engine stops searching. Limits that are None are not used.
+    """
+    # Seconds to search for
+    time: Optional[float] = None
+    nodes: Optional[int] = None
+    depth: Optional[int] = None
+    # Searches no faster than this by pausing, so a strength level, which is a number of
+    # nodes per second, thinks for the same time on fast and slow boards
+    nodes_per_second: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SearchInfo:
+    """
+    The progress of the built-in engine after searching to a depth.
+    """
+    depth: int
+    # In centipawns from the point of view of the player to move, see MATE_SCORE
+    score: int
+    nodes: int
+    # Seconds since the search started
+    time: float
+    # The principal variation, the moves both players are expected to play
+    pv: tuple[chess.Move, ...]
+
+    @property
+    def nodes_per_second(self) -> int:
+        """
+        Returns how many nodes were searched per second.
+        """
+        return int(self.nodes / self.time) if self.time > 0 else 0
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """
+    The move the built-in engine chose.
+    """
+    # None if there are no legal moves
+    move: Optional[chess.Move]
+    # The expected reply, to ponder on
+    ponder: Optional[chess.Move]
+    # The last depth that was searched
+    info: SearchInfo
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class BookSelection(Enum):
+    # Picks a move at random, more often the more weight it has in the book
+    WEIGHTED = "Weighted"
+    # Always picks the move with the most weight
+    BEST = "Best"
@@ -0,0 +1,665 @@
+import threading
+import time
+from typing import Callable, Optional
+
+import chess
+
+from engine.engine_dataclasses import SearchInfo, SearchLimits, SearchResult
+from game.position import IncrementalHasher
+
+# Scores are in centipawns from the point of view of the player to move. Being mated
+# in n plies scores -(MATE_SCORE - n), mating in n plies MATE_SCORE - n.
+MATE_SCORE = 100_000
+# Scores beyond this are mates
+MATE_THRESHOLD = MATE_SCORE - 1_000
+INFINITY = MATE_SCORE + 1
+# The deepest the search goes, including check extensions
+MAX_PLY = 64
+# How many nodes are searched between checks of the limits
+CHECK_INTERVAL = 256
+
+# The built-in engine's skill levels, like Stockfish's. Below the highest, each level
+# searches a fixed number of nodes per second.
+MAX_SKILL_LEVEL = 20
+
+DEFAULT_TRANSPOSITION_TABLE_SIZE = 1 << 16
+# Roughly how many bytes an entry of the transposition table takes up
+TRANSPOSITION_TABLE_ENTRY_BYTES = 160
+
+# Bounds of scores in the transposition table
+EXACT = 0
+# The score is at least this, as the search failed high
+LOWER_BOUND = 1
+# The score is at most this, as the search failed low
+UPPER_BOUND = 2
+
+PIECE_VALUES = (0, 100, 320, 330, 500, 900, 0)
+
+# Piece-square tables from the Simplified Evaluation Function, as seen by white with
+# the 8th rank first
+_PIECE_SQUARE_TABLES = {
+    chess.PAWN: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0),
+    chess.KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    chess.BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    chess.ROOK: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0),
+    chess.QUEEN: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20),
+    chess.KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20)
+}
+# The king should come out once the queens and most pieces are off the board
+_KING_ENDGAME_TABLE = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50)
+# The non-pawn material of both players at which the endgame starts
+ENDGAME_MATERIAL = 2 * (PIECE_VALUES[chess.ROOK] + PIECE_VALUES[chess.BISHOP])
+
+
+def _square_values(table: tuple[int, ...], value: int) -> tuple[list[int], list[int]]:
+    """
+    Adds a piece value to a piece-square table, by square for both colors.
+
+    :param table: The piece-square table, as seen by white with the 8th rank first.
+    :param value: The value of the piece.
+    :return: The value of the piece on each square for white and for black.
+    """
+    white = [value + table[chess.square_mirror(square)] for square in chess.SQUARES]
+    return white, [white[chess.square_mirror(square)] for square in chess.SQUARES]
+
+
+# The value of a piece on a square, by piece type, then color, then square
+_SQUARE_VALUES = {piece_type: _square_values(table, PIECE_VALUES[piece_type])
+                  for piece_type, table in _PIECE_SQUARE_TABLES.items()}
+_KING_ENDGAME_VALUES = _square_values(_KING_ENDGAME_TABLE, 0)
+
+
+def _score_squares(bitboard: int, values: list[int]) -> int:
+    """
+    Sums up the values of the occupied squares of a bitboard.
+
+    :param bitboard: The bitboard.
+    :param values: The value of each square.
+    :return: The sum.
+    """
+    score = 0
+    while bitboard:
+        lowest = bitboard & -bitboard
+        score += values[lowest.bit_length() - 1]
+        bitboard ^= lowest
+    return score
+
+
+def evaluate(board: chess.Board) -> int:
+    """
+    Evaluates a position statically, by the material and where each piece is.
+
+    :param board: The position.
+    :return: The score in centipawns from the point of view of the player to move.
+    """
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    score = 0
+    non_pawn_material = 0
+    for piece_type, pieces in ((chess.PAWN, board.pawns),
+                               (chess.KNIGHT, board.knights),
+                               (chess.BISHOP, board.bishops),
+                               (chess.ROOK, board.rooks),
+                               (chess.QUEEN, board.queens)):
+        if not pieces:
+            continue
+        white_values, black_values = _SQUARE_VALUES[piece_type]
+        score += _score_squares(pieces & white, white_values) - \
+            _score_squares(pieces & black, black_values)
+        if piece_type != chess.PAWN:
+            non_pawn_material += PIECE_VALUES[piece_type] * pieces.bit_count()
+    white_values, black_values = _KING_ENDGAME_VALUES \
+        if non_pawn_material <= ENDGAME_MATERIAL else _SQUARE_VALUES[chess.KING]
+    score += _score_squares(board.kings & white, white_values) - \
+        _score_squares(board.kings & black, black_values)
+    return score if board.turn == chess.WHITE else -score
+
+
+def nodes_per_second_for_skill(skill_level: int) -> Optional[int]:
+    """
+    Gets how many nodes per second the built-in engine searches at a skill level.
+
+    :param skill_level: The skill level, from 0 to MAX_SKILL_LEVEL.
+    :return: The nodes per second, or None for no limit at the highest skill level.
+    """
+    if skill_level >= MAX_SKILL_LEVEL:
+        return None
+    # From 100 nodes per second at level 0, doubling every 2 levels
+    return int(100 * 2 ** (max(skill_level, 0) / 2))
+
+
+class TranspositionTable:
+    """
+    Remembers the results of searching positions, in a fixed number of entries. An
+    entry is replaced by a search of the same position, by an equally deep or deeper
+    search of another position, or by any search once it is left over from an earlier
+    search.
+    """
+    # (key, depth, score, bound, move, generation) or None, by the key's lowest bits
+    _entries: list[Optional[tuple[int, int, int, int, Optional[chess.Move], int]]]
+    _mask: int
+    # Incremented for every search, to tell entries of earlier searches apart
+    _generation: int
+
+    def __init__(self, size: int = DEFAULT_TRANSPOSITION_TABLE_SIZE):
+        """
+        :param size: The number of entries, rounded down to a power of two.
+        """
+        size = 1 << (max(size, 1).bit_length() - 1)
+        self._entries = [None] * size
+        self._mask = size - 1
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def new_search(self):
+        """
+        Marks every entry as left over from an earlier search.
+        """
+        self._generation += 1
+
+    def clear(self):
+        """
+        Removes every entry, like for a new game.
+        """
+        self._entries = [None] * len(self._entries)
+
+    def probe(self, key: int) -> Optional[tuple[int, int, int, Optional[chess.Move]]]:
+        """
+        Looks up a position.
+
+        :param key: The hash of the position.
+        :return: The depth, score, bound and best move found, or None if the position
+         isn't in the table.
+        """
+        entry = self._entries[key & self._mask]
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1:5]
+
+    def store(self, key: int, depth: int, score: int, bound: int,
+              move: Optional[chess.Move]):
+        """
+        Remembers the result of searching a position, unless a more valuable entry is
+        in its place.
+
+        :param key: The hash of the position.
+        :param depth: The depth the position was searched to.
+        :param score: The score of the position.
+        :param bound: Whether the score is EXACT, a LOWER_BOUND or an UPPER_BOUND.
+        :param move: The best move found, or None.
+        """
+        index = key & self._mask
+        entry = self._entries[index]
+        if entry is not None and entry[0] != key and depth < entry[1] and \
+                entry[5] == self._generation:
+            return
+        if move is None and entry is not None and entry[0] == key:
+            # Keep the best move of a previous search of the position
+            move = entry[4]
+        self._entries[index] = (key, depth, score, bound, move, self._generation)
+
+    @property
+    def permill_full(self) -> int:
+        """
+        Returns how full the table is with entries of the current search, in permill,
+        estimated from the first thousand entries.
+
+        :return: The permill of entries used.
+        """
+        sample = self._entries[:1000]
+        used = sum(1 for entry in sample
+                   if entry is not None and entry[5] == self._generation)
+        return used * 1000 // len(sample)
+
+
+class SearchStopped(Exception):
+    """
+    Raised inside the search to unwind it once a limit is reached.
+    """
+
+
+class Searcher:
+    """
+    The built-in engine: an alpha-beta search on python-chess boards with iterative
+    deepening, a transposition table and move ordering by the transposition table,
+    MVV-LVA, killer moves and the history heuristic. Keep one per game, as the
+    transposition table and history carry over from move to move.
+    """
+    _table: TranspositionTable
+    # Hashes positions for the transposition table and to find repetitions, far faster
+    # than Zobrist hashing every position from scratch
+    _hasher: IncrementalHasher
+    # Quiet moves that caused a beta cutoff, two per ply
+    _killers: list[list[Optional[chess.Move]]]
+    # How often quiet moves caused cutoffs, weighted by depth, by color and then
+    # by from square * 64 + to square
+    _history: list[list[int]]
+    # Positions since the last irreversible move, before the root and on the current
+    # path, to score repetitions as draws
+    _seen: set[int]
+    _stop_event: threading.Event
+    _nodes: int
+    _next_check: int
+    _start: float
+    # When the limits were last set and the nodes searched by then, which the nodes
+    # per second are paced from, as a search that was pondering only counts from the
+    # move pondered on being played
+    _limited_at: float
+    _limited_nodes: int
+    _deadline: Optional[float]
+    _max_nodes: Optional[int]
+    _nodes_per_second: Optional[int]
+    _root_move: Optional[chess.Move]
+
+    def __init__(self, table_size: int = DEFAULT_TRANSPOSITION_TABLE_SIZE):
+        """
+        :param table_size: The number of entries of the transposition table.
+        """
+        self._table = TranspositionTable(table_size)
+        self._hasher = IncrementalHasher()
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history = [[0] * 4096, [0] * 4096]
+        self._seen = set()
+        self._stop_event = threading.Event()
+        self._nodes = 0
+        self._next_check = 0
+        self._start = 0
+        self._limited_at = 0
+        self._limited_nodes = 0
+        self._deadline = None
+        self._max_nodes = None
+        self._nodes_per_second = None
+        self._root_move = None
+
+    @property
+    def table(self) -> TranspositionTable:
+        """
+        Returns the transposition table.
+
+        :return: The transposition table.
+        """
+        return self._table
+
+    def clear(self):
+        """
+        Forgets everything learned from previous searches, like for a new game.
+        """
+        self._table.clear()
+        self._history = [[0] * 4096, [0] * 4096]
+
+    def stop(self):
+        """
+        Stops the search as soon as possible. Safe to call from another thread.
+        """
+        self._stop_event.set()
+
+    def limit(self, limits: SearchLimits):
+        """
+        Sets the time and node limits of the running search, counting from now, like
+        when the opponent played the move that was pondered on. Safe to call from
+        another thread.
+
+        :param limits: The limits. The depth limit is not changed.
+        """
+        self._limited_at = time.perf_counter()
+        self._limited_nodes = self._nodes
+        self._deadline = self._limited_at + limits.time \
+            if limits.time is not None else None
+        self._max_nodes = self._nodes + limits.nodes \
+            if limits.nodes is not None else None
+        self._nodes_per_second = limits.nodes_per_second
+        self._next_check = self._nodes
+
+    def search(self, board: chess.Board, limits: SearchLimits,
+               on_info: Optional[Callable[[SearchInfo], None]] = None) -> SearchResult:
+        """
+        Searches for the best move, deeper and deeper until a limit is reached or
+        `stop` is called.
+
+        :param board: The position to search. It isn't modified.
+        :param limits: When to stop searching.
+        :param on_info: Called after every depth searched.
+        :return: The best move found.
+        """
+        # Thrown away when the search is stopped, instead of unwinding every move
+        board = board.copy()
+        self._stop_event.clear()
+        self._nodes = 0
+        self._start = time.perf_counter()
+        self._root_move = None
+        self.limit(limits)
+        self._table.new_search()
+        for history in self._history:
+            for i, score in enumerate(history):
+                if score:
+                    history[i] = score // 8
+        self._killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._seen = set()
+        previous = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            previous.pop()
+            self._seen.add(self._hasher.hash(previous))
+
+        legal_moves = list(board.generate_legal_moves())
+        info = SearchInfo(0, -MATE_SCORE if board.is_check() else 0, 0, 0, ())
+        if not legal_moves:
+            return SearchResult(None, None, info)
+        best_move = legal_moves[0]
+        max_depth = min(limits.depth, MAX_PLY) if limits.depth is not None \
+            else MAX_PLY
+        try:
+            for depth in range(1, max_depth + 1):
+                score = self._search(board, depth, -INFINITY, INFINITY, 0)
+                best_move = self._root_move or best_move
+                info = SearchInfo(depth, score, self._nodes,
+                                  time.perf_counter() - self._start,
+                                  self._principal_variation(board, best_move, depth))
+                if on_info is not None:
+                    on_info(info)
+                if abs(score) > MATE_THRESHOLD and \
+                        MATE_SCORE - abs(score) <= depth:
+                    # Deeper searches can't find a faster mate
+                    break
+                if self._deadline is not None and self._nodes_per_second is None and \
+                        time.perf_counter() - self._limited_at > \
+                        (self._deadline - self._limited_at) / 2:
+                    # The next depth takes longer than everything so far
+                    break
+        except SearchStopped:
+            # Moves that beat the previous best move at the stopped depth are better
+            best_move = self._root_move or best_move
+        if len(legal_moves) == 1:
+            best_move = legal_moves[0]
+        pv = info.pv if info.pv and info.pv[0] == best_move else (best_move,)
+        return SearchResult(best_move, pv[1] if len(pv) > 1 else None, info)
+
+    def _check_limits(self):
+        """
+        Stops the search if a limit is reached, and pauses it if it is ahead of its
+        nodes per second.
+        """
+        self._next_check = self._nodes + CHECK_INTERVAL
+        if self._max_nodes is not None:
+            if self._nodes >= self._max_nodes:
+                raise SearchStopped()
+            self._next_check = min(self._next_check, self._max_nodes)
+        if self._stop_event.is_set():
+            raise SearchStopped()
+        now = time.perf_counter()
+        if self._deadline is not None and now >= self._deadline:
+            raise SearchStopped()
+        if self._nodes_per_second is not None:
+            # Pace the search about 20 times a second
+            self._next_check = min(self._next_check,
+                                   self._nodes + max(self._nodes_per_second // 20, 1))
+            ahead = (self._nodes - self._limited_nodes) / self._nodes_per_second - \
+                (now - self._limited_at)
+            if self._deadline is not None:
+                ahead = min(ahead, self._deadline - now)
+            if ahead > 0 and self._stop_event.wait(ahead):
+                raise SearchStopped()
+
+    def _order_moves(self, board: chess.Board, moves: list[chess.Move],
+                     best_move: Optional[chess.Move], ply: int) -> list[chess.Move]:
+        """
+        Sorts moves by how likely they are to be the best: the best move found before,
+        captures of the most valuable victim by the least valuable attacker (MVV-LVA),
+        promotions, killer moves and then quiet moves by their history.
+
+        :param board: The position.
+        :param moves: The legal moves of the position.
+        :param best_move: The best move of a previous search of the position, or None.
+        :param ply: How many plies the position is from the root.
+        :return: The sorted moves.
+        """
+        killers = self._killers[ply]
+        history = self._history[board.turn]
+        them = board.occupied_co[not board.turn]
+        scores = {}
+        for move in moves:
+            if move == best_move:
+                scores[move] = 1 << 30
+            elif them & chess.BB_SQUARES[move.to_square]:
+                scores[move] = (1 << 24) + \
+                    10 * board.piece_type_at(move.to_square) - \
+                    board.piece_type_at(move.from_square)
+            elif board.is_en_passant(move):
+                scores[move] = (1 << 24) + 10 * chess.PAWN - chess.PAWN
+            elif move.promotion is not None:
+                scores[move] = (1 << 23) + move.promotion
+            elif move == killers[0]:
+                scores[move] = (1 << 22) + 1
+            elif move == killers[1]:
+                scores[move] = 1 << 22
+            else:
+                scores[move] = history[move.from_square * 64 + move.to_square]
+        return sorted(moves, key=scores.__getitem__, reverse=True)
+
+    def _search(self, board: chess.Board, depth: int, alpha: int, beta: int,
+                ply: int) -> int:
+        """
+        Searches a position with alpha-beta pruning, as a principal variation search.
+
+        :param board: The position, which is searched by pushing and popping moves.
+        :param depth: How many more plies to search before the quiescence search.
+        :param alpha: The score the player to move is already guaranteed.
+        :param beta: The score the opponent is already guaranteed.
+        :param ply: How many plies the position is from the root.
+        :return: The score of the position.
+        """
+        key = self._hasher.hash(board)
+        if ply > 0 and (key in self._seen or board.halfmove_clock >= 100):
+            return 0
+        in_check = board.is_check()
+        if in_check and ply < MAX_PLY:
+            # Don't stop searching in the middle of a sequence of checks
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(board, alpha, beta, ply)
+        self._nodes += 1
+        if self._nodes >= self._next_check:
+            self._check_limits()
+
+        best_move = None
+        entry = self._table.probe(key)
+        if entry is not None:
+            entry_depth, score, bound, best_move = entry
+            if ply > 0 and entry_depth >= depth:
+                # Mates are stored relative to the position
+                if score > MATE_THRESHOLD:
+                    score -= ply
+                elif score < -MATE_THRESHOLD:
+                    score += ply
+                if bound == EXACT or \
+                        (bound == LOWER_BOUND and score >= beta) or \
+                        (bound == UPPER_BOUND and score <= alpha):
+                    return score
+
+        if not in_check and ply > 0 and depth >= 3 and beta < MATE_THRESHOLD and \
+                board.occupied_co[board.turn] & ~(board.pawns | board.kings):
+            # Null move pruning: if passing still fails high, a real move will too,
+            # except in zugzwang, which is rare with pieces left
+            board.push(chess.Move.null())
+            score = -self._search(board, depth - 3, -beta, -beta + 1, ply + 1)
+            board.pop()
+            if score >= beta:
+                return beta
+
+        moves = list(board.generate_legal_moves())
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        moves = self._order_moves(board, moves, best_move, ply)
+
+        self._seen.add(key)
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        them = board.occupied_co[not board.turn]
+        for i, move in enumerate(moves):
+            quiet = not them & chess.BB_SQUARES[move.to_square] and \
+                move.promotion is None and not board.is_en_passant(move)
+            board.push(move)
+            if i == 0:
+                score = -self._search(board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Late move reduction: quiet moves ordered late are rarely the best,
+                # so search them less deep first
+                reduction = 1 if i >= 3 and depth >= 3 and quiet and \
+                    not in_check and not board.is_check() else 0
+                # Prove the move is worse with a null window, search it fully if not
+                score = -self._search(board, depth - 1 - reduction, -alpha - 1, -alpha,
+                                      ply + 1)
+                if score > alpha and (reduction or score < beta):
+                    score = -self._search(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if ply == 0:
+                        self._root_move = move
+                    if alpha >= beta:
+                        if quiet:
+                            killers = self._killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self._history[board.turn][
+                                move.from_square * 64 + move.to_square] += depth * depth
+                        break
+        self._seen.discard(key)
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER_BOUND
+        stored_score = best_score
+        if stored_score > MATE_THRESHOLD:
+            stored_score += ply
+        elif stored_score < -MATE_THRESHOLD:
+            stored_score -= ply
+        self._table.store(key, depth, stored_score, bound, best_move)
+        return best_score
+
+    def _quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
+        """
+        Searches only captures (or every move when in check) until the position is
+        quiet, so the static evaluation isn't made in the middle of an exchange.
+
+        :param board: The position.
+        :param alpha: The score the player to move is already guaranteed.
+        :param beta: The score the opponent is already guaranteed.
+        :param ply: How many plies the position is from the root.
+        :return: The score of the position.
+        """
+        self._nodes += 1
+        if self._nodes >= self._next_check:
+            self._check_limits()
+        in_check = board.is_check()
+        if in_check:
+            moves = list(board.generate_legal_moves())
+            if not moves:
+                return -MATE_SCORE + ply
+        else:
+            stand_pat = evaluate(board)
+            if stand_pat >= beta or ply >= MAX_PLY:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = list(board.generate_legal_captures())
+        if not moves:
+            return alpha
+        for move in self._order_moves(board, moves, None, min(ply, MAX_PLY)):
+            board.push(move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def _principal_variation(self, board: chess.Board, best_move: chess.Move,
+                             depth: int) -> tuple[chess.Move, ...]:
+        """
+        Follows the best moves in the transposition table from the root.
+
+        :param board: The root position, which is restored afterward.
+        :param best_move: The best move at the root.
+        :param depth: The most moves to follow.
+        :return: The principal variation.
+        """
+        pv = []
+        seen = set()
+        move = best_move
+        while move is not None and len(pv) < depth and board.is_legal(move):
+            pv.append(move)
+            board.push(move)
+            key = self._hasher.hash(board)
+            if key in seen:
+                break
+            seen.add(key)
+            entry = self._table.probe(key)
+            move = entry[3] if entry is not None else None
+        for _ in pv:
+            board.pop()
+        return tuple(pv)
@@ -0,0 +1,209 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Hashable, Optional
+
+import chess
+import chess.syzygy
+
+from engine.engine_dataclasses import TablebaseStats
+from game.position import transposition_hash
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# The most table files open at once, the least recently used is closed beyond that
+TABLEBASE_MAX_FDS = 32
+# The most recent probe results remembered
+TABLEBASE_CACHE_SIZE = 4096
+
+
+class TablebaseService:
+    """
+    Probes Syzygy endgame tablebases for the outcome with perfect play (WDL) and the
+    distance to the next capture or pawn move (DTZ). Tables are only opened once a
+    position needs them, with at most a number of files open at once, and recent
+    results are cached, as engines probe the same positions again and again. Safe to
+    use from any thread.
+    """
+    _directory: Path
+    _max_fds: int
+    _cache_size: int
+    _lock: threading.Lock
+    _tablebase: Optional[chess.syzygy.Tablebase]
+    # The most pieces of any table, 0 if there are none
+    _max_pieces: int
+    # Probe results by kind and position, the most recently used last. None if the
+    # position isn't in the tables.
+    _cache: OrderedDict[Hashable, Optional[int]]
+    _stats: TablebaseStats
+
+    def __init__(self, directory: Path, max_fds: int = TABLEBASE_MAX_FDS,
+                 cache_size: int = TABLEBASE_CACHE_SIZE):
+        """
+        :param directory: The directory with the .rtbw and .rtbz files.
+        :param max_fds: The most table files open at once.
+        :param cache_size: The most recent probe results remembered.
+        """
+        self._directory = directory
+        self._max_fds = max_fds
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._tablebase = None
+        self._max_pieces = 0
+        self._cache = OrderedDict()
+        self._stats = TablebaseStats()
+
+    @property
+    def max_pieces(self) -> int:
+        """
+        Returns the most pieces, including kings, of a position that can be probed.
+
+        :return: The number of pieces, 0 if there are no tables.
+        """
+        return self._max_pieces
+
+    @property
+    def stats(self) -> TablebaseStats:
+        """
+        Returns the statistics of probing so far.
+
+        :return: A copy of the statistics.
+        """
+        with self._lock:
+            return replace(self._stats)
+
+    def open(self) -> bool:
+        """
+        Finds the tables in the directory, without opening them yet.
+
+        :return: Whether any tables were found.
+        """
+        tablebase = chess.syzygy.Tablebase(max_fds=self._max_fds)
+        try:
+            found = tablebase.add_directory(str(self._directory))
+        except OSError as e:
+            logger.warning(f"Failed to open tablebases in {self._directory}: {e!r}")
+            return False
+        if found == 0:
+            logger.warning(f"No tablebases found in {self._directory}")
+            return False
+        with self._lock:
+            self._tablebase = tablebase
+            # Tables are named by their pieces, like KRvK
+            self._max_pieces = max(len(name) - 1 for name in tablebase.wdl)
+        logger.debug(f"Found {found} tablebase files in {self._directory}, up to "
+                     f"{self._max_pieces} pieces")
+        return True
+
+    def can_probe(self, board: chess.Board) -> bool:
+        """
+        Checks whether a position has few enough pieces to be in the tables. The
+        tables might still be missing the position's material.
+
+        :param board: The position.
+        :return: Whether the position might be in the tables.
+        """
+        return chess.popcount(board.occupied) <= self._max_pieces and \
+            not board.castling_rights
+
+    def _probe(self, kind: str, board: chess.Board,
+               probe: Callable[[chess.Board], int]) -> Optional[int]:
+        """
+        Probes the tables through the cache.
+
+        :param kind: What is probed, to cache it separately.
+        :param board: The position.
+        :param probe: Probes the tables.
+        :return: The result, or None if the position isn't in the tables.
+        """
+        if not self.can_probe(board):
+            return None
+        key = (kind, transposition_hash(board))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._stats.hits += 1
+                return self._cache[key]
+            self._stats.misses += 1
+            try:
+                result = probe(board)
+            except KeyError:
+                # A missing table, or a position that can't be in the tables
+                self._stats.failures += 1
+                result = None
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def probe_wdl(self, board: chess.Board) -> Optional[int]:
+        """
+        Gets the outcome of a position with perfect play.
+
+        :param board: The position.
+        :return: 2 for a win, 1 for a win that is a draw by the 50-move rule, 0 for a
+         draw, -1 and -2 for the same losses, all for the player to move. None if the
+         position isn't in the tables.
+        """
+        return self._probe("wdl", board, self._tablebase.probe_wdl) \
+            if self._tablebase is not None else None
+
+    def probe_dtz(self, board: chess.Board) -> Optional[int]:
+        """
+        Gets how many plies there are to the next capture or pawn move with perfect
+        play.
+
+        :param board: The position.
+        :return: Positive if the player to move wins, negative if they lose and 0 if
+         it's a draw, like probe_wdl. None if the position isn't in the tables.
+        """
+        return self._probe("dtz", board, self._tablebase.probe_dtz) \
+            if self._tablebase is not None else None
+
+    def best_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """
+        Picks the move with the best outcome: the fastest win, or the slowest loss.
+
+        :param board: The position.
+        :return: The move, or None if any position after a move isn't in the tables
+         or there are no legal moves.
+        """
+        best = None
+        best_key = None
+        child = board.copy(stack=False)
+        for move in board.legal_moves:
+            zeroing = board.is_zeroing(move)
+            child.push(move)
+            try:
+                if child.is_checkmate():
+                    return move
+                child_wdl = self.probe_wdl(child)
+                child_dtz = self.probe_dtz(child)
+            finally:
+                child.pop()
+            if child_wdl is None or child_dtz is None:
+                return None
+            wdl = -child_wdl
+            if wdl > 0:
+                # Win with captures and pawn moves, which make progress, then quickly
+                key = (wdl, zeroing, -abs(child_dtz))
+            else:
+                # Avoid captures and pawn moves and lose slowly
+                key = (wdl, not zeroing, abs(child_dtz))
+            if best_key is None or key > best_key:
+                best, best_key = move, key
+        return best
+
+    def close(self):
+        """
+        Closes the open tables.
+        """
+        with self._lock:
+            if self._tablebase is not None:
+                self._tablebase.close()
+                self._tablebase = None
+                self._max_pieces = 0
+            self._cache.clear()
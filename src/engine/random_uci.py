@@ -0,0 +1,59 @@
+"""
+A trivial UCI engine that plays random legal moves, as a stand-in for a real engine
+when trying out or testing engine players. Run it as a script, it talks UCI over
+stdin and stdout.
+"""
+import random
+import sys
+
+import chess
+
+
+def main():
+    board = chess.Board()
+    # The best move of a search that may only be answered once it is stopped
+    pending = None
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+        if command == "uci":
+            print("id name Random mover")
+            print("id author Chessboard-Pi")
+            print("option name Skill Level type spin default 20 min 0 max 20")
+            print("uciok")
+        elif command == "isready":
+            print("readyok")
+        elif command == "position":
+            if "moves" in tokens:
+                moves = tokens[tokens.index("moves") + 1:]
+                tokens = tokens[:tokens.index("moves")]
+            else:
+                moves = []
+            if tokens[1] == "startpos":
+                board = chess.Board()
+            else:
+                board = chess.Board(" ".join(tokens[2:]))
+            for move in moves:
+                board.push_uci(move)
+        elif command == "go":
+            moves = list(board.legal_moves)
+            print(f"info depth 1 score cp 0 nodes {len(moves)}")
+            bestmove = f"bestmove {random.choice(moves).uci() if moves else '0000'}"
+            if "ponder" in tokens or "infinite" in tokens:
+                pending = bestmove
+            else:
+                print(bestmove)
+        elif command in ("stop", "ponderhit"):
+            if pending is not None:
+                print(pending)
+                pending = None
+        elif command == "quit":
+            break
+        # Everything else, like setoption and ucinewgame, has nothing to do
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,102 @@
 import logging
+from datetime import date
 from typing import Optional
 
 import chess
+import chess.pgn
 
 from game.chess_game_enums import ChessGameOutcomeType
+from game.position import Position, transposition_hash
 from utils.logger import create_logger
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
 
 class ChessGame:
-    _board: chess.Board
+    # Shared with the interface of the chessboard the game is played on
+    _position: Position
     _claim_draw: bool
     _offered_draw: Optional[chess.WHITE | chess.BLACK] = None
     _ended_to_agreed_draw: bool = False
     _ended_to_resignation: bool = False
+    # Incremented whenever a draw or resignation changes the game, the version of the
+    # game also includes the version of the position
+    _version: int = 0
+    # The outcome and draw claimability, cached for the version they were evaluated at
+    _outcome: Optional[ChessGameOutcomeType] = None
+    _outcome_version: int = -1
+    _can_claim_draw: bool = False
+    _can_claim_draw_version: int = -1
 
-    def __init__(self):
-        self._board = chess.Board()
+    def __init__(self, position: Optional[Position] = None):
+        """
+        :param position: The position to play on, like the one of a chessboard
+         interface. Defaults to a new position at the starting position.
+        """
+        self._position = position if position is not None else Position()
         self._claim_draw = False
         self._offered_draw = None
         self._ended_to_agreed_draw = False
         self._ended_to_resignation = False
+        self._version = 0
+        self._outcome = None
+        self._outcome_version = -1
+        self._can_claim_draw = False
+        self._can_claim_draw_version = -1
+
+    @property
+    def position(self) -> Position:
+        """
+        Returns the position the game is played on.
+
+        :return: The position.
+        """
+        return self._position
 
     @property
     def board(self) -> chess.Board:
         """
-        Returns the board instance.
+        Returns the board of the position. It must not be modified, use `push` instead.
+
+        :return: The board.
+        """
+        return self._position.board
+
+    @property
+    def version(self) -> int:
+        """
+        Returns the version of the game, which changes whenever a move is pushed or a
+        draw or resignation changes the game.
+
+        :return: The version of the game.
+        """
+        return self._position.version + self._version
 
-        :return: The board instance.
+    def push(self, move: chess.Move):
         """
-        return self._board
+        Makes a move on the position. When the position is shared with a chessboard
+        interface, add the move through the interface instead, so it is recorded.
+
+        :param move: The move to make.
+        """
+        self._position.push(move)
 
     @property
     def outcome(self) -> Optional[ChessGameOutcomeType]:
         """
-        Returns the outcome of the game. If None, the game is still in progress.
+        Returns the outcome of the game. If None, the game is still in progress. Only
+        evaluated once per version of the game.
+
+        :return: The outcome of the game.
+        """
+        if self._outcome_version != self.version:
+            self._outcome = self._evaluate_outcome()
+            self._outcome_version = self.version
+        return self._outcome
+
+    def _evaluate_outcome(self) -> Optional[ChessGameOutcomeType]:
+        """
+        Evaluates the outcome of the game.
 
         :return: The outcome of the game.
         """
@@ -43,7 +104,7 @@ class ChessGame:
             return ChessGameOutcomeType.RESIGNATION_BY_WHITE if self.board.turn == chess.WHITE else ChessGameOutcomeType.RESIGNATION_BY_BLACK
         elif self._ended_to_agreed_draw:
             return ChessGameOutcomeType.AGREED_DRAW
-        o = self._board.outcome(claim_draw=self._claim_draw)
+        o = self._board_outcome()
         if o is None:
             return None
         if o.termination == chess.Termination.CHECKMATE:
@@ -62,14 +123,119 @@ class ChessGame:
             return ChessGameOutcomeType.CLAIMED_THREEFOLD_REPETITION
         return None
 
+    @property
+    def result(self) -> str:
+        """
+        Returns the result of the game as written in PGN.
+
+        :return: "1-0", "0-1" or "1/2-1/2", or "*" if the game is still in progress.
+        """
+        o = self.outcome
+        if o is None:
+            return "*"
+        if o in (ChessGameOutcomeType.CHECKMATE_BY_WHITE,
+                 ChessGameOutcomeType.RESIGNATION_BY_BLACK):
+            return "1-0"
+        if o in (ChessGameOutcomeType.CHECKMATE_BY_BLACK,
+                 ChessGameOutcomeType.RESIGNATION_BY_WHITE):
+            return "0-1"
+        return "1/2-1/2"
+
+    def to_pgn(self, white: str, black: str) -> chess.pgn.Game:
+        """
+        Converts the game to PGN, like to archive it once it is over.
+
+        :param white: The name of the white player.
+        :param black: The name of the black player.
+        :return: The game.
+        """
+        game = chess.pgn.Game.from_board(self.board)
+        game.headers["Event"] = "Chessboard-Pi game"
+        game.headers["Date"] = date.today().strftime("%Y.%m.%d")
+        game.headers["White"] = white
+        game.headers["Black"] = black
+        game.headers["Result"] = self.result
+        if self.outcome is not None:
+            game.headers["Termination"] = self.outcome.value
+        return game
+
     @property
     def can_claim_draw(self) -> bool:
         """
-        Returns True if the player can claim a draw, False otherwise.
+        Returns True if the player can claim a draw, False otherwise. Only evaluated
+        once per version of the game.
 
         :return: True if the player can claim a draw, False otherwise.
         """
-        return self._board.can_claim_draw()
+        if self._can_claim_draw_version != self.version:
+            self._can_claim_draw = self._can_claim_fifty_moves() or \
+                                   self._can_claim_threefold_repetition()
+            self._can_claim_draw_version = self.version
+        return self._can_claim_draw
+
+    def _board_outcome(self) -> Optional[chess.Outcome]:
+        """
+        Same as `chess.Board.outcome`, but checks for repetitions with the repetition
+        table instead of replaying the move stack.
+
+        :return: The outcome of the board, None if the game is not over.
+        """
+        has_legal_moves = any(self.board.generate_legal_moves())
+        if not has_legal_moves and self.board.is_check():
+            return chess.Outcome(chess.Termination.CHECKMATE, not self.board.turn)
+        if self.board.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if not has_legal_moves:
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if self.board.halfmove_clock >= 150:
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self._position.repetitions() >= 5:
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        if self._claim_draw:
+            if self._can_claim_fifty_moves():
+                return chess.Outcome(chess.Termination.FIFTY_MOVES, None)
+            if self._can_claim_threefold_repetition():
+                return chess.Outcome(chess.Termination.THREEFOLD_REPETITION, None)
+        return None
+
+    def _can_claim_fifty_moves(self) -> bool:
+        """
+        Same as `chess.Board.can_claim_fifty_moves`.
+
+        :return: True if a draw can be claimed by the fifty-move rule.
+        """
+        # Only then can it be reached with the next move, which is rare
+        if self.board.halfmove_clock < 99:
+            return False
+        return self.board.can_claim_fifty_moves()
+
+    def _can_claim_threefold_repetition(self) -> bool:
+        """
+        Same as `chess.Board.can_claim_threefold_repetition`, but with the repetition
+        table instead of replaying the move stack.
+
+        :return: True if a draw can be claimed by threefold repetition.
+        """
+        if self._position.repetitions() >= 3:
+            return True
+        # The next move can only repeat a position that already occurred twice
+        if not self._position.any_repeated():
+            return False
+        # Looks ahead on a copy, as the position may be read by move detection at the
+        # same time
+        board = self._position.board.copy(stack=False)
+        for move in board.generate_legal_moves():
+            # Captures and pawn moves can't lead to a position since the last
+            # irreversible move
+            if board.is_zeroing(move):
+                continue
+            board.push(move)
+            try:
+                if self._position.repetitions(transposition_hash(board)) >= 2:
+                    return True
+            finally:
+                board.pop()
+        return False
 
     def claim_draw(self):
         """
@@ -77,6 +243,7 @@ class ChessGame:
         """
         if self.can_claim_draw:
             self._claim_draw = True
+            self._version += 1
             logger.debug(f"{'White' if self.board.turn == chess.WHITE else 'Black'} "
                          f"claiming draw")
         else:
@@ -97,6 +264,7 @@ class ChessGame:
         """
         if self._offered_draw is None:
             self._offered_draw = self.board.turn
+            self._version += 1
             logger.debug(f"{'White' if self.board.turn == chess.WHITE else 'Black'} "
                          f"offering draw")
         else:
@@ -109,6 +277,7 @@ class ChessGame:
         if self._offered_draw is not None:
             self._offered_draw = None
             self._ended_to_agreed_draw = True
+            self._version += 1
             logger.debug(f"{'White' if self.board.turn == chess.BLACK else 'Black'} "
                          f"accepting draw")
         else:
@@ -120,6 +289,7 @@ class ChessGame:
         """
         if self._offered_draw is not None:
             self._offered_draw = None
+            self._version += 1
             logger.debug(f"{'White' if self.board.turn == chess.BLACK else 'Black'} "
                          f"declining draw")
         else:
@@ -130,5 +300,6 @@ class ChessGame:
         The current player resigns the game. The game is over and the other player wins.
         """
         self._ended_to_resignation = True
+        self._version += 1
         logger.debug(f"{'White' if self.board.turn == chess.WHITE else 'Black'} "
                      f"resigning")
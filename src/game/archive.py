@@ -0,0 +1,385 @@
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import chess
+import chess.pgn
+
+from game.chess_game_dataclasses import ArchiveImportStats, ArchivedGame
+from game.chess_game_exceptions import ChessGameArchiveError
+from game.position import IncrementalHasher, transposition_hash
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+ARCHIVE_VERSION = 1
+# Every position of every game is indexed by its Zobrist hash, as compared for
+# repetitions, so finding the games that reached a position is a lookup in the index.
+# Moves are stored as 2 bytes each, the from square, the to square shifted left by 6
+# and the promotion piece type shifted left by 12.
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    white TEXT NOT NULL,
+    black TEXT NOT NULL,
+    result TEXT NOT NULL,
+    date TEXT NOT NULL,
+    event TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    moves BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    zobrist INTEGER NOT NULL,
+    game_id INTEGER NOT NULL,
+    ply INTEGER NOT NULL,
+    PRIMARY KEY (zobrist, game_id, ply)
+) WITHOUT ROWID;
+"""
+# How much memory SQLite may cache pages of the archive in, in kilobytes
+ARCHIVE_CACHE_KB = 16384
+# How many games are read from a PGN before they are written to the archive
+IMPORT_BATCH_GAMES = 1000
+# How many games are listed when searching for a position at most by default
+DEFAULT_SEARCH_LIMIT = 100
+
+
+def position_key(position_hash: int) -> int:
+    """
+    Converts a Zobrist hash to the key it is indexed by, as SQLite integers are signed.
+
+    :param position_hash: The Zobrist hash, like `transposition_hash` returns.
+    :return: The key.
+    """
+    return position_hash - (1 << 64) if position_hash >= 1 << 63 else position_hash
+
+
+@dataclass
+class _GameRecord:
+    """
+    A game as it is written to the archive.
+    """
+    headers: dict[str, str]
+    moves: bytes
+    # The keys of the positions of the game, from the starting position
+    keys: list[int]
+    error: Optional[Exception]
+
+
+class _ArchiveVisitor(chess.pgn.BaseVisitor[_GameRecord]):
+    """
+    Reads the headers and the mainline of a game for the archive, skipping variations,
+    comments and annotations.
+    """
+    _headers: dict[str, str]
+    _moves: array
+    _keys: list[int]
+    _hasher: IncrementalHasher
+    _error: Optional[Exception]
+
+    def begin_game(self):
+        self._headers = {}
+        self._moves = array("H")
+        self._keys = []
+        self._hasher = IncrementalHasher()
+        self._error = None
+
+    def visit_header(self, tagname: str, tagvalue: str):
+        self._headers[tagname] = tagvalue
+
+    def visit_board(self, board: chess.Board):
+        self._keys.append(position_key(self._hasher.hash(board)))
+
+    def visit_move(self, board: chess.Board, move: chess.Move):
+        self._moves.append(move.from_square | move.to_square << 6 |
+                           (move.promotion or 0) << 12)
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def handle_error(self, error: Exception):
+        # The rest of the game is skipped
+        self._error = error
+
+    def result(self) -> _GameRecord:
+        if sys.byteorder == "big":
+            self._moves.byteswap()
+        return _GameRecord(self._headers, self._moves.tobytes(), self._keys,
+                           self._error)
+
+
+class GameArchive:
+    """
+    Stores finished and imported games in a SQLite database, with every position of
+    every game indexed, so the games that reached a position are found without
+    replaying them. Can be used from many threads.
+    """
+    _path: Path
+    _connection: sqlite3.Connection
+    _lock: threading.Lock
+    # Games to add in the background, None to stop the writer thread
+    _queue: queue.Queue[Optional[chess.pgn.Game]]
+    _writer_thread: threading.Thread
+
+    def __init__(self, path: Path):
+        """
+        :param path: The path of the archive, which is created if it doesn't exist.
+        """
+        self._path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, ARCHIVE_VERSION):
+            self._connection.close()
+            raise ChessGameArchiveError(f"Unsupported game archive version {version} "
+                                        f"in {path}")
+        # A write only waits for storage when the write-ahead log is checkpointed, and
+        # the archive can't be corrupted by the power being cut
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute(f"PRAGMA cache_size = -{ARCHIVE_CACHE_KB}")
+        self._connection.executescript(ARCHIVE_SCHEMA)
+        self._connection.execute(f"PRAGMA user_version = {ARCHIVE_VERSION}")
+        self._queue = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._write_loop, daemon=True,
+                                               name="game-archive-writer")
+        self._writer_thread.start()
+        logger.debug(f"Opened game archive {path}")
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns the path of the archive.
+
+        :return: The path.
+        """
+        return self._path
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def _insert(self, records: list[tuple[int, _GameRecord]], positions_table: str):
+        """
+        Writes games, in the transaction of the caller.
+
+        :param records: The games by their IDs.
+        :param positions_table: The table to write the positions of the games to.
+        """
+        self._connection.executemany(
+            "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((game_id, record.headers.get("White", "?"),
+              record.headers.get("Black", "?"), record.headers.get("Result", "*"),
+              record.headers.get("Date", "????.??.??"),
+              record.headers.get("Event", "?"), json.dumps(record.headers),
+              record.moves) for game_id, record in records))
+        self._connection.executemany(
+            f"INSERT INTO {positions_table} VALUES (?, ?, ?)",
+            ((key, game_id, ply) for game_id, record in records
+             for ply, key in enumerate(record.keys)))
+
+    def _next_id(self) -> int:
+        """
+        Gets the ID of the next game written.
+
+        :return: The ID.
+        """
+        return self._connection.execute(
+            "SELECT COALESCE(MAX(id), 0) + 1 FROM games").fetchone()[0]
+
+    def add_game(self, game: chess.pgn.Game) -> int:
+        """
+        Adds a game, like one that was just finished. Only the mainline is kept.
+
+        :param game: The game.
+        :return: The ID of the game in the archive.
+        """
+        record = game.accept(_ArchiveVisitor())
+        if record.error is not None:
+            raise ChessGameArchiveError(f"Cannot archive game: {record.error!r}")
+        with self._lock, self._connection:
+            game_id = self._next_id()
+            self._insert([(game_id, record)], "positions")
+        logger.debug(f"Archived game {game_id} with {len(record.keys) - 1} plies")
+        return game_id
+
+    def store_game(self, game: chess.pgn.Game):
+        """
+        Adds a game in the background, like one that was just finished, so the caller
+        never waits for the storage. A game that can't be added is logged.
+
+        :param game: The game.
+        """
+        self._queue.put(game)
+
+    def _write_loop(self):
+        """
+        Adds the games stored in the background until closed.
+        """
+        while True:
+            game = self._queue.get()
+            if game is None:
+                return
+            try:
+                self.add_game(game)
+            except (sqlite3.Error, ChessGameArchiveError) as e:
+                logger.warning(f"Cannot archive the game: {e!r}")
+
+    def import_pgn(self, path: Path) -> ArchiveImportStats:
+        """
+        Imports all games of a PGN file, all at once so an import that was cut off
+        doesn't leave some of the games behind. Only the mainlines are kept, games
+        that can't be read, like ones with illegal moves, are skipped.
+
+        :param path: The path of the PGN file.
+        :return: Statistics of the import.
+        """
+        start = time.perf_counter()
+        imported = 0
+        skipped = 0
+        positions = 0
+        with self._lock, open(path, encoding="utf-8", errors="replace") as f:
+            # Positions are indexed once all games are read, in the order of the
+            # index, instead of all over the index for every game
+            self._connection.execute("CREATE TEMP TABLE staged_positions "
+                                     "(zobrist INTEGER, game_id INTEGER, ply INTEGER)")
+            try:
+                with self._connection:
+                    game_id = self._next_id()
+                    records = []
+                    while True:
+                        record = chess.pgn.read_game(f, Visitor=_ArchiveVisitor)
+                        if record is None:
+                            break
+                        if record.error is not None:
+                            logger.warning(f"Skipping game {imported + skipped + 1} "
+                                           f"of {path}: {record.error}")
+                            skipped += 1
+                            continue
+                        records.append((game_id, record))
+                        game_id += 1
+                        imported += 1
+                        positions += len(record.keys)
+                        if len(records) >= IMPORT_BATCH_GAMES:
+                            self._insert(records, "staged_positions")
+                            records = []
+                            logger.debug(f"Read {imported} games of {path}")
+                    self._insert(records, "staged_positions")
+                    self._connection.execute(
+                        "INSERT INTO positions SELECT * FROM staged_positions "
+                        "ORDER BY zobrist, game_id, ply")
+            finally:
+                self._connection.execute("DROP TABLE temp.staged_positions")
+            # The write-ahead log grew to the size of the import
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        stats = ArchiveImportStats(imported, skipped, positions,
+                                   time.perf_counter() - start)
+        logger.info(f"Imported {imported} games ({skipped} skipped) from {path} in "
+                    f"{stats.elapsed:.1f} s")
+        return stats
+
+    def _read_game(self, headers: str, moves: bytes) -> chess.pgn.Game:
+        """
+        Rebuilds a game as written to the archive.
+
+        :param headers: The headers of the game as JSON.
+        :param moves: The moves of the game.
+        :return: The game.
+        """
+        game = chess.pgn.Game(json.loads(headers))
+        encoded = array("H", moves)
+        if sys.byteorder == "big":
+            encoded.byteswap()
+        node = game
+        for move in encoded:
+            node = node.add_variation(chess.Move(move & 0x3F, move >> 6 & 0x3F,
+                                                 move >> 12 or None))
+        return game
+
+    def game(self, game_id: int) -> chess.pgn.Game:
+        """
+        Gets a game.
+
+        :param game_id: The ID of the game in the archive.
+        :return: The game.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT headers, moves FROM games WHERE id = ?", (game_id,)).fetchone()
+        if row is None:
+            raise ChessGameArchiveError(f"No game {game_id} in the archive")
+        return self._read_game(*row)
+
+    def export_pgn(self, path: Path, game_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Exports games to a PGN file.
+
+        :param path: The path of the PGN file, which is replaced.
+        :param game_ids: The IDs of the games to export, defaults to all games.
+        :return: The number of games exported.
+        """
+        exported = 0
+        with self._lock, open(path, "w", encoding="utf-8") as f:
+            if game_ids is None:
+                rows = self._connection.execute(
+                    "SELECT headers, moves FROM games ORDER BY id")
+            else:
+                rows = (self._connection.execute(
+                    "SELECT headers, moves FROM games WHERE id = ?", (game_id,)
+                ).fetchone() for game_id in game_ids)
+            for row in rows:
+                if row is not None:
+                    print(self._read_game(*row), file=f, end="\n\n")
+                    exported += 1
+        logger.debug(f"Exported {exported} games to {path}")
+        return exported
+
+    def games_reaching(self, position_hash: int,
+                       limit: int = DEFAULT_SEARCH_LIMIT) -> list[ArchivedGame]:
+        """
+        Finds the games that reached a position, newest first.
+
+        :param position_hash: The Zobrist hash of the position, as compared for
+         repetitions, like `Position.hash`.
+        :param limit: How many games to list at most.
+        :return: The games.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT games.id, white, black, result, date, event, reached.ply "
+                "FROM (SELECT game_id, MIN(ply) AS ply FROM positions "
+                "      WHERE zobrist = ? GROUP BY game_id "
+                "      ORDER BY game_id DESC LIMIT ?) AS reached "
+                "JOIN games ON games.id = reached.game_id ORDER BY games.id DESC",
+                (position_key(position_hash), limit)).fetchall()
+        return [ArchivedGame(*row) for row in rows]
+
+    def count_games_reaching(self, position_hash: int) -> int:
+        """
+        Counts the games that reached a position.
+
+        :param position_hash: The Zobrist hash of the position, as compared for
+         repetitions, like `Position.hash`.
+        :return: The number of games.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(DISTINCT game_id) FROM positions WHERE zobrist = ?",
+                (position_key(position_hash),)).fetchone()[0]
+
+    def close(self):
+        """
+        Closes the archive, after adding the games stored in the background.
+        """
+        self._queue.put(None)
+        self._writer_thread.join()
+        with self._lock:
+            self._connection.close()
+        logger.debug(f"Closed game archive {self._path}")
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import chess
+
+from game.chess_game_enums import JournalEntryType
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """
+    Something that happened in a game, as written to its journal.
+    """
+    type: JournalEntryType
+    # The move, for MOVE entries
+    move: Optional[chess.Move] = None
+
+
+@dataclass(frozen=True)
+class JournalContents:
+    """
+    Everything read from a game journal.
+    """
+    # What the journal was created with, like the players of the game
+    header: dict
+    entries: list[JournalEntry]
+    # Where each entry starts, in bytes
+    offsets: list[int]
+    # The bytes up to the end of the last whole entry, anything after it was cut off or
+    # is corrupt
+    length: int
+
+
+@dataclass(frozen=True)
+class ArchivedGame:
+    """
+    A game in the game archive, as listed when searching it.
+    """
+    id: int
+    white: str
+    black: str
+    result: str
+    date: str
+    event: str
+    # The first ply the searched position was reached at
+    ply: int
+
+
+@dataclass(frozen=True)
+class ArchiveImportStats:
+    """
+    Statistics of importing games into the game archive.
+    """
+    imported: int
+    # Games that couldn't be read, like ones with illegal moves
+    skipped: int
+    # Positions indexed
+    positions: int
+    # Seconds the import took
+    elapsed: float
+
+    @property
+    def games_per_second(self) -> float:
+        """
+        Returns how many games were imported per second.
+
+        :return: The games per second.
+        """
+        return self.imported / self.elapsed if self.elapsed else 0
@@ -16,3 +16,12 @@ class ChessGameOutcomeType(Enum):
     # Resignation
     RESIGNATION_BY_WHITE = "Resignation by white"
     RESIGNATION_BY_BLACK = "Resignation by black"
+
+
+class JournalEntryType(Enum):
+    MOVE = "MOVE"
+    OFFER_DRAW = "OFFER_DRAW"
+    ACCEPT_DRAW = "ACCEPT_DRAW"
+    DECLINE_DRAW = "DECLINE_DRAW"
+    CLAIM_DRAW = "CLAIM_DRAW"
+    RESIGN = "RESIGN"
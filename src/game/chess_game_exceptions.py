@@ -0,0 +1,17 @@
+class ChessGameError(Exception):
+    """
+    Base class for exceptions in the game module.
+    """
+    pass
+
+
+class ChessGameJournalError(ChessGameError):
+    """
+    Raised when a game journal can't be read.
+    """
+
+
+class ChessGameArchiveError(ChessGameError):
+    """
+    Raised when a game isn't in the game archive.
+    """
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import chess
+
+from game.chess_game_dataclasses import JournalContents, JournalEntry
+from game.chess_game_enums import JournalEntryType
+from game.chess_game_exceptions import ChessGameJournalError
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# A journal is the header, then entries that each start with a tag byte and end with a
+# check byte, the low byte of the CRC-32 of the entry seeded with its index, so an entry
+# that was cut off or zeroed by the power being cut isn't mistaken for a move
+JOURNAL_MAGIC = b"CBJRN"
+JOURNAL_VERSION = 2
+# The header is followed by the length of the JSON header as 4 bytes and the JSON
+JOURNAL_HEADER_LENGTH = struct.Struct(">I")
+# Followed by the from square, to square and promotion piece type (0 for none)
+TAG_MOVE = 0
+TAG_OFFER_DRAW = 1
+TAG_ACCEPT_DRAW = 2
+TAG_DECLINE_DRAW = 3
+TAG_CLAIM_DRAW = 4
+TAG_RESIGN = 5
+ENTRY_TAGS = {
+    JournalEntryType.MOVE: TAG_MOVE,
+    JournalEntryType.OFFER_DRAW: TAG_OFFER_DRAW,
+    JournalEntryType.ACCEPT_DRAW: TAG_ACCEPT_DRAW,
+    JournalEntryType.DECLINE_DRAW: TAG_DECLINE_DRAW,
+    JournalEntryType.CLAIM_DRAW: TAG_CLAIM_DRAW,
+    JournalEntryType.RESIGN: TAG_RESIGN,
+}
+ENTRY_TYPES = {tag: entry_type for entry_type, tag in ENTRY_TAGS.items()}
+# How long after an entry is appended it is written and synced to storage, so entries
+# appended in quick succession, like a move and an engine's draw offer, are synced
+# together
+JOURNAL_SYNC_DELAY = 0.1
+
+
+class GameJournal:
+    """
+    Appends everything that happens in a game to a file, so a game can be resumed
+    after the power is cut. Entries are written and synced to storage in batches on a
+    thread shortly after they are appended, so appending never waits for the storage.
+    """
+    _path: Path
+    _file: BinaryIO
+    # The number of entries appended, which the check byte of the next one depends on
+    _count: int
+    # Entries appended but not written yet
+    _pending: bytearray
+    _pending_lock: threading.Lock
+    # Set when entries were appended that aren't synced to storage yet
+    _dirty: threading.Event
+    _closed: threading.Event
+    _sync_thread: threading.Thread
+
+    def __init__(self, path: Path, header: Optional[dict] = None,
+                 keep: Optional[int] = None):
+        """
+        :param path: The path of the journal.
+        :param header: What to create a new journal with, replacing any journal at the
+         path. If None, the existing journal is appended to, after dropping an entry
+         that was cut off.
+        :param keep: When appending, how many entries to keep, like when the rest
+         can't be replayed. Defaults to every whole entry.
+        """
+        self._path = path
+        if header is not None:
+            # Replaced as a whole, so a journal is never left without its header
+            temporary_path = path.with_name(path.name + ".tmp")
+            with open(temporary_path, "wb") as f:
+                data = json.dumps(header).encode()
+                f.write(JOURNAL_MAGIC + bytes((JOURNAL_VERSION,)) +
+                        JOURNAL_HEADER_LENGTH.pack(len(data)) + data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary_path, path)
+            _sync_directory(path.parent)
+            self._file = open(path, "ab")
+            self._count = 0
+            logger.debug(f"Created game journal {path}")
+        else:
+            contents = read_journal(path)
+            length = contents.length
+            self._count = len(contents.entries)
+            if keep is not None and keep < self._count:
+                length = contents.offsets[keep]
+                self._count = keep
+            self._file = open(path, "r+b")
+            self._file.truncate(length)
+            self._file.seek(length)
+            logger.debug(f"Appending to game journal {path}")
+        self._pending = bytearray()
+        self._pending_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        self._sync_thread = threading.Thread(target=self._sync_loop, daemon=True,
+                                             name="GameJournal")
+        self._sync_thread.start()
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns the path of the journal.
+
+        :return: The path.
+        """
+        return self._path
+
+    def append(self, entry: JournalEntry):
+        """
+        Appends an entry to the end of the journal, without waiting for it to be
+        written.
+
+        :param entry: The entry.
+        """
+        data = bytes((ENTRY_TAGS[entry.type],))
+        if entry.type == JournalEntryType.MOVE:
+            data += bytes((entry.move.from_square, entry.move.to_square,
+                           entry.move.promotion or 0))
+        with self._pending_lock:
+            self._pending += data + bytes((_check_byte(data, self._count),))
+            self._count += 1
+        self._dirty.set()
+
+    def _sync(self):
+        """
+        Writes the pending entries and syncs them to storage.
+        """
+        with self._pending_lock:
+            data, self._pending = self._pending, bytearray()
+        if data:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _sync_loop(self):
+        """
+        Writes and syncs appended entries until the journal is closed.
+        """
+        while not self._closed.is_set():
+            self._dirty.wait()
+            # Gathers the entries appended soon after, unless closing
+            self._closed.wait(JOURNAL_SYNC_DELAY)
+            self._dirty.clear()
+            self._sync()
+
+    def close(self):
+        """
+        Writes and syncs the entries appended so far and closes the journal.
+        """
+        self._closed.set()
+        self._dirty.set()
+        self._sync_thread.join()
+        self._sync()
+        self._file.close()
+        logger.debug(f"Closed game journal {self._path}")
+
+    def delete(self):
+        """
+        Closes and deletes the journal, like once the game is over.
+        """
+        self.close()
+        self._path.unlink(missing_ok=True)
+        logger.debug(f"Deleted game journal {self._path}")
+
+
+def _check_byte(data: bytes, index: int) -> int:
+    """
+    Gets the check byte of an entry.
+
+    :param data: The entry without its check byte.
+    :param index: The index of the entry in the journal.
+    :return: The check byte.
+    """
+    return zlib.crc32(data, index) & 0xFF
+
+
+def _sync_directory(path: Path):
+    """
+    Syncs a directory to storage, so a file just renamed into it can't disappear.
+
+    :param path: The path of the directory.
+    """
+    # Directories can't be opened on Windows, where renames don't need this
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_journal(path: Path) -> JournalContents:
+    """
+    Reads a journal. The entries from the first one that was cut off or is corrupt,
+    like by the power being cut while writing it, are ignored.
+
+    :param path: The path of the journal.
+    :return: The contents of the journal.
+    """
+    data = path.read_bytes()
+    header_end = len(JOURNAL_MAGIC) + 1 + JOURNAL_HEADER_LENGTH.size
+    if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC or len(data) < header_end:
+        raise ChessGameJournalError(f"{path} is not a game journal")
+    if data[len(JOURNAL_MAGIC)] != JOURNAL_VERSION:
+        raise ChessGameJournalError(f"Unsupported game journal version "
+                                    f"{data[len(JOURNAL_MAGIC)]} in {path}")
+    (header_length,) = JOURNAL_HEADER_LENGTH.unpack_from(data, header_end -
+                                                         JOURNAL_HEADER_LENGTH.size)
+    try:
+        header = json.loads(data[header_end:header_end + header_length])
+    except ValueError as e:
+        raise ChessGameJournalError(f"Bad header in game journal {path}") from e
+    entries = []
+    offsets = []
+    offset = header_end + header_length
+    while offset < len(data):
+        tag = data[offset]
+        size = 4 if tag == TAG_MOVE else 1
+        entry = data[offset:offset + size]
+        if offset + size >= len(data) or tag not in ENTRY_TYPES or \
+                data[offset + size] != _check_byte(entry, len(entries)):
+            logger.warning(f"Game journal {path} ends in an entry that was cut off or "
+                           f"is corrupt, ignoring the last {len(data) - offset} bytes")
+            break
+        if tag == TAG_MOVE:
+            from_square, to_square, promotion = entry[1:]
+            if from_square >= 64 or to_square >= 64 or promotion > chess.KING:
+                logger.warning(f"Game journal {path} has a corrupt move, ignoring the "
+                               f"last {len(data) - offset} bytes")
+                break
+            entries.append(JournalEntry(JournalEntryType.MOVE,
+                                        chess.Move(from_square, to_square,
+                                                   promotion or None)))
+        else:
+            entries.append(JournalEntry(ENTRY_TYPES[tag]))
+        offsets.append(offset)
+        offset += size + 1
+    return JournalContents(header, entries, offsets, offset)
@@ -0,0 +1,175 @@
+from collections import Counter
+from typing import Optional
+
+import chess
+import chess.polyglot
+
+
+class TranspositionHasher(chess.polyglot.ZobristHasher):
+    """
+    Zobrist hashes positions the way python-chess compares them for repetitions,
+    which only counts the en passant square if en passant is actually legal.
+    """
+
+    def hash_ep_square(self, board: chess.Board) -> int:
+        if board.has_legal_en_passant():
+            return self.array[772 + chess.square_file(board.ep_square)]
+        return 0
+
+
+transposition_hash = TranspositionHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+
+class IncrementalHasher:
+    """
+    Hashes positions like `transposition_hash`, but only hashes the pieces that
+    changed since the last position hashed, so hashing positions one after another,
+    like those of a game or of a search, is many times faster.
+    """
+    # The pieces of the last position, in the order of the Zobrist array
+    _masks: list[int]
+    _pieces: int
+    _castling_rights: Optional[int]
+    _castling: int
+
+    def __init__(self):
+        self._masks = [chess.BB_EMPTY] * 12
+        self._pieces = 0
+        self._castling_rights = None
+        self._castling = 0
+
+    def hash(self, board: chess.Board) -> int:
+        """
+        Hashes a position.
+
+        :param board: The board of the position.
+        :return: The Zobrist hash.
+        """
+        black, white = board.occupied_co
+        masks = []
+        for pieces in (board.pawns, board.knights, board.bishops, board.rooks,
+                       board.queens, board.kings):
+            masks.append(pieces & black)
+            masks.append(pieces & white)
+        for index, (mask, last_mask) in enumerate(zip(masks, self._masks)):
+            if mask != last_mask:
+                for square in chess.scan_reversed(mask ^ last_mask):
+                    self._pieces ^= transposition_hash.array[64 * index + square]
+        self._masks = masks
+        # Castling rights only change when a king or rook moves or is captured
+        if board.castling_rights != self._castling_rights:
+            self._castling_rights = board.castling_rights
+            self._castling = transposition_hash.hash_castling(board)
+        return (self._pieces ^ self._castling ^ transposition_hash.hash_ep_square(board)
+                ^ transposition_hash.hash_turn(board))
+
+
+class Position:
+    """
+    The one authoritative position of a chessboard, shared by the interface's move
+    detection and the ChessGame played on it, so a move is only ever pushed once and
+    both always agree on the position.
+    """
+    _board: chess.Board
+    # Incremented whenever the position changes, so anything derived from it, like
+    # move detection or the outcome of the game, can tell whether it is still valid
+    _version: int
+    # How many times each position occurred since the last irreversible move, by
+    # Zobrist hash, updated on every push so repetitions never replay the move stack
+    _repetitions: Counter[int]
+    _hash: int
+
+    def __init__(self, fen: Optional[str] = chess.STARTING_FEN):
+        """
+        :param fen: The FEN of the position to start from, None for an empty board.
+        """
+        self._board = chess.Board(fen)
+        self._version = 0
+        self._hash = transposition_hash(self._board)
+        self._repetitions = Counter((self._hash,))
+
+    @property
+    def board(self) -> chess.Board:
+        """
+        Returns the board of the position. It is a view and not a copy, so it must not
+        be modified, use `push` and `reset` instead.
+
+        :return: The board.
+        """
+        return self._board
+
+    @property
+    def version(self) -> int:
+        """
+        Returns the version of the position, which changes whenever a move is pushed
+        or the position is reset.
+
+        :return: The version of the position.
+        """
+        return self._version
+
+    @property
+    def occupied(self) -> int:
+        """
+        Returns the bitboard of occupied squares.
+
+        :return: The bitboard of occupied squares.
+        """
+        return self._board.occupied
+
+    @property
+    def hash(self) -> int:
+        """
+        Returns the Zobrist hash of the position, as compared for repetitions.
+
+        :return: The Zobrist hash.
+        """
+        return self._hash
+
+    def repetitions(self, position_hash: Optional[int] = None) -> int:
+        """
+        Returns how many times a position occurred since the last irreversible move.
+
+        :param position_hash: The Zobrist hash of the position, defaults to the
+         current position.
+        :return: The number of times the position occurred.
+        """
+        return self._repetitions[self._hash if position_hash is None
+                                 else position_hash]
+
+    def any_repeated(self) -> bool:
+        """
+        Returns whether any position occurred at least twice since the last
+        irreversible move.
+
+        :return: True if a position was repeated.
+        """
+        return any(count >= 2 for count in self._repetitions.values())
+
+    def push(self, move: chess.Move):
+        """
+        Makes a move.
+
+        :param move: The move to make.
+        """
+        if self._board.is_irreversible(move):
+            # No position before an irreversible move can occur again
+            self._repetitions.clear()
+        self._board.push(move)
+        self._hash = transposition_hash(self._board)
+        self._repetitions[self._hash] += 1
+        self._version += 1
+
+    def reset(self, fen: Optional[str] = chess.STARTING_FEN):
+        """
+        Resets the position, clearing the move stack.
+
+        :param fen: The FEN of the position to reset to, None for an empty board.
+        """
+        if fen is None:
+            self._board.clear()
+        else:
+            self._board.set_fen(fen)
+        self._hash = transposition_hash(self._board)
+        self._repetitions = Counter((self._hash,))
+        self._version += 1
@@ -2,16 +2,22 @@ from os import environ
 
 environ["KIVY_NO_ARGS"] = "1"
 
+import asyncio
 import logging
 import threading
 from argparse import ArgumentParser
+from pathlib import Path
 from time import sleep
 
 from kivy.core.window import Window
 
 from chessboard.interface import ChessboardInterface
+from chessboard.interface.interface_async import AsyncChessboardInterface
+from chessboard.interface.interface_filters import parse_occupancy_filter
 from chessboard.manager import ChessboardManagerSingleton
+from game.archive import GameArchive
 from ui import ChessboardApp
+from ui.async_bridge import run_app
 from utils.logger import create_logger, set_all_stdout_logger_levels
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
@@ -20,6 +26,31 @@ parser = ArgumentParser(
     description="Raspberry Pi firmware for a magnetic-piece-tracking digital chessboard! WIP")
 parser.add_argument("--port", "-p", required=True,
                     help="Serial port to connect to the chessboard.")
+parser.add_argument("--ascii", action="store_true",
+                    help="Don't negotiate binary bitboard frames with the chessboard.")
+parser.add_argument("--poll", action="store_true",
+                    help="Poll the chessboard instead of subscribing to occupancy changes.")
+parser.add_argument("--asyncio", action="store_true",
+                    help="Run the chessboard connection and the UI in one asyncio event "
+                         "loop instead of a separate update thread.")
+parser.add_argument("--filter", default=None,
+                    help="Filter noisy sensor readings before move detection. "
+                         "\"vote:N/M\" needs a square to be occupied in N of the last M "
+                         "readings, \"dwell:MS\" needs the occupancy to be stable for MS "
+                         "milliseconds.")
+parser.add_argument("--record", metavar="PATH",
+                    help="Record the occupancies read from the chessboard to a file, "
+                         "which can be replayed with replay.py.")
+parser.add_argument("--journal", metavar="PATH", type=Path,
+                    default=Path("saved_game.cbjrn"),
+                    help="Where to save the game in progress, so it can be resumed "
+                         "after exiting or the power being cut. Defaults to "
+                         "saved_game.cbjrn.")
+parser.add_argument("--archive", metavar="PATH", type=Path,
+                    default=Path("games.sqlite3"),
+                    help="Where to store finished games, which can be searched by "
+                         "position and imported from or exported to PGN with "
+                         "archive.py. Defaults to games.sqlite3.")
 parser.add_argument("--no-fullscreen", action="store_true",
                     help="Disable fullscreen mode.")
 parser.add_argument("--debug", action="store_true",
@@ -36,25 +67,47 @@ if not args.no_fullscreen:
     logger.debug("Fullscreen mode enabled")
     Window.fullscreen = True
 
-interface = ChessboardInterface()
-interface.connect(args.port)
-manager = ChessboardManagerSingleton(interface)
 
+async def main_async():
+    async_interface = AsyncChessboardInterface(parse_occupancy_filter(args.filter))
+    await async_interface.connect_async(args.port, binary=not args.ascii,
+                                        stream=not args.poll)
+    if args.record:
+        async_interface.start_recording(args.record)
+    async_manager = ChessboardManagerSingleton(async_interface, args.journal,
+                                               archive)
+    await run_app(ChessboardApp(), async_manager, async_interface)
+    async_interface.stop_recording()
 
-def update_loop():
-    while not stop_event.is_set():
-        manager.update()
-        sleep(0.01)
 
+archive = GameArchive(args.archive)
+if args.asyncio:
+    asyncio.run(main_async())
+else:
+    interface = ChessboardInterface(parse_occupancy_filter(args.filter))
+    interface.connect(args.port, binary=not args.ascii, stream=not args.poll)
+    if args.record:
+        interface.start_recording(args.record)
+    manager = ChessboardManagerSingleton(interface, args.journal, archive)
 
-stop_event = threading.Event()
-update_thread = threading.Thread(target=update_loop, daemon=True)
-update_thread.start()
-logger.debug("Started update thread")
+    def update_loop():
+        while not stop_event.is_set():
+            manager.update()
+            # When streaming, update blocks until the chessboard reports a change
+            if not interface.streaming:
+                sleep(0.01)
 
-app = ChessboardApp()
-app.run()
+    stop_event = threading.Event()
+    update_thread = threading.Thread(target=update_loop, daemon=True)
+    update_thread.start()
+    logger.debug("Started update thread")
 
-stop_event.set()
-update_thread.join()
-logger.debug("Stopped update thread")
+    app = ChessboardApp()
+    app.run()
+
+    stop_event.set()
+    update_thread.join()
+    logger.debug("Stopped update thread")
+    manager.close()
+    interface.stop_recording()
+archive.close()
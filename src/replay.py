@@ -0,0 +1,46 @@
+import logging
+from argparse import ArgumentParser
+
+from chessboard.interface.interface_filters import parse_occupancy_filter
+from chessboard.interface.interface_replay import ReplayChessboardInterface
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+parser = ArgumentParser(
+    description="Replays sessions recorded with main.py --record through move "
+                "detection, to reproduce problems and measure detection throughput.")
+parser.add_argument("recordings", nargs="+",
+                    help="Paths of the recordings to replay.")
+parser.add_argument("--realtime", action="store_true",
+                    help="Replay at the recorded speed instead of as fast as possible.")
+parser.add_argument("--filter", default=None,
+                    help="Filter the recorded readings before move detection, like "
+                         "main.py --filter.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if not args.debug:
+    # Detection logs every move, which would dominate the measurement
+    set_all_stdout_logger_levels(logging.WARNING)
+
+total_samples = 0
+total_moves = 0
+total_detected = 0
+total_elapsed = 0
+for path in args.recordings:
+    interface = ReplayChessboardInterface(parse_occupancy_filter(args.filter))
+    stats = interface.replay(path, realtime=args.realtime)
+    print(f"{path}: {stats.samples} samples "
+          f"({interface.occupancy_filter.suppressed} suppressed, "
+          f"{interface.detection_stats.skipped} skipped detection), "
+          f"{stats.detected_moves}/{stats.moves} moves detected, "
+          f"{stats.samples_per_second:.0f} samples/s")
+    total_samples += stats.samples
+    total_moves += stats.moves
+    total_detected += stats.detected_moves
+    total_elapsed += stats.elapsed
+if len(args.recordings) > 1:
+    print(f"Total: {total_samples} samples, {total_detected}/{total_moves} moves "
+          f"detected, {total_samples / total_elapsed if total_elapsed else 0:.0f} "
+          f"samples/s")
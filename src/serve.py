@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from argparse import ArgumentParser
+
+from chessboard.interface import ChessboardInterface
+from chessboard.interface.interface_filters import parse_occupancy_filter
+from chessboard.manager import manager_dataclasses, manager_enums, manager_exceptions
+from chessboard.manager.manager_registry import ChessboardManagerRegistry
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+parser = ArgumentParser(
+    description="Hosts many chessboards from one process without a UI, like for a "
+                "tournament. Possible moves are confirmed once they have been on the "
+                "chessboard for a while.")
+parser.add_argument("ports", nargs="+",
+                    help="Serial ports of the chessboards to host.")
+parser.add_argument("--ascii", action="store_true",
+                    help="Don't negotiate binary bitboard frames with the chessboards.")
+parser.add_argument("--poll", action="store_true",
+                    help="Poll the chessboards instead of subscribing to occupancy "
+                         "changes.")
+parser.add_argument("--filter", default=None,
+                    help="Filter noisy sensor readings before move detection, like "
+                         "main.py --filter.")
+parser.add_argument("--poll-workers", type=int, default=4,
+                    help="Threads polling chessboards that don't stream, defaults to "
+                         "4.")
+parser.add_argument("--confirm-delay", type=float, default=1000,
+                    help="How long a possible move must stay on a chessboard before it "
+                         "is confirmed, in milliseconds. Defaults to 1000.")
+parser.add_argument("--stats-interval", type=float, default=60,
+                    help="How often to log the statistics of every chessboard, in "
+                         "seconds. Defaults to 60.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+# Every module logs debug messages by default, which is too much for many chessboards
+set_all_stdout_logger_levels(logging.DEBUG if args.debug else logging.INFO)
+
+registry = ChessboardManagerRegistry(poll_workers=args.poll_workers)
+interfaces = []
+player = manager_dataclasses.PlayerConfiguration(manager_enums.PlayerType.HUMAN)
+for port in args.ports:
+    interface = ChessboardInterface(parse_occupancy_filter(args.filter))
+    interface.connect(port, binary=not args.ascii, stream=not args.poll)
+    interfaces.append(interface)
+    registry.add_board(port, interface).new_game(player, player)
+
+stop_event = threading.Event()
+registry_thread = threading.Thread(target=registry.run, args=(stop_event,),
+                                   daemon=True)
+registry_thread.start()
+logger.info(f"Hosting {len(registry)} chessboards")
+
+# When each possible move was first seen, by chessboard
+seen_since = {}
+last_stats = time.monotonic()
+try:
+    while True:
+        time.sleep(0.05)
+        now = time.monotonic()
+        for name in registry.names:
+            manager = registry[name]
+            # The registry thread changes the manager, so only its snapshot is
+            # consistent
+            snapshot = manager.snapshot
+            if snapshot.state == manager_enums.State.GAME_OVER:
+                logger.info(f"{name}: {snapshot.outcome.value}, starting a new game")
+                manager.exit()
+                manager.new_game(player, player)
+                continue
+            possible_move = snapshot.possible_move
+            if possible_move is None:
+                seen_since.pop(name, None)
+                continue
+            first_seen = seen_since.setdefault(name, (possible_move, now))
+            if first_seen[0] != possible_move:
+                seen_since[name] = (possible_move, now)
+            elif now - first_seen[1] >= args.confirm_delay / 1000:
+                del seen_since[name]
+                try:
+                    manager.confirm_possible_move(expected=possible_move)
+                    logger.info(f"{name}: {snapshot.possible_move_san}")
+                except manager_exceptions.ChessboardManagerStateError:
+                    # The move changed or was taken back just as it was being confirmed
+                    pass
+        if now - last_stats >= args.stats_interval:
+            last_stats = now
+            for name in registry.names:
+                stats = registry.stats(name)
+                logger.info(f"{name}: {stats.updates} updates, {stats.errors} errors, "
+                            f"{stats.mean_latency * 1000:.2f} ms mean and "
+                            f"{stats.latency_max * 1000:.2f} ms max latency")
+except KeyboardInterrupt:
+    pass
+finally:
+    stop_event.set()
+    registry_thread.join()
+    registry.close()
+    for interface in interfaces:
+        interface.disconnect()
@@ -0,0 +1,89 @@
+import logging
+import shlex
+from argparse import ArgumentParser
+
+import chess
+
+from simulator import VirtualChessboard
+from utils.logger import create_logger, set_all_stdout_logger_levels
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+COMMANDS_HELP = """Commands:
+  move <uci>      Make a legal move one physical step at a time (like e2e4)
+  lift <square>   Lift the piece on a square (like e2)
+  place <square>  Place a piece on a square (like e4)
+  reset           Set up the starting position
+  clear           Remove all pieces
+  fen <fen>       Set up the pieces of a FEN
+  show            Show the simulated occupancy
+  help            Show this help
+  quit            Stop the virtual chessboard"""
+
+parser = ArgumentParser(
+    description="Virtual chessboard on a pseudo-terminal, for running main.py without "
+                "a physical chessboard. Pass the printed port to main.py with -p.")
+parser.add_argument("--latency", type=float, default=0,
+                    help="Milliseconds to wait before each response.")
+parser.add_argument("--noise", type=float, default=0,
+                    help="Chance of each square being misread in a response.")
+parser.add_argument("--drop", type=float, default=0,
+                    help="Chance of each byte of a response being lost.")
+parser.add_argument("--seed", type=int, default=None,
+                    help="Seed for the noise and dropped bytes.")
+parser.add_argument("--step-delay", type=float, default=100,
+                    help="Milliseconds between the physical steps of a move.")
+parser.add_argument("--empty", action="store_true",
+                    help="Start with no pieces instead of the starting position.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if args.debug:
+    set_all_stdout_logger_levels(logging.DEBUG)
+
+board = VirtualChessboard(latency=args.latency / 1000, noise=args.noise,
+                          drop=args.drop, seed=args.seed)
+board.start()
+if not args.empty:
+    board.set_board(chess.Board())
+print(f"Virtual chessboard on {board.port}")
+print(f"Run: python3 src/main.py -p {board.port}")
+print(COMMANDS_HELP)
+
+try:
+    while True:
+        try:
+            words = shlex.split(input("> "))
+        except EOFError:
+            break
+        if not words:
+            continue
+        command, params = words[0].lower(), words[1:]
+        try:
+            if command == "move":
+                board.play_move(board.board.parse_uci(params[0]),
+                                step_delay=args.step_delay / 1000)
+            elif command == "lift":
+                board.lift(chess.parse_square(params[0]))
+            elif command == "place":
+                board.place(chess.parse_square(params[0]))
+            elif command == "reset":
+                board.set_board(chess.Board())
+            elif command == "clear":
+                board.set_board(chess.Board(None))
+            elif command == "fen":
+                board.set_board(chess.Board(" ".join(params)))
+            elif command == "show":
+                print(chess.SquareSet(board.occupancy))
+            elif command == "help":
+                print(COMMANDS_HELP)
+            elif command == "quit":
+                break
+            else:
+                print(f"Unknown command {command}, type help for commands")
+        except IndexError:
+            print(f"Missing parameter for {command}, type help for commands")
+        except ValueError as e:
+            print(f"Bad command: {e}")
+finally:
+    board.stop()
@@ -0,0 +1,278 @@
+import logging
+import os
+import random
+import select
+import threading
+import time
+import tty
+from typing import Optional
+
+import chess
+
+from chessboard.interface import interface_protocol
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+def physical_steps(board: chess.Board, move: chess.Move) -> list[int]:
+    """
+    Returns the occupancies a person goes through while making a move on the physical
+    board, like lifting the captured piece before placing the capturing piece.
+
+    :param board: The board before the move.
+    :param move: The move to make.
+    :return: The bitboards of occupied squares after each step, the last one is the
+     occupancy after the move.
+    """
+    occupied = board.occupied
+    from_bb = chess.BB_SQUARES[move.from_square]
+    to_bb = chess.BB_SQUARES[move.to_square]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        if board.is_kingside_castling(move):
+            king_to, rook_from, rook_to = chess.G1, chess.H1, chess.F1
+        else:
+            king_to, rook_from, rook_to = chess.C1, chess.A1, chess.D1
+        king_to_bb = chess.BB_SQUARES[king_to] << (rank * 8)
+        rook_from_bb = chess.BB_SQUARES[rook_from] << (rank * 8)
+        rook_to_bb = chess.BB_SQUARES[rook_to] << (rank * 8)
+        lifted_king = occupied & ~from_bb
+        placed_king = lifted_king | king_to_bb
+        lifted_rook = placed_king & ~rook_from_bb
+        return [lifted_king, placed_king, lifted_rook, lifted_rook | rook_to_bb]
+    elif board.is_en_passant(move):
+        captured_bb = chess.BB_SQUARES[chess.square(chess.square_file(move.to_square),
+                                                    chess.square_rank(move.from_square))]
+        placed = (occupied & ~from_bb) | to_bb
+        return [occupied & ~from_bb, placed, placed & ~captured_bb]
+    elif board.is_capture(move):
+        # Lift the captured piece first, then the capturing piece
+        return [occupied & ~to_bb, occupied & ~to_bb & ~from_bb, occupied & ~from_bb]
+    return [occupied & ~from_bb, (occupied & ~from_bb) | to_bb]
+
+
+class VirtualChessboard:
+    """
+    Simulates the chessboard firmware on a pseudo-terminal, so the interface can
+    connect to it like a real chessboard. The occupancy can be scripted, and responses
+    can be delayed and corrupted to mimic a real serial link. Only works on POSIX
+    systems.
+    """
+    _master_fd: Optional[int]
+    _slave_fd: Optional[int]
+    _thread: Optional[threading.Thread]
+    _stop_event: threading.Event
+    # Protects the occupancy and writes to the pseudo-terminal
+    _lock: threading.Lock
+    _occupancy: int
+    _binary: bool
+    _streaming: bool
+    _random: random.Random
+
+    latency: float
+    noise: float
+    drop: float
+    board: chess.Board
+
+    def __init__(self, latency: float = 0, noise: float = 0, drop: float = 0,
+                 seed: Optional[int] = None):
+        """
+        :param latency: How long to wait before each response, in seconds.
+        :param noise: The chance of each square being misread in a response.
+        :param drop: The chance of each byte of a response being lost.
+        :param seed: The seed for the noise and dropped bytes, for reproducible runs.
+        """
+        self._master_fd = None
+        self._slave_fd = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._occupancy = chess.BB_EMPTY
+        self._binary = False
+        self._streaming = False
+        self._random = random.Random(seed)
+        self.latency = latency
+        self.noise = noise
+        self.drop = drop
+        # Tracks moves made with `play_move`, so they can be turned into physical steps
+        self.board = chess.Board()
+        self.board.clear()
+
+    def start(self):
+        """
+        Opens the pseudo-terminal and starts answering commands in the background.
+        """
+        self._master_fd, self._slave_fd = os.openpty()
+        tty.setraw(self._slave_fd)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        logger.debug(f"Started virtual chessboard on {self.port}")
+
+    def stop(self):
+        """
+        Stops answering commands and closes the pseudo-terminal.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        os.close(self._master_fd)
+        os.close(self._slave_fd)
+        self._master_fd = None
+        self._slave_fd = None
+        logger.debug("Stopped virtual chessboard")
+
+    @property
+    def port(self) -> str:
+        """
+        Returns the path of the serial port to connect to.
+
+        :return: The path of the pseudo-terminal, like /dev/pts/3.
+        """
+        return os.ttyname(self._slave_fd)
+
+    @property
+    def occupancy(self) -> int:
+        """
+        Returns the occupancy of the simulated sensors.
+
+        :return: The bitboard of occupied squares.
+        """
+        return self._occupancy
+
+    def set_occupancy(self, bitboard: int):
+        """
+        Changes the occupancy of the simulated sensors, pushing it if streaming.
+
+        :param bitboard: The bitboard of occupied squares.
+        """
+        with self._lock:
+            changed = bitboard != self._occupancy
+            self._occupancy = bitboard
+            if changed and self._streaming:
+                self._respond(
+                    interface_protocol.encode_bitboard_frame(self._read_sensors()))
+
+    def lift(self, square: chess.Square):
+        """
+        Lifts the piece on a square.
+
+        :param square: The square to lift a piece from.
+        """
+        self.set_occupancy(self._occupancy & ~chess.BB_SQUARES[square])
+
+    def place(self, square: chess.Square):
+        """
+        Places a piece on a square.
+
+        :param square: The square to place a piece on.
+        """
+        self.set_occupancy(self._occupancy | chess.BB_SQUARES[square])
+
+    def set_board(self, board: chess.Board):
+        """
+        Sets up the pieces of a board.
+
+        :param board: The board to set up.
+        """
+        self.board = board.copy()
+        self.set_occupancy(self.board.occupied)
+
+    def play_move(self, move: chess.Move, step_delay: float = 0):
+        """
+        Makes a move on the board set up with `set_board`, one physical step at a time.
+
+        :param move: The move to make, must be legal.
+        :param step_delay: How long to wait between steps, in seconds.
+        """
+        for i, step in enumerate(physical_steps(self.board, move)):
+            if i > 0 and step_delay > 0:
+                time.sleep(step_delay)
+            self.set_occupancy(step)
+        self.board.push(move)
+
+    def _read_sensors(self) -> int:
+        """
+        Reads the occupancy like the sensors would, including noise.
+
+        :return: The bitboard of squares that read as occupied.
+        """
+        bitboard = self._occupancy
+        if self.noise > 0:
+            for square in chess.SQUARES:
+                if self._random.random() < self.noise:
+                    bitboard ^= chess.BB_SQUARES[square]
+        return bitboard
+
+    def _respond(self, response: bytes):
+        """
+        Writes a response to the pseudo-terminal after the latency, dropping bytes.
+
+        :param response: The response to write.
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if self.drop > 0:
+            response = bytes(b for b in response if self._random.random() >= self.drop)
+        try:
+            os.write(self._master_fd, response)
+        except OSError:
+            # Closed while stopping
+            pass
+
+    def _print_response(self) -> bytes:
+        """
+        Returns the response to the "print" command in the current mode.
+
+        :return: The response.
+        """
+        bitboard = self._read_sensors()
+        if self._binary:
+            return interface_protocol.encode_bitboard_frame(bitboard)
+        return interface_protocol.PRINT_ASCII_HEADER + \
+            b"".join(interface_protocol.encode_ascii_rows(bitboard))
+
+    def _handle_command(self, command: bytes):
+        """
+        Answers a single command, like the firmware would.
+
+        :param command: The command without the line ending.
+        """
+        with self._lock:
+            if command == interface_protocol.PRINT_COMMAND.strip():
+                self._respond(self._print_response())
+            elif command == interface_protocol.BINARY_MODE_COMMAND.strip():
+                self._binary = True
+                self._respond(interface_protocol.BINARY_MODE_ACK)
+            elif command == interface_protocol.STREAM_COMMAND.strip() and self._binary:
+                self._streaming = True
+                self._respond(interface_protocol.STREAM_ACK +
+                              interface_protocol.encode_bitboard_frame(
+                                  self._read_sensors()))
+            elif command == b"":
+                # The interface clears the command buffer right after opening the
+                # port, which is also when the real chessboard resets through DTR
+                self._binary = False
+                self._streaming = False
+            else:
+                logger.debug(f"Ignoring unknown command {command}")
+
+    def _serve(self):
+        """
+        Reads and answers commands until stopped.
+        """
+        buffer = b""
+        while not self._stop_event.is_set():
+            try:
+                readable, _, _ = select.select([self._master_fd], [], [], 0.1)
+                if not readable:
+                    continue
+                data = os.read(self._master_fd, 256)
+            except (OSError, ValueError):
+                break
+            if not data:
+                break
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                self._handle_command(line.strip())
@@ -4,12 +4,12 @@ from typing import Never, Optional
 import chess
 from kivy.animation import Animation
 from kivy.app import App
-from kivy.clock import Clock
 from kivy.config import ConfigParser
 from kivy.uix.scatterlayout import ScatterLayout
 from kivy.uix.screenmanager import ScreenManager
 
 from chessboard.manager import ChessboardManagerSingleton, manager_enums
+from ui.async_bridge import schedule_ui_updates, unschedule_ui_updates
 from ui.config import SettingsConfigSingleton
 from ui.game_screen import GameScreen
 from ui.game_screen.black_promoting_to_screen import BlackPromotingToScreen
@@ -48,6 +48,7 @@ class ChessboardApp(App):
         self._transition_speed = 0.4
         self._default_player = chess.WHITE
         self._rotation_speed = 0.5
+        self._rotation_updates = None
 
         self.config = SettingsConfigSingleton().config
         SettingsConfigSingleton().reload()
@@ -92,21 +93,31 @@ class ChessboardApp(App):
         """
         return self._player_showing_to
 
+    @property
+    def rotates_with_turn(self) -> bool:
+        """
+        Returns whether the screen rotates to the player to move during a game.
+
+        :return: Whether the screen rotates.
+        """
+        return self._rotation_speed is not None
+
     def on_start(self):
-        Clock.schedule_interval(self.update_rotation, 1 / 20)
+        self._rotation_updates = schedule_ui_updates(self.update_rotation)
 
     def on_stop(self):
-        Clock.unschedule(self.update_rotation)
+        unschedule_ui_updates(self._rotation_updates)
+        self.screen_manager.get_screen("game_screen").chessboard_preview.close()
 
     def update_rotation(self, _: Never = None):
         """
         Updates the rotation of the chessboard based on the current player to show.
         """
-        manager = ChessboardManagerSingleton()
+        snapshot = ChessboardManagerSingleton().snapshot
         self._player_showing_to = self._default_player
         if self._rotation_speed is not None:
-            if manager.game is not None and manager.state == manager_enums.State.GAME_IN_PROGRESS:
-                self._player_showing_to = manager.game.board.turn
+            if snapshot.state == manager_enums.State.GAME_IN_PROGRESS:
+                self._player_showing_to = snapshot.turn
         if self._last_player_to_show != self._player_showing_to:
             if self._player_showing_to == chess.WHITE:
                 self.set_rotation_to_0(no_animate=self._last_player_to_show is None)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Callable
+
+from kivy.app import App
+from kivy.clock import Clock
+
+from chessboard.interface.interface_async import AsyncChessboardInterface
+from chessboard.manager import ChessboardManagerSingleton, manager_events
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+async def run_update_loop(manager: ChessboardManagerSingleton,
+                          interface: AsyncChessboardInterface):
+    """
+    Updates the manager forever. This is the asyncio equivalent of the update thread.
+
+    :param manager: The manager to update.
+    :param interface: The interface the manager uses.
+    """
+    while True:
+        await manager.update_async()
+        # When streaming, update_async waits until the chessboard reports a change
+        if not interface.streaming:
+            await asyncio.sleep(0.01)
+
+
+async def run_app(app: App, manager: ChessboardManagerSingleton,
+                  interface: AsyncChessboardInterface):
+    """
+    Runs the Kivy app and the manager update loop in the current event loop, until the
+    app is closed.
+
+    :param app: The app to run.
+    :param manager: The manager to update.
+    :param interface: The interface the manager uses.
+    """
+    update_task = asyncio.create_task(run_update_loop(manager, interface))
+    logger.debug("Started update task")
+    try:
+        await app.async_run(async_lib="asyncio")
+    finally:
+        update_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await update_task
+        logger.debug("Stopped update task")
+        manager.close()
+
+
+def schedule_ui_updates(callback: Callable) -> manager_events.EventSubscription:
+    """
+    Calls the callback once now, and then on the Kivy thread whenever the manager
+    publishes events, whichever thread the manager is updated on. Events published in
+    the same frame only call the callback once.
+
+    :param callback: The callback to call.
+    :return: A handle to pass to `unschedule_ui_updates`.
+    """
+    callback()
+
+    def drain(_):
+        if subscription.drain():
+            callback()
+
+    subscription = ChessboardManagerSingleton().events.subscribe(
+        Clock.create_trigger(drain))
+    return subscription
+
+
+def unschedule_ui_updates(handle: manager_events.EventSubscription):
+    """
+    Stops calling the callback scheduled with `schedule_ui_updates`.
+
+    :param handle: The handle returned by `schedule_ui_updates`.
+    """
+    ChessboardManagerSingleton().events.unsubscribe(handle)
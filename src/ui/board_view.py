@@ -0,0 +1,195 @@
+from typing import Optional
+
+import chess
+import chess.svg
+from kivy.clock import Clock
+from kivy.graphics import Color, Mesh
+from kivy.graphics.texture import Texture
+from kivy.uix.image import Image
+from kivy.utils import get_color_from_hex
+
+from utils.board_renderer import BoardRenderer
+from utils.render_cache import RenderCache
+from utils.render_worker import BoardRenderWorker, RenderRequest, \
+    speculative_requests
+
+
+class BoardView(Image):
+    """
+    Shows a chessboard preview with the possible move as an arrow.
+
+    By default, the preview is one texture that is patched in place with only the
+    squares that changed, and the arrow is drawn on top of it as geometry, so nothing
+    is rasterized while the game is being played. When rendering in the background,
+    boards are rendered with chess.svg in a worker process instead and the UI only
+    uploads the finished pixels, which can be cached on disk. While the board doesn't
+    change, the arrow of every legal move and the board after it are pre-rendered, so
+    they can be shown right away.
+    """
+    render_in_background: bool
+    _cache_budget: Optional[int]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.render_in_background = False
+        self._cache_budget = None
+        self._renderer: Optional[BoardRenderer] = None
+        self._worker: Optional[BoardRenderWorker] = None
+        # The render request whose pixels are in the texture
+        self._shown_request: Optional[RenderRequest] = None
+        # The board without an arrow that pre-rendering was last asked for
+        self._speculated_request: Optional[RenderRequest] = None
+        self._arrow_move: Optional[chess.Move] = None
+        with self.canvas.after:
+            Color(*get_color_from_hex(chess.svg.DEFAULT_COLORS["arrow green"]))
+            self._arrow_mesh = Mesh(mode="triangles")
+        self.bind(pos=self._update_arrow, size=self._update_arrow)
+
+    def show(self, board: chess.Board, possible_move: Optional[chess.Move],
+             orientation: chess.Color = chess.WHITE,
+             next_orientation: Optional[chess.Color] = None):
+        """
+        Shows a board.
+
+        :param board: The board to show.
+        :param possible_move: The possible move to draw an arrow for, or None.
+        :param orientation: The side at the bottom of the board.
+        :param next_orientation: The side at the bottom of the board after the next
+         move, to pre-render boards with. Defaults to the same as orientation.
+        """
+        size = int(min(self.size))
+        if self.texture is None or self.texture.size != (size, size):
+            texture = Texture.create(size=(size, size), colorfmt="rgba")
+            # Renders start from the top row
+            texture.flip_vertical()
+            self.texture = texture
+            self._renderer = None
+            self._shown_request = None
+        if self.render_in_background:
+            self._show_in_background(board, possible_move, orientation,
+                                     orientation if next_orientation is None
+                                     else next_orientation, size)
+        else:
+            self._show_sprites(board, possible_move, orientation, size)
+
+    def _show_sprites(self, board: chess.Board, possible_move: Optional[chess.Move],
+                      orientation: chess.Color, size: int):
+        """
+        Shows a board with the sprite renderer.
+
+        :param board: The board to show.
+        :param possible_move: The possible move to draw an arrow for, or None.
+        :param orientation: The side at the bottom of the board.
+        :param size: The size of the board in pixels.
+        """
+        if self._renderer is None:
+            self._renderer = BoardRenderer(size, orientation)
+            # The arrow depends on the size and orientation
+            self._arrow_move = None
+        if self._shown_request is not None:
+            # The texture was last drawn by the worker
+            self._shown_request = None
+            self._renderer.invalidate()
+        if self._renderer.orientation != orientation:
+            self._renderer.orientation = orientation
+            self._arrow_move = None
+        blits = self._renderer.render(board)
+        for x, y, width, height, pixels in blits:
+            self.texture.blit_buffer(pixels, pos=(x, y), size=(width, height),
+                                     colorfmt="rgba", bufferfmt="ubyte")
+        if blits:
+            self.canvas.ask_update()
+        if possible_move != self._arrow_move:
+            self._arrow_move = possible_move
+            self._update_arrow()
+
+    def _show_in_background(self, board: chess.Board,
+                            possible_move: Optional[chess.Move],
+                            orientation: chess.Color, next_orientation: chess.Color,
+                            size: int):
+        """
+        Asks the render worker for a board and shows it once it is finished.
+
+        :param board: The board to show.
+        :param possible_move: The possible move to draw an arrow for, or None.
+        :param orientation: The side at the bottom of the board.
+        :param next_orientation: The side at the bottom of the board after the next
+         move.
+        :param size: The size of the board in pixels.
+        """
+        if self._worker is None:
+            self._worker = BoardRenderWorker(
+                RenderCache(budget=self._cache_budget)
+                if self._cache_budget is not None else None,
+                # The UI doesn't poll, so show renders as soon as they finish
+                on_result=Clock.create_trigger(self._show_result))
+            self._worker.start()
+        # The worker draws the arrow into the board
+        if self._arrow_move is not None:
+            self._arrow_move = None
+            self._update_arrow()
+        self._worker.submit(RenderRequest.from_board(board, possible_move,
+                                                     orientation, size))
+        # Only the board itself matters for what to pre-render, not the arrow
+        request = RenderRequest.from_board(board, None, orientation, size)
+        if request != self._speculated_request:
+            self._speculated_request = request
+            self._worker.speculate(speculative_requests(board, orientation,
+                                                        next_orientation, size))
+        self._show_result()
+
+    def _show_result(self, *_):
+        """
+        Shows the newest board the render worker finished, if it isn't shown yet.
+        """
+        if self._worker is None or not self.render_in_background:
+            return
+        result = self._worker.result
+        size = self.texture.width
+        if result is not None and result[0] != self._shown_request and \
+                result[0].size == size:
+            self._shown_request, pixels = result
+            self.texture.blit_buffer(pixels, size=(size, size), colorfmt="rgba",
+                                     bufferfmt="ubyte")
+            self.canvas.ask_update()
+
+    def set_cache_budget(self, budget: Optional[int]):
+        """
+        Sets how much disk space renders from the background may be cached in.
+
+        :param budget: The most bytes to cache, or None to not cache renders.
+        """
+        if budget != self._cache_budget:
+            self._cache_budget = budget
+            # Started again with the new cache when needed
+            self.close()
+
+    def _update_arrow(self, *_):
+        """
+        Draws the arrow of the possible move where the board currently is on screen.
+        """
+        if self._renderer is None or self._arrow_move is None:
+            self._arrow_mesh.vertices = []
+            self._arrow_mesh.indices = []
+            return
+        image_width, image_height = self.norm_image_size
+        scale = image_width / self._renderer.size
+        left = self.center_x - image_width / 2
+        top = self.center_y + image_height / 2
+        shaft, head = self._renderer.arrow(self._arrow_move)
+        points = shaft + head
+        vertices = []
+        for x, y in zip(points[0::2], points[1::2]):
+            # Kivy's y axis points up
+            vertices.extend((left + x * scale, top - y * scale, 0, 0))
+        self._arrow_mesh.vertices = vertices
+        self._arrow_mesh.indices = [0, 1, 2, 0, 2, 3, 4, 5, 6]
+
+    def close(self):
+        """
+        Stops the render worker, if it was started.
+        """
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+            self._speculated_request = None
@@ -1,28 +1,36 @@
+import logging
 from typing import Never
 
 import chess
 from kivy.app import App
-from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.image import Image
 from kivy.uix.label import Label
 from kivy.uix.screenmanager import Screen
 
-from chessboard.manager import ChessboardManagerSingleton, manager_enums
-from utils.chessboard_helpers import get_chessboard_preview
+from chessboard.manager import ChessboardManagerSingleton, manager_enums, \
+    manager_exceptions
+from ui.async_bridge import schedule_ui_updates, unschedule_ui_updates
+from ui.board_view import BoardView
+from ui.config import SettingsConfigSingleton
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
 
 
 class GameScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs, name="game_screen")
         self.last_state = None
+        self._ui_updates = None
 
         self.vlayout = BoxLayout(orientation="vertical")
 
-        self.chessboard_preview = Image(fit_mode="contain", size=(240, 240),
-                                        size_hint=(None, None))
+        self.chessboard_preview = BoardView(fit_mode="contain", size=(240, 240),
+                                            size_hint=(None, None))
         self.vlayout.add_widget(self.chessboard_preview)
+        SettingsConfigSingleton().on_reload_callbacks.append(
+            self._update_board_renderer)
 
         self.confirm_move_button = Button(text="White, make a move", disabled=True)
         self.confirm_move_button.bind(on_press=self.confirm_move)
@@ -42,64 +50,90 @@ class GameScreen(Screen):
         Called when the screen is entered. Starts updating the UI.
         """
         super().on_pre_enter(*args)
-        Clock.schedule_interval(self.update_ui, 1 / 20)
+        self._ui_updates = schedule_ui_updates(self.update_ui)
 
     def on_pre_leave(self, *args):
         """
         Called when the screen is left. Stops updating the UI.
         """
         super().on_pre_leave(*args)
-        Clock.unschedule(self.update_ui)
+        unschedule_ui_updates(self._ui_updates)
+
+    def _update_board_renderer(self):
+        config = SettingsConfigSingleton().config
+        self.chessboard_preview.render_in_background = {
+            "sprites": False,
+            "svg in background": True
+        }[config.get("display", "board_renderer", fallback="Sprites").lower()]
+        self.chessboard_preview.set_cache_budget({
+            "off": None,
+            "64 mb": 64 * 1024 * 1024,
+            "256 mb": 256 * 1024 * 1024,
+            "1 gb": 1024 * 1024 * 1024
+        }[config.get("display", "preview_cache_size", fallback="256 MB").lower()])
 
     def update_ui(self, _: Never = None):
         """
         Update the UI.
         """
         app = App.get_running_app()
-        manager = ChessboardManagerSingleton()
-        if manager.state == manager_enums.State.GAME_IN_PROGRESS:
+        # Read once, so everything shown is from the same moment
+        snapshot = ChessboardManagerSingleton().snapshot
+        if snapshot.state == manager_enums.State.GAME_IN_PROGRESS:
             # Game just started
-            if self.last_state != manager.state:
+            if self.last_state != snapshot.state:
                 self.vlayout.add_widget(self.confirm_move_button)
                 self.vlayout.remove_widget(self.outcome_label)
                 # Readd to keep the button under the confirm move button
                 self.vlayout.remove_widget(self.more_actions_button)
                 self.vlayout.add_widget(self.more_actions_button)
             # Check for possible move
-            self.confirm_move_button.disabled = manager.possible_move is None
-            player_to_move = "White" if manager.game.board.turn == chess.WHITE else "Black"
+            self.confirm_move_button.disabled = snapshot.possible_move is None
+            player_to_move = "White" if snapshot.turn == chess.WHITE else "Black"
+            # Resumed game, the pieces on the chessboard must be set up like the game
+            if snapshot.resuming:
+                misplaced = chess.popcount(snapshot.misplaced)
+                self.confirm_move_button.text = f"Set up the pieces as shown, {misplaced} square{'s' if misplaced != 1 else ''} differ{'' if misplaced != 1 else 's'}"
+            # Engine to move, its move is made on the chessboard and confirmed by itself
+            elif snapshot.engine_to_move and snapshot.possible_move is None and \
+                    (snapshot.engine_thinking or snapshot.engine_move is not None):
+                if snapshot.engine_move is not None:
+                    self.confirm_move_button.text = f"{player_to_move} plays {snapshot.engine_move_san}, make the move"
+                else:
+                    self.confirm_move_button.text = f"{player_to_move} is thinking..."
             # Draw offered, change UI
-            if manager.game.offered_draw is not None:
+            elif snapshot.offered_draw is not None:
                 # Player that offered draw
-                if manager.game.offered_draw == manager.game.board.turn:
-                    if manager.possible_move is not None:
-                        san_move = manager.game.board.san(manager.possible_move)
-                        if manager.possible_move.promotion is not None:
+                if snapshot.offered_draw == snapshot.turn:
+                    if snapshot.possible_move is not None:
+                        san_move = snapshot.possible_move_san
+                        if snapshot.possible_move.promotion is not None:
                             san_move = san_move.split("=")[0] + "=..."
                         self.confirm_move_button.text = f"{player_to_move}, confirm move {san_move} first"
                     else:
                         self.confirm_move_button.text = f"{player_to_move}, make a move first"
                 # Other player to accept or decline draw offer
                 else:
-                    if manager.possible_move is not None:
-                        san_move = manager.game.board.san(manager.possible_move)
-                        if manager.possible_move.promotion is not None:
+                    if snapshot.possible_move is not None:
+                        san_move = snapshot.possible_move_san
+                        if snapshot.possible_move.promotion is not None:
                             san_move = san_move.split("=")[0] + "=..."
                         self.confirm_move_button.text = f"{player_to_move}, confirm move {san_move} to decline"
                     else:
                         self.confirm_move_button.text = f"{player_to_move}, make a move to decline"
             # Normal UI
             else:
-                if manager.possible_move is not None:
-                    san_move = manager.game.board.san(manager.possible_move)
-                    if manager.possible_move.promotion is not None:
+                if snapshot.possible_move is not None:
+                    san_move = snapshot.possible_move_san
+                    if snapshot.possible_move.promotion is not None:
                         san_move = san_move.split("=")[0] + "=..."
                     self.confirm_move_button.text = f"{player_to_move}, confirm move {san_move}"
                 else:
                     self.confirm_move_button.text = f"{player_to_move}, make a move"
             # If offered draw, disable more actions button and indicate that
-            if manager.game.offered_draw is not None:
-                if manager.game.offered_draw == manager.game.board.turn:
+            if snapshot.offered_draw is not None:
+                # The engine declines draw offers by moving
+                if snapshot.offered_draw == snapshot.turn or snapshot.engine_to_move:
                     self.more_actions_button.text = "Draw offered, waiting for move"
                     self.more_actions_button.disabled = True
                 else:
@@ -108,24 +142,25 @@ class GameScreen(Screen):
             else:
                 self.more_actions_button.text = "More actions"
                 self.more_actions_button.disabled = False
-        elif manager.state == manager_enums.State.GAME_OVER:
+        elif snapshot.state == manager_enums.State.GAME_OVER:
             # Game just ended
-            if self.last_state != manager.state:
+            if self.last_state != snapshot.state:
                 self.vlayout.remove_widget(self.confirm_move_button)
                 self.vlayout.add_widget(self.outcome_label)
                 # Readd to keep the button under the outcome label
                 self.vlayout.remove_widget(self.more_actions_button)
                 self.vlayout.add_widget(self.more_actions_button)
             self.confirm_move_button.disabled = True
-            self.outcome_label.text = manager.game.outcome.value
+            self.outcome_label.text = snapshot.outcome.value
         # Update preview
-        if manager.game is not None:
-            core_img = get_chessboard_preview(board=manager.game.board,
-                                              possible_move=manager.possible_move,
-                                              orientation=app.player_showing_to,
-                                              size=240)
-            self.chessboard_preview.texture = core_img.texture
-        self.last_state = manager.state
+        if snapshot.board is not None:
+            self.chessboard_preview.show(
+                board=snapshot.board,
+                possible_move=snapshot.possible_move or snapshot.engine_move,
+                orientation=app.player_showing_to,
+                next_orientation=not app.player_showing_to if app.rotates_with_turn
+                else app.player_showing_to)
+        self.last_state = snapshot.state
 
     def confirm_move(self, _):
         """
@@ -133,12 +168,17 @@ class GameScreen(Screen):
         button may also decline an offered draw.
         """
         manager = ChessboardManagerSingleton()
-        if manager.possible_move is not None:
-            if manager.possible_move.promotion is not None:
+        snapshot = manager.snapshot
+        if snapshot.possible_move is not None:
+            if snapshot.possible_move.promotion is not None:
                 self.manager.transition.direction = "left"
-                self.manager.current = "white_promoting_to_screen" if manager.game.board.turn == chess.WHITE else "black_promoting_to_screen"
+                self.manager.current = "white_promoting_to_screen" if snapshot.turn == chess.WHITE else "black_promoting_to_screen"
             else:
-                manager.confirm_possible_move()
+                try:
+                    manager.confirm_possible_move(expected=snapshot.possible_move)
+                except manager_exceptions.ChessboardManagerStateError as e:
+                    # The UI is updated with the new possible move right after
+                    logger.warning(f"Not confirming move: {e}")
 
     def open_more_menu(self, _):
         """
@@ -146,8 +186,8 @@ class GameScreen(Screen):
         pressed. This button may also accept an offered draw.
         """
         manager = ChessboardManagerSingleton()
-        if manager.game.offered_draw is not None:
-            manager.game.accept_offered_draw()
+        if manager.snapshot.offered_draw is not None:
+            manager.accept_offered_draw()
         else:
             # TODO: Actually pause the game by calling the manager
             self.manager.transition.direction = "left"
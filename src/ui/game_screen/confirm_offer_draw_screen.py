@@ -26,12 +26,12 @@ class ConfirmOfferDrawScreen(Screen):
 
     def on_pre_enter(self, *args):
         super().on_pre_enter(*args)
-        manager = ChessboardManagerSingleton()
-        self.title_label.text = f"{'White' if manager.game.board.turn == chess.WHITE else 'Black'}, offer draw?"
+        snapshot = ChessboardManagerSingleton().snapshot
+        self.title_label.text = f"{'White' if snapshot.turn == chess.WHITE else 'Black'}, offer draw?"
 
     def confirm_offer_draw(self, _):
         manager = ChessboardManagerSingleton()
-        manager.game.offer_draw()
+        manager.offer_draw()
         self.manager.transition.direction = "right"
         self.manager.current = "game_screen"
 
@@ -26,12 +26,12 @@ class ConfirmResignationScreen(Screen):
 
     def on_pre_enter(self, *args):
         super().on_pre_enter(*args)
-        manager = ChessboardManagerSingleton()
-        self.title_label.text = f"{'White' if manager.game.board.turn == chess.WHITE else 'Black'}, resign?"
+        snapshot = ChessboardManagerSingleton().snapshot
+        self.title_label.text = f"{'White' if snapshot.turn == chess.WHITE else 'Black'}, resign?"
 
     def confirm_resignation(self, _):
         manager = ChessboardManagerSingleton()
-        manager.game.resign()
+        manager.resign()
         self.manager.transition.direction = "right"
         self.manager.current = "game_screen"
 
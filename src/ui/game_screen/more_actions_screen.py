@@ -1,5 +1,9 @@
+import logging
+import sqlite3
+import threading
 from typing import Never
 
+import chess
 from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
@@ -7,6 +11,12 @@ from kivy.uix.label import Label
 from kivy.uix.screenmanager import Screen
 
 from chessboard.manager import ChessboardManagerSingleton, manager_enums
+from game.archive import GameArchive
+from game.position import transposition_hash
+from ui.async_bridge import schedule_ui_updates, unschedule_ui_updates
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
 
 
 class MoreActionsScreen(Screen):
@@ -14,6 +24,10 @@ class MoreActionsScreen(Screen):
         super().__init__(**kwargs, name="more_actions_screen")
 
         self.claimed_draw = False
+        self._ui_updates = None
+        self._reached_text = ""
+        # Counts the archive searches started, so the result of an older one is ignored
+        self._reached_search = 0
 
         layout = BoxLayout(orientation="vertical")
         self.status_label = Label(text="Game paused")
@@ -31,10 +45,9 @@ class MoreActionsScreen(Screen):
         self.resign_button.bind(on_press=self.resign)
         layout.add_widget(self.resign_button)
 
-        # TODO: Implement save game functionality so it can be resumed later
-        exit_button = Button(text="Exit without saving")
-        exit_button.bind(on_press=self.exit_to_main_screen)
-        layout.add_widget(exit_button)
+        self.exit_button = Button(text="Save and exit")
+        self.exit_button.bind(on_press=self.exit_to_main_screen)
+        layout.add_widget(self.exit_button)
 
         self.update_ui()
 
@@ -45,28 +58,70 @@ class MoreActionsScreen(Screen):
         Called when the screen is entered. Starts updating the UI.
         """
         super().on_pre_enter(*args)
-        Clock.schedule_interval(self.update_ui, 1 / 20)
+        # Searched once, as the game is paused on this screen
+        manager = ChessboardManagerSingleton()
+        snapshot = manager.snapshot
+        self._reached_text = ""
+        self._reached_search += 1
+        if manager.archive is not None and snapshot.board is not None:
+            # Searching a large archive can take longer than a frame
+            threading.Thread(target=self._count_reached, daemon=True,
+                             args=(manager.archive, snapshot.board,
+                                   self._reached_search)).start()
+        self._ui_updates = schedule_ui_updates(self.update_ui)
 
     def on_pre_leave(self, *args):
         """
         Called when the screen is left. Stops updating the UI.
         """
         super().on_pre_leave(*args)
-        Clock.unschedule(self.update_ui)
+        unschedule_ui_updates(self._ui_updates)
+        self._reached_search += 1
+
+    def _count_reached(self, archive: GameArchive, board: chess.Board, search: int):
+        """
+        Counts the archived games that reached the position, on a background thread.
+
+        :param archive: The archive to search.
+        :param board: The position.
+        :param search: The number of the search.
+        """
+        try:
+            reached = archive.count_games_reaching(transposition_hash(board))
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot search the archive: {e!r}")
+            return
+        Clock.schedule_once(lambda _: self._show_reached(reached, search))
+
+    def _show_reached(self, reached: int, search: int):
+        """
+        Shows the number of archived games that reached the position, unless the search
+        is outdated.
+
+        :param reached: The number of games.
+        :param search: The number of the search.
+        """
+        if search != self._reached_search:
+            return
+        self._reached_text = f"\n{reached} archived game{'s' if reached != 1 else ''} reached this position"
+        self.update_ui()
 
     def update_ui(self, _: Never = None):
-        manager = ChessboardManagerSingleton()
-        if manager.state == manager_enums.State.GAME_IN_PROGRESS:
-            self.status_label.text = "Game paused"
+        snapshot = ChessboardManagerSingleton().snapshot
+        if snapshot.state == manager_enums.State.GAME_IN_PROGRESS:
+            self.status_label.text = "Game paused" + self._reached_text
             self.resume_button.text = "Resume"
-            self.draw_button.disabled = False
-            self.draw_button.text = "Claim draw" if manager.game.can_claim_draw else "Offer draw"
-            self.resign_button.disabled = False
-        elif manager.state == manager_enums.State.GAME_OVER:
-            self.status_label.text = manager.game.outcome.value
+            # Draws and resignations are for the player to move, not the engine
+            self.draw_button.disabled = snapshot.engine_to_move
+            self.draw_button.text = "Claim draw" if snapshot.can_claim_draw else "Offer draw"
+            self.resign_button.disabled = snapshot.engine_to_move
+            self.exit_button.text = "Save and exit"
+        elif snapshot.state == manager_enums.State.GAME_OVER:
+            self.status_label.text = snapshot.outcome.value + self._reached_text
             self.resume_button.text = "Go back to game"
             self.draw_button.disabled = True
             self.resign_button.disabled = True
+            self.exit_button.text = "Exit"
 
     def resume_or_go_back(self, _):
         """
@@ -80,8 +135,8 @@ class MoreActionsScreen(Screen):
         Claims or offers a draw.
         """
         manager = ChessboardManagerSingleton()
-        if manager.game.can_claim_draw:
-            manager.game.claim_draw()
+        if manager.snapshot.can_claim_draw:
+            manager.claim_draw()
             self.draw_button.disabled = True
         else:
             self.manager.transition.direction = "left"
@@ -96,9 +151,9 @@ class MoreActionsScreen(Screen):
 
     def exit_to_main_screen(self, _):
         """
-        Exits the game and goes back to the main screen. The game is not saved.
+        Exits the game and goes back to the main screen. A game in progress is saved,
+        so it can be resumed from the main screen.
         """
-        # TODO: Implement save game functionality
         manager = ChessboardManagerSingleton()
         manager.exit()
         self.manager.transition.direction = "right"
@@ -1,7 +1,14 @@
+import logging
+
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.screenmanager import Screen
 
+from chessboard.manager import ChessboardManagerSingleton, manager_exceptions
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
 
 class MainScreen(Screen):
     def __init__(self, **kwargs):
@@ -12,10 +19,11 @@ class MainScreen(Screen):
         new_game_button.bind(on_press=self.switch_to_new_game_screen)
         layout.add_widget(new_game_button)
 
-        # TODO: Implement resume game functionality
-        resume_game_button = Button(text="Resume game", disabled=True)
-        resume_game_button.bind(on_press=self.switch_to_resume_game_screen)
-        layout.add_widget(resume_game_button)
+        self.resume_game_button = Button(
+            text="Resume game",
+            disabled=not ChessboardManagerSingleton().snapshot.can_resume)
+        self.resume_game_button.bind(on_press=self.switch_to_resume_game_screen)
+        layout.add_widget(self.resume_game_button)
 
         # TODO: Implement completed games functionality
         completed_games_button = Button(text="View completed games", disabled=True)
@@ -28,13 +36,27 @@ class MainScreen(Screen):
 
         self.add_widget(layout)
 
+    def on_pre_enter(self, *args):
+        """
+        Called when the screen is entered. Enables resuming if there is a saved game.
+        """
+        super().on_pre_enter(*args)
+        self.resume_game_button.disabled = \
+            not ChessboardManagerSingleton().snapshot.can_resume
+
     def switch_to_new_game_screen(self, _):
         self.manager.transition.direction = "left"
         self.manager.current = "new_game_screen"
 
     def switch_to_resume_game_screen(self, _):
-        # TODO: Implement resume game functionality
-        pass
+        try:
+            ChessboardManagerSingleton().resume_game()
+        except manager_exceptions.ChessboardManagerError as e:
+            logger.warning(f"Failed to resume game: {e}")
+            self.resume_game_button.disabled = True
+            return
+        self.manager.transition.direction = "left"
+        self.manager.current = "game_screen"
 
     def switch_to_completed_games_screen(self, _):
         # TODO: Implement view completed games functionality
@@ -1,9 +1,45 @@
+import shlex
+from pathlib import Path
+
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.screenmanager import Screen
 
 from chessboard.manager import ChessboardManagerSingleton, manager_dataclasses
 from chessboard.manager.manager_enums import PlayerType
+from engine.engine_dataclasses import EngineConfiguration, BUILTIN_ENGINE_COMMAND
+from engine.engine_enums import BookSelection
+from ui.config import SettingsConfigSingleton
+
+
+def engine_configuration_from_settings() -> EngineConfiguration:
+    """
+    Creates the configuration of engine players from the engine settings.
+
+    :return: The engine configuration.
+    """
+    config = SettingsConfigSingleton().config
+    command = shlex.split(config.get("engine", "command", fallback=""))
+    think_time = config.getfloat("engine", "think_time", fallback=1)
+    depth = config.getint("engine", "depth", fallback=0)
+    nodes = config.getint("engine", "nodes", fallback=0)
+    skill_level = config.get("engine", "skill_level", fallback="Default")
+    elo = config.getint("engine", "elo", fallback=0)
+    book = config.get("engine", "book", fallback="").strip()
+    tablebase = config.get("engine", "tablebase", fallback="").strip()
+    return EngineConfiguration(
+        command=tuple(command) if command else BUILTIN_ENGINE_COMMAND,
+        # 0 for no limit
+        time=think_time if think_time > 0 else None,
+        depth=depth if depth > 0 else None,
+        nodes=nodes if nodes > 0 else None,
+        skill_level=int(skill_level) if skill_level.isdigit() else None,
+        elo=elo if elo > 0 else None,
+        ponder=config.getboolean("engine", "ponder", fallback=False),
+        book=Path(book).expanduser() if book else None,
+        book_selection=BookSelection(config.get("engine", "book_selection",
+                                                fallback="Weighted")),
+        tablebase=Path(tablebase).expanduser() if tablebase else None)
 
 
 class NewGameScreen(Screen):
@@ -38,11 +74,12 @@ class NewGameScreen(Screen):
 
     def start_game_and_switch_to_game_screen(self, _):
         manager = ChessboardManagerSingleton()
+        engine = engine_configuration_from_settings()
         manager.new_game(
             white_player=manager_dataclasses.PlayerConfiguration(
-                player_type=self.white_player_type),
+                player_type=self.white_player_type, engine=engine),
             black_player=manager_dataclasses.PlayerConfiguration(
-                player_type=self.black_player_type),
+                player_type=self.black_player_type, engine=engine),
         )
         self.manager.transition.direction = "left"
         self.manager.current = "game_screen"
@@ -20,8 +20,7 @@ class WhitePlayerConfigScreen(Screen):
             on_press=self.set_as_human_and_switch_to_new_game_screen)
         layout.add_widget(set_as_human_button)
 
-        # Not implemented yet.
-        set_as_engine_button = Button(text="An engine", disabled=True)
+        set_as_engine_button = Button(text="An engine")
         set_as_engine_button.bind(
             on_press=self.set_as_engine_and_switch_to_new_game_screen)
         layout.add_widget(set_as_engine_button)
@@ -46,6 +46,116 @@ class SettingsScreen(Screen):
       "Fast",
       "Instant"
     ]
+  },
+  {
+    "type": "options",
+    "title": "Board renderer",
+    "desc": "Choose how the board preview is drawn. Sprites is the fastest, SVG in background draws it exactly like before in a separate process.",
+    "section": "display",
+    "key": "board_renderer",
+    "options": [
+      "Sprites",
+      "SVG in background"
+    ]
+  },
+  {
+    "type": "options",
+    "title": "Preview cache size",
+    "desc": "Choose how much disk space board previews rendered in the background may be cached in.",
+    "section": "display",
+    "key": "preview_cache_size",
+    "options": [
+      "Off",
+      "64 MB",
+      "256 MB",
+      "1 GB"
+    ]
+  }
+]
+        """)
+        s.add_json_panel("Engine", conf, data="""
+[
+  {
+    "type": "string",
+    "title": "Engine command",
+    "desc": "The command to start a UCI engine with, like stockfish. Leave empty to use the built-in engine.",
+    "section": "engine",
+    "key": "command"
+  },
+  {
+    "type": "numeric",
+    "title": "Think time",
+    "desc": "How many seconds the engine thinks per move. Set to 0 for no time limit.",
+    "section": "engine",
+    "key": "think_time"
+  },
+  {
+    "type": "numeric",
+    "title": "Depth",
+    "desc": "How many plies deep the engine searches at most. Set to 0 for no depth limit.",
+    "section": "engine",
+    "key": "depth"
+  },
+  {
+    "type": "numeric",
+    "title": "Nodes",
+    "desc": "How many positions the engine searches at most. Set to 0 for no node limit.",
+    "section": "engine",
+    "key": "nodes"
+  },
+  {
+    "type": "options",
+    "title": "Skill level",
+    "desc": "Choose how well the engine plays, if it supports skill levels like the built-in engine and Stockfish.",
+    "section": "engine",
+    "key": "skill_level",
+    "options": [
+      "Default",
+      "0",
+      "5",
+      "10",
+      "15",
+      "20"
+    ]
+  },
+  {
+    "type": "numeric",
+    "title": "Elo",
+    "desc": "The rating to limit the engine to, if it supports it. Set to 0 to not limit it.",
+    "section": "engine",
+    "key": "elo"
+  },
+  {
+    "type": "bool",
+    "title": "Ponder",
+    "desc": "Whether the engine keeps thinking during your turn. Uses the CPU the chessboard and the screen need, so leave it off on single-core boards.",
+    "section": "engine",
+    "key": "ponder"
+  },
+  {
+    "type": "string",
+    "title": "Opening book",
+    "desc": "The path to a Polyglot opening book (.bin) the engine plays from before thinking. Leave empty to not use a book.",
+    "section": "engine",
+    "key": "book"
+  },
+  {
+    "type": "options",
+    "title": "Book moves",
+    "desc": "Choose whether the engine picks book moves at random by their weight, or always the best one.",
+    "section": "engine",
+    "key": "book_selection",
+    "options": [
+      "Weighted",
+      "Best"
+    ]
+  },
+  {
+    "type": "string",
+    "title": "Endgame tablebases",
+    "desc": "The directory of Syzygy tablebases (.rtbw and .rtbz) the engine plays endgames perfectly from and decides on draws with. Leave empty to not use tablebases.",
+    "section": "engine",
+    "key": "tablebase"
   }
 ]
         """)
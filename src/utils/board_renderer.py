@@ -0,0 +1,264 @@
+import math
+import sys
+from typing import Optional
+
+import chess
+import chess.svg
+from cairosvg.parser import Tree
+from cairosvg.surface import PNGSurface
+
+# The layout of chess.svg.board with coordinates and without borders, in SVG units
+SVG_BOARD_SIZE = 8 * chess.svg.SQUARE_SIZE + 2 * 15
+SVG_BOARD_MARGIN = 15
+
+# A region of the board image that changed: x, y, width, height and the RGBA pixels,
+# with the origin at the top left
+Blit = tuple[int, int, int, int, bytes]
+# What a square shows: the piece symbol (None if empty), whether the square is light,
+# whether it is part of the last move and whether it is a king in check
+TileKey = tuple[Optional[str], bool, bool, bool]
+
+
+def rasterize_svg(svg: str, width: int, height: int) -> bytes:
+    """
+    Rasterizes an SVG into raw RGBA pixels, without encoding a PNG in between.
+
+    :param svg: The SVG to rasterize.
+    :param width: The width in pixels.
+    :param height: The height in pixels.
+    :return: The pixels, row by row from the top left, 4 bytes each.
+    """
+    surface = PNGSurface(Tree(bytestring=svg.encode("utf-8")), None, 96,
+                         output_width=width, output_height=height)
+    surface.cairo.flush()
+    data = surface.cairo.get_data()
+    stride = surface.cairo.get_stride()
+    pixels = bytearray(width * height * 4)
+    for row in range(height):
+        pixels[row * width * 4:(row + 1) * width * 4] = \
+            data[row * stride:row * stride + width * 4]
+    # Cairo stores native endian ARGB words, which are BGRA bytes on little endian
+    # machines. Alpha is premultiplied, but the board is opaque so that doesn't matter.
+    if sys.byteorder == "little":
+        pixels[0::4], pixels[2::4] = pixels[2::4], pixels[0::4]
+    else:
+        a, r, g, b = pixels[0::4], pixels[1::4], pixels[2::4], pixels[3::4]
+        pixels[0::4], pixels[1::4], pixels[2::4], pixels[3::4] = r, g, b, a
+    return bytes(pixels)
+
+
+def _tile_svg(key: TileKey) -> str:
+    """
+    Creates the SVG of a single square, drawn like chess.svg.board draws it.
+
+    :param key: What the square shows.
+    :return: The SVG of the square.
+    """
+    symbol, light, lastmove, check = key
+    color_name = f"square {'light' if light else 'dark'}{' lastmove' if lastmove else ''}"
+    defs = ""
+    body = f'<rect width="{chess.svg.SQUARE_SIZE}" height="{chess.svg.SQUARE_SIZE}" ' \
+           f'stroke="none" fill="{chess.svg.DEFAULT_COLORS[color_name]}" />'
+    if check:
+        defs += chess.svg.CHECK_GRADIENT
+        body += f'<rect width="{chess.svg.SQUARE_SIZE}" ' \
+                f'height="{chess.svg.SQUARE_SIZE}" fill="url(#check_gradient)" />'
+    if symbol is not None:
+        piece = chess.Piece.from_symbol(symbol)
+        defs += chess.svg.PIECES[symbol]
+        href = f"#{chess.COLOR_NAMES[piece.color]}-{chess.PIECE_NAMES[piece.piece_type]}"
+        body += f'<use href="{href}" xlink:href="{href}" />'
+    return f'<svg xmlns="http://www.w3.org/2000/svg" ' \
+           f'xmlns:xlink="http://www.w3.org/1999/xlink" ' \
+           f'viewBox="0 0 {chess.svg.SQUARE_SIZE} {chess.svg.SQUARE_SIZE}">' \
+           f'<defs>{defs}</defs>{body}</svg>'
+
+
+class BoardRenderer:
+    """
+    Renders the board preview like chess.svg.board, but only rasterizes once. The
+    frame and every kind of square are rasterized into sprites when created, after
+    which rendering a board only copies the sprites of squares that changed since the
+    last render. The possible move arrow is not part of the image, draw it on top with
+    the shape from `arrow`.
+    """
+    _size: int
+    _orientation: chess.Color
+    # The pixel edges of the columns and rows, so square i spans edges i to i + 1
+    _edges: list[int]
+    _frame: dict[chess.Color, bytes]
+    _sprite_size: int
+    _sprites: dict[TileKey, bytes]
+    # Sprites cropped to the size of the squares they are drawn on
+    _tiles: dict[tuple[TileKey, int, int], bytes]
+    # What each square showed in the last render, None before the first render
+    _drawn: Optional[list[Optional[TileKey]]]
+
+    def __init__(self, size: int, orientation: chess.Color = chess.WHITE):
+        """
+        :param size: The size of the board image in pixels.
+        :param orientation: The side at the bottom of the board.
+        """
+        self._size = size
+        self._orientation = orientation
+        scale = size / SVG_BOARD_SIZE
+        self._edges = [round((SVG_BOARD_MARGIN + i * chess.svg.SQUARE_SIZE) * scale)
+                       for i in range(9)]
+        self._frame = {}
+        self._sprite_size = max(b - a for a, b in zip(self._edges, self._edges[1:]))
+        self._sprites = {}
+        for symbol in [None] + [chess.Piece(piece_type, color).symbol()
+                                for color in chess.COLORS
+                                for piece_type in chess.PIECE_TYPES]:
+            for light in (True, False):
+                for lastmove in (False, True):
+                    keys = [(symbol, light, lastmove, False)]
+                    if symbol in ("K", "k"):
+                        keys.append((symbol, light, lastmove, True))
+                    for key in keys:
+                        self._sprites[key] = rasterize_svg(
+                            _tile_svg(key), self._sprite_size, self._sprite_size)
+        self._tiles = {}
+        self._drawn = None
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the size of the board image in pixels.
+
+        :return: The size in pixels.
+        """
+        return self._size
+
+    @property
+    def orientation(self) -> chess.Color:
+        """
+        Returns the side at the bottom of the board.
+
+        :return: The side at the bottom.
+        """
+        return self._orientation
+
+    @orientation.setter
+    def orientation(self, orientation: chess.Color):
+        """
+        Sets the side at the bottom of the board, which redraws everything on the next
+        render.
+
+        :param orientation: The side at the bottom.
+        """
+        if orientation != self._orientation:
+            self._orientation = orientation
+            self._drawn = None
+
+    def invalidate(self):
+        """
+        Redraws everything on the next render, like when the image was drawn over.
+        """
+        self._drawn = None
+
+    def _square_rect(self, square: chess.Square) -> tuple[int, int, int, int]:
+        """
+        Gets where a square is in the board image.
+
+        :param square: The square.
+        :return: The x, y, width and height in pixels, from the top left.
+        """
+        file = chess.square_file(square)
+        rank = chess.square_rank(square)
+        col = file if self._orientation == chess.WHITE else 7 - file
+        row = 7 - rank if self._orientation == chess.WHITE else rank
+        x, y = self._edges[col], self._edges[row]
+        return x, y, self._edges[col + 1] - x, self._edges[row + 1] - y
+
+    def _tile(self, key: TileKey, width: int, height: int) -> bytes:
+        """
+        Gets the pixels of a sprite, cropped to the size of a square.
+
+        :param key: What the square shows.
+        :param width: The width of the square in pixels.
+        :param height: The height of the square in pixels.
+        :return: The RGBA pixels.
+        """
+        tile = self._tiles.get((key, width, height))
+        if tile is None:
+            sprite = self._sprites[key]
+            row_length = self._sprite_size * 4
+            tile = b"".join(sprite[row * row_length:row * row_length + width * 4]
+                            for row in range(height))
+            self._tiles[(key, width, height)] = tile
+        return tile
+
+    def render(self, board: chess.Board) -> list[Blit]:
+        """
+        Renders a board, highlighting the last move and a king in check.
+
+        :param board: The board to render.
+        :return: The regions of the board image that changed since the last render. The
+         first render after creating the renderer or changing the orientation covers
+         the whole image.
+        """
+        blits = []
+        if self._drawn is None:
+            if self._orientation not in self._frame:
+                self._frame[self._orientation] = rasterize_svg(
+                    chess.svg.board(None, size=self._size,
+                                    orientation=self._orientation),
+                    self._size, self._size)
+            blits.append((0, 0, self._size, self._size,
+                          self._frame[self._orientation]))
+            self._drawn = [None] * 64
+        lastmove = board.peek() if board.move_stack else None
+        check_square = board.king(board.turn) if board.is_check() else None
+        for square in chess.SQUARES:
+            piece = board.piece_at(square)
+            key = (piece.symbol() if piece is not None else None,
+                   bool(chess.BB_LIGHT_SQUARES & chess.BB_SQUARES[square]),
+                   lastmove is not None and square in (lastmove.from_square,
+                                                       lastmove.to_square),
+                   square == check_square)
+            if self._drawn[square] != key:
+                x, y, width, height = self._square_rect(square)
+                blits.append((x, y, width, height, self._tile(key, width, height)))
+                self._drawn[square] = key
+        return blits
+
+    def arrow(self, move: chess.Move) -> tuple[list[float], list[float]]:
+        """
+        Gets the shape of an arrow for a move, like chess.svg.board draws it.
+
+        :param move: The move to draw an arrow for.
+        :return: The corners of the shaft as x1, y1, ... x4, y4, and the corners of the
+         head as x1, y1, ... x3, y3, in pixels from the top left.
+        """
+        scale = self._size / SVG_BOARD_SIZE
+        square_size = chess.svg.SQUARE_SIZE
+
+        def center(square: chess.Square) -> tuple[float, float]:
+            file = chess.square_file(square)
+            rank = chess.square_rank(square)
+            x = (file + 0.5 if self._orientation == chess.WHITE else 7.5 - file)
+            y = (7.5 - rank if self._orientation == chess.WHITE else rank + 0.5)
+            return SVG_BOARD_MARGIN + x * square_size, SVG_BOARD_MARGIN + y * square_size
+
+        xtail, ytail = center(move.from_square)
+        xhead, yhead = center(move.to_square)
+        marker_size = 0.75 * square_size
+        marker_margin = 0.1 * square_size
+        dx, dy = xhead - xtail, yhead - ytail
+        hypot = math.hypot(dx, dy)
+        shaft_x = xhead - dx * (marker_size + marker_margin) / hypot
+        shaft_y = yhead - dy * (marker_size + marker_margin) / hypot
+        xtip = xhead - dx * marker_margin / hypot
+        ytip = yhead - dy * marker_margin / hypot
+        # Half the stroke width, perpendicular to the arrow
+        nx = -dy / hypot * 0.1 * square_size
+        ny = dx / hypot * 0.1 * square_size
+        shaft = [xtail + nx, ytail + ny, shaft_x + nx, shaft_y + ny,
+                 shaft_x - nx, shaft_y - ny, xtail - nx, ytail - ny]
+        head = [xtip, ytip,
+                shaft_x + dy * 0.5 * marker_size / hypot,
+                shaft_y - dx * 0.5 * marker_size / hypot,
+                shaft_x - dy * 0.5 * marker_size / hypot,
+                shaft_y + dx * 0.5 * marker_size / hypot]
+        return [v * scale for v in shaft], [v * scale for v in head]
@@ -0,0 +1,174 @@
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from utils.logger import create_logger
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# Relative to the working directory, like settings.ini
+DEFAULT_CACHE_DIRECTORY = Path("preview_cache")
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024
+CACHE_ENTRY_SUFFIX = ".rgba"
+
+
+class RenderCache:
+    """
+    A content addressed cache of rendered boards on disk, so boards that were rendered
+    before, even by another run, don't have to be rendered again.
+
+    Every entry is a file of raw pixels named after the digest of what was rendered.
+    Entries are written to a temporary file first and then moved into place, so a
+    reader never sees half an entry, and reads are memory mapped. Once the entries take
+    up more than the budget, the least recently used are deleted. Using an entry
+    touches its modification time, so the order survives restarts.
+    """
+    _directory: Path
+    _budget: int
+    # The size of every entry by digest, least recently used first
+    _entries: OrderedDict[str, int]
+    _size: int
+    _lock: threading.Lock
+
+    def __init__(self, directory: Path | str = DEFAULT_CACHE_DIRECTORY,
+                 budget: int = DEFAULT_CACHE_BUDGET):
+        """
+        :param directory: Where to store the entries, created if needed.
+        :param budget: The most bytes the entries may take up.
+        """
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._budget = budget
+        self._lock = threading.Lock()
+        found = []
+        for entry in os.scandir(self._directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(CACHE_ENTRY_SUFFIX):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(CACHE_ENTRY_SUFFIX)],
+                              stat.st_size))
+            elif entry.name.endswith(".tmp"):
+                # Left behind by a run that stopped while writing
+                Path(entry.path).unlink(missing_ok=True)
+        found.sort()
+        self._entries = OrderedDict((digest, size) for _, digest, size in found)
+        self._size = sum(self._entries.values())
+        logger.debug(f"Found {len(self._entries)} cached renders "
+                     f"({self._size / 1024 / 1024:.1f} MiB) in {self._directory}")
+        with self._lock:
+            self._evict()
+
+    @property
+    def budget(self) -> int:
+        """
+        Returns the most bytes the entries may take up.
+
+        :return: The budget in bytes.
+        """
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget: int):
+        """
+        Sets the most bytes the entries may take up, deleting entries if needed.
+
+        :param budget: The budget in bytes.
+        """
+        with self._lock:
+            self._budget = budget
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        """
+        Returns how many bytes the entries take up.
+
+        :return: The size in bytes.
+        """
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def _path(self, digest: str) -> Path:
+        """
+        Gets the path of an entry.
+
+        :param digest: The digest of the entry.
+        :return: The path of the entry.
+        """
+        return self._directory / f"{digest}{CACHE_ENTRY_SUFFIX}"
+
+    def get(self, digest: str, length: int) -> Optional[mmap.mmap]:
+        """
+        Gets an entry and marks it as the most recently used.
+
+        :param digest: The digest of the entry.
+        :param length: The expected length of the entry in bytes. An entry of another
+         length is treated as corrupt and deleted.
+        :return: The entry memory mapped, or None if it isn't cached.
+        """
+        with self._lock:
+            if digest not in self._entries:
+                return None
+            path = self._path(digest)
+            try:
+                with open(path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size != length:
+                        raise ValueError(f"expected {length} bytes")
+                    # Copy on write, as some consumers need a writable buffer
+                    pixels = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_COPY)
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping cached render {digest}: {e}")
+                self._remove(digest)
+                return None
+            self._entries.move_to_end(digest)
+            return pixels
+
+    def put(self, digest: str, pixels: bytes):
+        """
+        Adds an entry, deleting the least recently used entries if over budget.
+
+        :param digest: The digest of the entry.
+        :param pixels: The content of the entry.
+        """
+        with self._lock:
+            fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pixels)
+                os.replace(temp_path, self._path(digest))
+            except OSError as e:
+                Path(temp_path).unlink(missing_ok=True)
+                logger.warning(f"Failed to cache render {digest}: {e}")
+                return
+            self._size += len(pixels) - self._entries.pop(digest, 0)
+            self._entries[digest] = len(pixels)
+            self._evict()
+
+    def _remove(self, digest: str):
+        """
+        Deletes an entry. The lock must be held.
+
+        :param digest: The digest of the entry.
+        """
+        self._size -= self._entries.pop(digest)
+        self._path(digest).unlink(missing_ok=True)
+
+    def _evict(self):
+        """
+        Deletes the least recently used entries until within budget. The lock must be
+        held.
+        """
+        while self._size > self._budget and self._entries:
+            self._remove(next(iter(self._entries)))
@@ -0,0 +1,416 @@
+import hashlib
+import logging
+import mmap
+import pickle
+import subprocess
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+import chess
+import chess.svg
+
+from utils.board_renderer import rasterize_svg
+from utils.logger import create_logger
+from utils.render_cache import RenderCache
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How much lower the priority of the worker process is than the UI, as it spends most
+# of its time pre-rendering boards that might never be shown
+WORKER_NICENESS = 10
+# Moves standard output away before anything is imported, so logs can't end up in the
+# pixels sent back to the UI
+WORKER_COMMAND = "import os, sys; " \
+                 "output = os.fdopen(os.dup(sys.stdout.fileno()), 'wb'); " \
+                 "os.dup2(sys.stderr.fileno(), sys.stdout.fileno()); " \
+                 f"hasattr(os, 'nice') and os.nice({WORKER_NICENESS}); " \
+                 "from utils.render_worker import serve; serve(output)"
+# Without a cache, pre-renders are kept in memory for two generations, so only as many
+# boards are pre-rendered as fit in this many bytes across both
+UNCACHED_SPECULATION_BYTES = 16 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RenderRequest:
+    """
+    Everything that decides what a rendered board looks like, so equal requests render
+    equal pixels.
+    """
+    fen: str
+    lastmove: Optional[chess.Move]
+    check: Optional[chess.Square]
+    arrow: Optional[tuple[chess.Square, chess.Square]]
+    orientation: chess.Color
+    size: int
+
+    @classmethod
+    def from_board(cls, board: chess.Board, possible_move: Optional[chess.Move],
+                   orientation: chess.Color, size: int) -> "RenderRequest":
+        """
+        Creates a render request for a board.
+
+        :param board: The board to render.
+        :param possible_move: The possible move to draw an arrow for, or None.
+        :param orientation: The side at the bottom of the board.
+        :param size: The size of the board image in pixels.
+        :return: The render request.
+        """
+        return cls(board.board_fen(),
+                   board.peek() if board.move_stack else None,
+                   board.king(board.turn) if board.is_check() else None,
+                   (possible_move.from_square, possible_move.to_square)
+                   if possible_move is not None else None,
+                   orientation, size)
+
+    @property
+    def length(self) -> int:
+        """
+        Returns the length of the rendered pixels.
+
+        :return: The length in bytes.
+        """
+        return self.size * self.size * 4
+
+    def digest(self) -> str:
+        """
+        Gets a digest of the request, to look up its render in a RenderCache.
+
+        :return: The digest as hex.
+        """
+        key = " ".join((self.fen,
+                        self.lastmove.uci() if self.lastmove is not None else "-",
+                        chess.SQUARE_NAMES[self.check] if self.check is not None
+                        else "-",
+                        "".join(chess.SQUARE_NAMES[s] for s in self.arrow)
+                        if self.arrow is not None else "-",
+                        "w" if self.orientation == chess.WHITE else "b",
+                        str(self.size)))
+        return hashlib.blake2b(key.encode("ascii"), digest_size=16).hexdigest()
+
+
+def render_board(request: RenderRequest) -> bytes:
+    """
+    Renders a board with chess.svg.
+
+    :param request: What to render.
+    :return: The RGBA pixels, row by row from the top left.
+    """
+    svg = chess.svg.board(chess.BaseBoard(request.fen), size=request.size,
+                          lastmove=request.lastmove, check=request.check,
+                          orientation=request.orientation,
+                          arrows=[chess.svg.Arrow(*request.arrow, color="green")]
+                          if request.arrow is not None else [])
+    return rasterize_svg(svg, request.size, request.size)
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Statistics of pre-rendering boards that might be shown next.
+    """
+    # Requests that had already been pre-rendered when they were asked for
+    hits: int = 0
+    # Requests that had to be rendered when they were asked for
+    misses: int = 0
+    # Boards pre-rendered, whether they were asked for or not
+    renders: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Returns the fraction of requests that had already been pre-rendered.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0
+
+
+def speculative_requests(board: chess.Board, orientation: chess.Color,
+                         next_orientation: chess.Color,
+                         size: int) -> list[RenderRequest]:
+    """
+    Gets the boards that might be shown next: the arrow of every legal move, then the
+    board after every legal move.
+
+    :param board: The board that is shown now.
+    :param orientation: The side at the bottom of the board now.
+    :param next_orientation: The side at the bottom of the board after a move.
+    :param size: The size of the board image in pixels.
+    :return: The render requests, most likely to be needed first.
+    """
+    # Moves are pushed onto a copy, as the board might be shared, like by a snapshot
+    board = board.copy(stack=1)
+    moves = list(board.legal_moves)
+    requests = [RenderRequest.from_board(board, move, orientation, size)
+                for move in moves]
+    for move in moves:
+        board.push(move)
+        requests.append(RenderRequest.from_board(board, None, next_orientation, size))
+        board.pop()
+    # Promotions to different pieces share an arrow
+    return list(dict.fromkeys(requests))
+
+
+class BoardRenderWorker:
+    """
+    Renders boards with chess.svg in a separate process, so rasterizing doesn't hold
+    the GIL of the UI. Only the newest request is kept while a render is running, as
+    older ones would be outdated by the time they finish, and asking for the same
+    board again doesn't render it again. With a cache, cached renders are read from
+    it instead and new renders are added to it.
+
+    While there is nothing to render, boards that might be asked for next are
+    pre-rendered. Asking for something to be pre-rendered cancels what hasn't been
+    pre-rendered yet, and pre-renders older than the ones before are forgotten. Without
+    a cache, only the most likely boards are pre-rendered, as their pixels are kept in
+    memory.
+
+    The process is started with subprocess instead of multiprocessing, as the spawn
+    start method would rerun main.py in the worker.
+    """
+    _cache: Optional[RenderCache]
+    _process: Optional[subprocess.Popen]
+    _thread: Optional[threading.Thread]
+    _condition: threading.Condition
+    # The newest request asked for
+    _wanted: Optional[RenderRequest]
+    _pending: Optional[RenderRequest]
+    _rendering: Optional[RenderRequest]
+    _result: Optional[tuple[RenderRequest, bytes | mmap.mmap]]
+    # Boards to pre-render, and how many times pre-rendering was asked for
+    _speculative: deque[RenderRequest]
+    _generation: int
+    # The pre-renders of this and the previous generation, with their pixels if there
+    # is no cache to keep them in
+    _speculated: dict[RenderRequest, Optional[bytes]]
+    _previous_speculated: dict[RenderRequest, Optional[bytes]]
+    _stats: SpeculationStats
+    _closed: bool
+    _on_result: Optional[Callable[[], None]]
+
+    def __init__(self, cache: Optional[RenderCache] = None,
+                 on_result: Optional[Callable[[], None]] = None):
+        """
+        :param cache: Where to look up and store renders, or None to not cache them.
+        :param on_result: Called from the worker's thread when the render of the newest
+         request finishes.
+        """
+        self._cache = cache
+        self._on_result = on_result
+        self._process = None
+        self._thread = None
+        self._condition = threading.Condition()
+        self._wanted = None
+        self._pending = None
+        self._rendering = None
+        self._result = None
+        self._speculative = deque()
+        self._generation = 0
+        self._speculated = {}
+        self._previous_speculated = {}
+        self._stats = SpeculationStats()
+        self._closed = False
+
+    def _start_process(self):
+        """
+        Starts the worker process.
+        """
+        self._process = subprocess.Popen([sys.executable, "-c", WORKER_COMMAND],
+                                         cwd=Path(__file__).parent.parent,
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def start(self):
+        """
+        Starts the worker process.
+        """
+        self._start_process()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="board-render-worker")
+        self._thread.start()
+        logger.debug(f"Started board render worker (PID {self._process.pid})")
+
+    def submit(self, request: RenderRequest):
+        """
+        Asks for a board to be rendered, replacing any request that hasn't started
+        rendering yet.
+
+        :param request: What to render.
+        """
+        with self._condition:
+            if request == self._wanted:
+                return
+            self._wanted = request
+            if request in self._speculated or request in self._previous_speculated:
+                self._stats.hits += 1
+                pixels = self._speculated.get(request,
+                                              self._previous_speculated.get(request))
+                if pixels is not None:
+                    self._result = (request, pixels)
+                    self._pending = None
+                    return
+            else:
+                self._stats.misses += 1
+            if request == self._rendering:
+                # Shown once it finishes
+                self._pending = None
+                return
+            self._pending = request
+            self._condition.notify()
+
+    def speculate(self, requests: list[RenderRequest]):
+        """
+        Asks for boards to be pre-rendered while there is nothing else to render,
+        cancelling the boards from the previous call that haven't been pre-rendered yet.
+
+        :param requests: What to pre-render, most likely to be needed first.
+        """
+        if self._cache is None and requests:
+            requests = requests[:UNCACHED_SPECULATION_BYTES // 2 //
+                                requests[0].length]
+        with self._condition:
+            self._generation += 1
+            self._previous_speculated = self._speculated
+            self._speculated = {}
+            self._speculative = deque(requests)
+            self._condition.notify()
+
+    @property
+    def result(self) -> Optional[tuple[RenderRequest, bytes | mmap.mmap]]:
+        """
+        Returns the render of the newest request, once it is finished.
+
+        :return: The request and its RGBA pixels, or None if nothing has been rendered
+         yet.
+        """
+        return self._result
+
+    @property
+    def stats(self) -> SpeculationStats:
+        """
+        Returns the statistics of pre-rendering.
+
+        :return: The statistics.
+        """
+        return self._stats
+
+    def _render(self, request: RenderRequest) -> Optional[bytes]:
+        """
+        Renders a board in the worker process, restarting it if it died.
+
+        :param request: What to render.
+        :return: The RGBA pixels, or None if rendering failed.
+        """
+        try:
+            pickle.dump(request, self._process.stdin)
+            self._process.stdin.flush()
+            return pickle.load(self._process.stdout)
+        except (OSError, EOFError) as e:
+            # Restarted while closing can't start, so the input closed when closing
+            # is always of the process waited for
+            with self._condition:
+                if self._closed:
+                    return None
+                logger.error(f"Board render worker died, restarting: {e}")
+                self._process.kill()
+                self._process.wait()
+                self._start_process()
+            return None
+
+    def _run(self):
+        """
+        Sends requests to the worker process one at a time, on a background thread.
+        """
+        while True:
+            with self._condition:
+                while self._pending is None and not self._speculative and \
+                        not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    # The worker exits once its input is closed, which is only done
+                    # here so a request is never written to a closed input
+                    self._process.stdin.close()
+                    return
+                if self._pending is not None:
+                    request, self._pending = self._pending, None
+                    generation = None
+                else:
+                    request = self._speculative.popleft()
+                    generation = self._generation
+                    if request in self._speculated:
+                        continue
+                self._rendering = request
+            pixels = None
+            if self._cache is not None:
+                if generation is None:
+                    pixels = self._cache.get(request.digest(), request.length)
+                elif request.digest() in self._cache:
+                    # No need to read it until it is asked for
+                    with self._condition:
+                        if generation == self._generation:
+                            self._speculated[request] = None
+                        self._rendering = None
+                    continue
+            if pixels is None:
+                pixels = self._render(request)
+                if pixels is not None and self._cache is not None:
+                    self._cache.put(request.digest(), pixels)
+            finished = False
+            with self._condition:
+                if pixels is not None:
+                    if request == self._wanted:
+                        self._result = (request, pixels)
+                        finished = True
+                    if generation is not None:
+                        self._stats.renders += 1
+                        if generation == self._generation:
+                            self._speculated[request] = \
+                                pixels if self._cache is None else None
+                        elif generation == self._generation - 1:
+                            self._previous_speculated[request] = \
+                                pixels if self._cache is None else None
+                self._rendering = None
+            if finished and self._on_result is not None:
+                self._on_result()
+
+    def close(self):
+        """
+        Stops the worker process.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._process is not None:
+            self._process.wait()
+            self._process = None
+        logger.debug(f"Stopped board render worker, {self._stats.hits} pre-render "
+                     f"hits and {self._stats.misses} misses "
+                     f"({self._stats.hit_ratio:.0%}) from {self._stats.renders} "
+                     f"pre-renders")
+
+
+def serve(output: BinaryIO):
+    """
+    Renders the requests read from standard input until it is closed. This is what the
+    worker process runs.
+
+    :param output: Where to write the pixels of each request, or None if rendering it
+     failed.
+    """
+    while True:
+        try:
+            request = pickle.load(sys.stdin.buffer)
+        except EOFError:
+            return
+        try:
+            pixels = render_board(request)
+        except Exception as e:
+            logger.exception(f"Failed to render {request}: {e}")
+            pixels = None
+        pickle.dump(pixels, output)
+        output.flush()
@@ -0,0 +1,71 @@
+import logging
+import time
+from argparse import ArgumentParser
+
+import chess
+import chess.pgn
+
+from utils.logger import create_logger, set_all_stdout_logger_levels
+from utils.render_cache import DEFAULT_CACHE_DIRECTORY, RenderCache
+from utils.render_worker import RenderRequest, render_board
+
+logger = create_logger(name=__name__, level=logging.INFO)
+
+parser = ArgumentParser(
+    description="Renders the board previews of every position in PGN files ahead of "
+                "time into the preview cache, for the \"SVG in background\" board "
+                "renderer.")
+parser.add_argument("pgns", nargs="+",
+                    help="Paths of the PGN files to render the games of.")
+parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIRECTORY),
+                    help=f"The preview cache to fill, defaults to "
+                         f"{DEFAULT_CACHE_DIRECTORY}.")
+parser.add_argument("--budget", type=int, default=256,
+                    help="The most megabytes the preview cache may take up, like the "
+                         "preview cache size setting. Defaults to 256.")
+parser.add_argument("--size", type=int, default=240,
+                    help="The size of the previews in pixels, defaults to 240.")
+parser.add_argument("--orientation", choices=("white", "black", "both"),
+                    default="both",
+                    help="The side at the bottom of the previews, defaults to both.")
+parser.add_argument("--debug", action="store_true",
+                    help="Enable debug logging.")
+args = parser.parse_args()
+if not args.debug:
+    set_all_stdout_logger_levels(logging.INFO)
+
+orientations = {
+    "white": [chess.WHITE],
+    "black": [chess.BLACK],
+    "both": [chess.WHITE, chess.BLACK]
+}[args.orientation]
+cache = RenderCache(args.cache_dir, args.budget * 1024 * 1024)
+
+rendered = 0
+skipped = 0
+start = time.perf_counter()
+for path in args.pgns:
+    with open(path) as pgn:
+        while (game := chess.pgn.read_game(pgn)) is not None:
+            board = game.board()
+            moves = list(game.mainline_moves())
+            for ply in range(len(moves) + 1):
+                # The position as played, and with the arrow of the move about to be
+                # confirmed
+                for possible_move in [None] + moves[ply:ply + 1]:
+                    for orientation in orientations:
+                        request = RenderRequest.from_board(board, possible_move,
+                                                           orientation, args.size)
+                        digest = request.digest()
+                        if digest in cache:
+                            skipped += 1
+                            continue
+                        cache.put(digest, render_board(request))
+                        rendered += 1
+                if ply < len(moves):
+                    board.push(moves[ply])
+            logger.info(f"{path}: {game.headers.get('White', '?')} vs "
+                        f"{game.headers.get('Black', '?')}, {len(moves)} plies")
+elapsed = time.perf_counter() - start
+print(f"Rendered {rendered} previews ({skipped} already cached) in {elapsed:.1f} s, "
+      f"the cache has {len(cache)} previews ({cache.size / 1024 / 1024:.1f} MiB)")